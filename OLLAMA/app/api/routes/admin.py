@@ -1,11 +1,25 @@
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
-from app.models.schemas import DocumentInfo, DocumentType, DocumentUpload
+from app.models.schemas import DocumentInfo, DocumentType, DocumentUpload, BulkUploadResponse, FAQCreate, FAQInfo, FAQCandidate
 from app.api.services.db_service import DocumentService
+from app.api.services.faq_service import FAQService
+from app.config import MAX_ARCHIVE_UPLOAD_SIZE, PROFILE_SAMPLE_INTERVAL_MS
+from app.core.profiling import profiler, ProfilerBusyError, ProfilerStateError
+from app.dependencies import require_admin_key
+from app.utils.parsers import DocumentParser
+from app.utils.uploads import (
+    ArchiveLimitError,
+    UploadTooLargeError,
+    stream_upload_to_disk,
+    stream_body_to_disk,
+    stage_archive_entries,
+    discard_staged_file,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -31,16 +45,18 @@ async def upload_document(
     Returns:
         DocumentInfo: Information about the uploaded document
     """
+    staged_path = None
     try:
-        # Read file content
-        content = await file.read()
+        # Stream file content to disk, hashing it on the way
+        staged_path, sha256, _ = await stream_upload_to_disk(file)
 
         # Add document to knowledge base
         doc_info = await DocumentService.add_document(
-            content=content,
+            staged_path=staged_path,
             filename=name,
             description=description,
             doc_type=document_type,
+            sha256=sha256,
         )
 
         if not doc_info:
@@ -50,12 +66,138 @@ async def upload_document(
             )
 
         return doc_info
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading document: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading document: {str(e)}"
         )
+    finally:
+        discard_staged_file(staged_path)
+
+
+def _bulk_response(results) -> BulkUploadResponse:
+    """Summarise per-file bulk upload results"""
+    succeeded = sum(1 for result in results if result.success)
+    return BulkUploadResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
+
+
+@router.post("/documents/upload/bulk", response_model=BulkUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_documents_bulk(
+        files: List[UploadFile] = File(...),
+        description: str = Form(""),
+):
+    """
+    Upload many documents to the knowledge base in one request
+
+    The document type of each file is detected from its extension.
+
+    Args:
+        files: The document files
+        description: Description applied to every document
+
+    Returns:
+        BulkUploadResponse: Per-file upload results
+    """
+    entries = []
+    try:
+        for file in files:
+            try:
+                staged_path, sha256, _ = await stream_upload_to_disk(file)
+                entries.append({"filename": file.filename, "path": staged_path, "sha256": sha256})
+            except UploadTooLargeError as e:
+                entries.append({"filename": file.filename, "error": str(e)})
+
+        results = await DocumentService.add_documents_bulk(entries, description=description)
+        return _bulk_response(results)
+    except Exception as e:
+        logger.error(f"Error in bulk document upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in bulk document upload: {str(e)}"
+        )
+    finally:
+        for entry in entries:
+            discard_staged_file(entry.get("path"))
+
+
+def _stage_archive(archive_path: str) -> List[Dict[str, str]]:
+    """Copy every entry of an uploaded archive to a staged file"""
+    with open(archive_path, "rb") as archive:
+        return stage_archive_entries(DocumentParser.iter_archive(archive))
+
+
+@router.post("/documents/upload/archive", response_model=BulkUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_document_archive(request: Request, description: str = ""):
+    """
+    Upload a zip or tar archive of documents streamed as the raw request body
+
+    Archives with more than MAX_ARCHIVE_ENTRIES files or expanding to more
+    than MAX_ARCHIVE_EXTRACTED_SIZE bytes are rejected with 413.
+
+    Args:
+        request: Request whose body is the archive
+        description: Description applied to every document
+
+    Returns:
+        BulkUploadResponse: Per-entry upload results
+    """
+    archive_path = None
+    entries = []
+    try:
+        # Stream the body to disk instead of buffering it in memory
+        archive_path, _, _ = await stream_body_to_disk(request.stream(), MAX_ARCHIVE_UPLOAD_SIZE)
+
+        # Decompression runs in a worker thread so it does not stall chat requests
+        try:
+            entries = await asyncio.to_thread(_stage_archive, archive_path)
+        except ArchiveLimitError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        if not entries:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Archive does not contain any files"
+            )
+
+        results = await DocumentService.add_documents_bulk(entries, description=description)
+        return _bulk_response(results)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in archive document upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in archive document upload: {str(e)}"
+        )
+    finally:
+        discard_staged_file(archive_path)
+        for entry in entries:
+            discard_staged_file(entry.get("path"))
 
 
 @router.post("/knowledge/generate-product-info", status_code=status.HTTP_200_OK)
@@ -76,7 +218,9 @@ async def generate_product_knowledge():
             metadatas=[{
                 "source": "product_database",
                 "description": "Product information from database",
-                "generated": "True"
+                "generated": "True",
+                # One chunk per "## product" section
+                "chunking": "markdown"
             }]
         )
 
@@ -195,4 +339,205 @@ async def delete_document(document_id: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting document: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/faqs", response_model=FAQInfo, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_admin_key)])
+async def add_faq(faq: FAQCreate):
+    """
+    Add a canonical question with its approved answer
+
+    Chat queries similar enough to the question get the answer directly,
+    without retrieval or an LLM call.
+
+    Args:
+        faq: Question and answer
+
+    Returns:
+        FAQInfo: The stored FAQ
+    """
+    faq_info = await FAQService.add_faq(faq.question, faq.answer)
+    if not faq_info:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to add FAQ"
+        )
+    return faq_info
+
+
+@router.get("/faqs", response_model=List[FAQInfo], status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def list_faqs():
+    """
+    List all FAQs
+
+    Returns:
+        List of FAQs
+    """
+    return await FAQService.list_faqs()
+
+
+@router.delete("/faqs/{faq_id}", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def delete_faq(faq_id: int):
+    """
+    Delete an FAQ by ID
+
+    Args:
+        faq_id: FAQ ID
+
+    Returns:
+        Success message
+    """
+    if not await FAQService.delete_faq(faq_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"FAQ with ID {faq_id} not found or could not be deleted"
+        )
+    return {"message": f"FAQ with ID {faq_id} successfully deleted"}
+
+
+@router.post("/faqs/candidates", response_model=List[FAQCandidate], status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def generate_faq_candidates(
+        file: UploadFile = File(...),
+        min_count: int = Form(2),
+        limit: int = Form(20),
+        draft_answers: bool = Form(False),
+):
+    """
+    Propose FAQs from a chat query log
+
+    The log holds one query per line, either as plain text or as JSON chat
+    requests/messages. Similar queries are grouped, and groups asked at least
+    min_count times that no FAQ answers yet are returned for review.
+
+    Args:
+        file: The query log
+        min_count: Minimum number of queries in a candidate
+        limit: Maximum number of candidates
+        draft_answers: Draft an answer for each candidate with the RAG pipeline
+
+    Returns:
+        List of FAQ candidates, most asked first
+    """
+    staged_path = None
+    try:
+        staged_path, _, _ = await stream_upload_to_disk(file)
+        with open(staged_path, encoding="utf-8", errors="replace") as f:
+            queries = FAQService.parse_query_log(f)
+
+        return await FAQService.generate_candidates(
+            queries,
+            min_count=min_count,
+            limit=limit,
+            draft_answers=draft_answers
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error generating FAQ candidates: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating FAQ candidates: {str(e)}"
+        )
+    finally:
+        discard_staged_file(staged_path)
+
+
+@router.post("/profiling/cpu", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def profile_cpu(
+        seconds: float = 10.0,
+        mode: str = "sampling",
+        output: str = "collapsed",
+        interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS,
+        include_idle: bool = False,
+        limit: int = 50,
+):
+    """
+    Profile this worker for a few seconds under its live traffic
+
+    The sampling mode reads every thread's stack at a fixed interval and
+    returns collapsed stacks for flamegraph.pl or speedscope. The cprofile
+    mode profiles every call on the event loop thread and returns a pstats
+    file (load it with pstats.Stats or snakeviz) or a text table.
+
+    Args:
+        seconds: Profiling window, capped at PROFILE_MAX_SECONDS
+        mode: "sampling" or "cprofile"
+        output: "collapsed" for sampling; "pstats" or "text" for cprofile
+        interval_ms: Sampling interval
+        include_idle: Keep samples of threads waiting on locks, queues or sockets
+        limit: Functions listed in the text output
+
+    Returns:
+        The profile as text or a pstats download
+    """
+    try:
+        if mode == "sampling":
+            collapsed = await profiler.sample(seconds, interval_ms / 1000, include_idle)
+            return PlainTextResponse(collapsed)
+        if mode == "cprofile":
+            if output not in ("pstats", "text"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="cprofile output must be 'pstats' or 'text'"
+                )
+            profile = await profiler.profile_event_loop(seconds)
+            if output == "text":
+                return PlainTextResponse(await asyncio.to_thread(profiler.pstats_text, profile, limit))
+            return Response(
+                content=await asyncio.to_thread(profiler.pstats_bytes, profile),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": 'attachment; filename="profile.pstats"'}
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode must be 'sampling' or 'cprofile'"
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/profiling/heap/start", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def start_heap_tracing(frames: int = 10):
+    """
+    Start tracing allocations and record the baseline for later diffs
+
+    Args:
+        frames: Stack frames kept per allocation; more frames cost more memory
+
+    Returns:
+        Heap tracing status
+    """
+    try:
+        return await asyncio.to_thread(profiler.start_heap, frames)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/profiling/heap/diff", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def diff_heap(limit: int = 50, group_by: str = "lineno", reset: bool = False):
+    """
+    Allocation growth since the baseline snapshot
+
+    Args:
+        limit: Allocation sites returned, largest growth first
+        group_by: "lineno", "filename" or "traceback"
+        reset: Use this snapshot as the baseline of the next diff
+
+    Returns:
+        Traced memory totals and per-site size and count differences
+    """
+    try:
+        return await asyncio.to_thread(profiler.heap_diff, limit, group_by, reset)
+    except ProfilerStateError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/profiling/heap/stop", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_key)])
+async def stop_heap_tracing():
+    """Stop tracing allocations and free the snapshots"""
+    return await asyncio.to_thread(profiler.stop_heap)
@@ -1,13 +1,15 @@
 import logging
 from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.models.schemas import ChatRequest, ChatResponse
 from app.api.services.chat_service import chat_service
 from app.dependencies import validate_token
+from app.core.sessions import UnknownSessionError
+from app.utils.concurrency import cancel_on_disconnect, ClientDisconnectedError, CLIENT_CLOSED_REQUEST
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,8 @@ security = HTTPBearer(auto_error=False)
 
 
 @router.post("/chat", response_model=ChatResponse, status_code=status.HTTP_200_OK)
-async def authenticated_chat(request: ChatRequest, authenticated: bool = Depends(validate_token)):
+async def authenticated_chat(request: ChatRequest, http_request: Request,
+                             authenticated: bool = Depends(validate_token)):
     """
     Process a chat message with authentication awareness
     
@@ -25,6 +28,7 @@ async def authenticated_chat(request: ChatRequest, authenticated: bool = Depends
     
     Args:
         request: Chat request with query and optional history
+        http_request: The underlying request, watched for a disconnect
         authenticated: Whether the user is authenticated
         
     Returns:
@@ -36,8 +40,17 @@ async def authenticated_chat(request: ChatRequest, authenticated: bool = Depends
             request.metadata = {}
         request.metadata["authenticated"] = authenticated
         
-        response = await chat_service.process_authenticated_message(request)
+        response = await cancel_on_disconnect(
+            http_request, chat_service.process_authenticated_message(request), "auth_chat"
+        )
         return response
+    except ClientDisconnectedError:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except UnknownSessionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error in authenticated chat endpoint: {str(e)}")
         raise HTTPException(
@@ -47,7 +60,8 @@ async def authenticated_chat(request: ChatRequest, authenticated: bool = Depends
 
 
 @router.post("/order-tracking", response_model=ChatResponse, status_code=status.HTTP_200_OK)
-async def order_tracking(request: ChatRequest, authenticated: bool = Depends(validate_token)):
+async def order_tracking(request: ChatRequest, http_request: Request,
+                         authenticated: bool = Depends(validate_token)):
     """
     Process an order tracking request with authentication awareness
     
@@ -56,6 +70,7 @@ async def order_tracking(request: ChatRequest, authenticated: bool = Depends(val
     
     Args:
         request: Chat request with query about order tracking
+        http_request: The underlying request, watched for a disconnect
         authenticated: Whether the user is authenticated
         
     Returns:
@@ -75,8 +90,17 @@ async def order_tracking(request: ChatRequest, authenticated: bool = Depends(val
         request.metadata["authenticated"] = True
         request.metadata["request_type"] = "order_tracking"
         
-        response = await chat_service.process_authenticated_message(request)
+        response = await cancel_on_disconnect(
+            http_request, chat_service.process_authenticated_message(request), "order_tracking"
+        )
         return response
+    except ClientDisconnectedError:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except UnknownSessionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error in order tracking endpoint: {str(e)}")
         raise HTTPException(
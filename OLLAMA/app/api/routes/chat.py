@@ -1,11 +1,17 @@
+import json
+import asyncio
 import logging
 from typing import List, Dict, Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.models.schemas import ChatRequest, ChatResponse
+from app.models.schemas import ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse
 from app.api.services.chat_service import chat_service
+from app.core.sessions import session_store, UnknownSessionError
+from app.core.metrics import CANCELLED_REQUESTS
+from app.utils.concurrency import cancel_on_disconnect, ClientDisconnectedError, CLIENT_CLOSED_REQUEST
+from app.config import BATCH_MAX_QUERIES
 
 logger = logging.getLogger(__name__)
 
@@ -13,22 +19,96 @@ router = APIRouter()
 
 
 @router.post("/chat", response_model=ChatResponse, status_code=status.HTTP_200_OK)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Process a chat message
 
+    If the client disconnects first, the pipeline and its LLM call are
+    cancelled.
+
     Args:
         request: Chat request with query and optional history
+        http_request: The underlying request, watched for a disconnect
 
     Returns:
         ChatResponse: The assistant's response
     """
     try:
-        response = await chat_service.process_message(request)
+        response = await cancel_on_disconnect(http_request, chat_service.process_message(request), "chat")
         return response
+    except ClientDisconnectedError:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except UnknownSessionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing chat message"
-        )
\ No newline at end of file
+        )
+
+@router.post("/batch", response_model=BatchChatResponse, status_code=status.HTTP_200_OK)
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """
+    Answer many independent queries in one request
+
+    Retrieval is batched and generations run with bounded concurrency. With
+    stream=true, each result is sent as an NDJSON line ({"index": ..., plus
+    the ChatResponse fields}) as soon as it is ready, and a failure ends the
+    stream with an {"error": ...} line; otherwise all results are returned
+    in query order. Pending generations are cancelled if the
+    client disconnects.
+
+    Args:
+        request: Queries and output mode
+        http_request: The underlying request, watched for a disconnect
+
+    Returns:
+        BatchChatResponse, or an NDJSON stream
+    """
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can hold at most {BATCH_MAX_QUERIES} queries"
+        )
+
+    if request.stream:
+        async def lines():
+            try:
+                async for index, response in chat_service.iter_batch(request.queries):
+                    yield json.dumps({"index": index, **response.model_dump()}) + "\n"
+            except asyncio.CancelledError:
+                # The client disconnected mid-stream; closing iter_batch cancels the remaining generations
+                CANCELLED_REQUESTS.labels("batch").inc()
+                raise
+            except Exception as e:
+                # The status line is already sent: a final error line tells clients the batch is incomplete
+                logger.error(f"Error in streamed batch chat endpoint: {str(e)}")
+                yield json.dumps({"error": "Error processing chat batch"}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    try:
+        results = await cancel_on_disconnect(http_request, chat_service.process_batch(request.queries), "batch")
+        return BatchChatResponse(results=results)
+    except ClientDisconnectedError:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in batch chat endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error processing chat batch"
+        )
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_session(session_id: str):
+    """
+    Forget a server-side conversation session
+
+    Args:
+        session_id: The session to delete
+    """
+    await session_store.delete(session_id)
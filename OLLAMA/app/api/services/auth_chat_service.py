@@ -1,10 +1,24 @@
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 
-from app.core.rag_engine import rag_engine
+from app.core.rag_engine import rag_engine, DegradedAnswer
+from app.core.entities import product_matcher
+from app.core.intents import intent_router, ORDER_TRACKING
+from app.core.sessions import session_store, UnknownSessionError
 from app.utils.db import DBService
 from app.utils.auth_db import auth_db_service
+from app.utils.concurrency import Branch
+from app.config import DB_ENRICHMENT_TIMEOUT, CHAT_DEADLINE
 from app.models.schemas import ChatRequest, ChatResponse, MessageRole, Message
+from app.api.services.quick_answers import quick_answer_service
+from app.core.metrics import (
+    CHAT_REQUEST_SECONDS,
+    CHAT_REQUESTS_IN_PROGRESS,
+    DB_ENRICHMENT_SECONDS,
+    RESPONSE_FORMAT_SECONDS,
+)
+from app.core.resilience import deadline_scope
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +30,8 @@ class AuthChatService:
         self.rag_engine = rag_engine
         self.db_service = DBService
 
+    @tracer.traced("auth_chat.process_message")
+    @CHAT_REQUEST_SECONDS.labels("auth_chat").time()
     async def process_authenticated_message(self, chat_request: ChatRequest) -> ChatResponse:
         """Process a chat message with authentication awareness"""
         try:
@@ -24,31 +40,22 @@ class AuthChatService:
             authenticated = chat_request.metadata.get("authenticated", False) if chat_request.metadata else False
             request_type = chat_request.metadata.get("request_type", None) if chat_request.metadata else None
             
-            # If this is specifically an order tracking request
-            if request_type == "order_tracking" or self._is_order_tracking_query(query):
-                return await self._handle_authenticated_order_tracking(query, authenticated)
-            elif self._is_stock_check_query(query):
-                return await self._handle_stock_check(query)
-
-            # Get relevant database information
-            db_info = await self._get_relevant_db_info(query, authenticated)
-
-            # Use RAG with database context
-            answer, relevant_docs = self.rag_engine.process_query(
-                query=query,
-                history=history,
-                db_info=db_info
-            )
-            
-            # Format answer to ensure it's concise
-            answer = self._format_concise_response(answer)
-
-            return ChatResponse(
-                answer=answer,
-                context=[doc["content"] for doc in relevant_docs[:3]],
-                sources=[doc.get("metadata", {}).get("source") for doc in relevant_docs if "metadata" in doc]
-            )
-
+            # A server-side session replaces the client-sent history
+            session_id = chat_request.session_id
+            if chat_request.new_session:
+                session_id = await session_store.create(history)
+            summary, history = await session_store.load(session_id, history)
+
+            with deadline_scope(CHAT_DEADLINE):
+                response = await self._answer(query, history, summary, authenticated, request_type)
+
+            if session_id:
+                await session_store.append_turn(session_id, query, response.answer)
+                response.session_id = session_id
+            return response
+
+        except UnknownSessionError:
+            raise
         except Exception as e:
             logger.error(f"Error processing authenticated message: {str(e)}")
             return ChatResponse(
@@ -57,21 +64,73 @@ class AuthChatService:
                 sources=None
             )
 
+    @CHAT_REQUESTS_IN_PROGRESS.track_inprogress()
+    async def _answer(
+            self,
+            query: str,
+            history: List[Dict[str, str]],
+            summary: str,
+            authenticated: bool,
+            request_type: Optional[str]
+    ) -> ChatResponse:
+        """Answer a message from its conversation context"""
+        # Route the query; deterministic intents are answered without the LLM
+        match = await intent_router.route(query)
+
+        # If this is specifically an order tracking request
+        if request_type == "order_tracking" or match.intent == ORDER_TRACKING:
+            return await self._handle_authenticated_order_tracking(match.slots.get("order_id"), authenticated)
+        quick_answer = await quick_answer_service.answer(match, query)
+        if quick_answer is not None:
+            return quick_answer
+
+        # Database enrichment runs alongside retrieval
+        enrichment = {
+            "db_info": Branch(self._get_relevant_db_info(query, authenticated), DB_ENRICHMENT_TIMEOUT, ""),
+        }
+
+        # Use RAG with database context
+        answer, relevant_docs = await self.rag_engine.process_query_async(
+            query=query,
+            history=history,
+            enrichment=enrichment,
+            summary=summary
+        )
+
+        # Degraded answers quote facts verbatim; only generated answers are shortened
+        degraded = isinstance(answer, DegradedAnswer)
+        if not degraded:
+            # Format answer to ensure it's concise
+            answer = self._format_concise_response(answer)
+
+        return ChatResponse(
+            answer=answer,
+            context=[doc["content"] for doc in relevant_docs[:3]],
+            sources=[doc.get("metadata", {}).get("source") for doc in relevant_docs if "metadata" in doc],
+            degraded=degraded
+        )
+
+    @tracer.traced("auth_chat.db_enrichment")
+    @DB_ENRICHMENT_SECONDS.time()
     async def _get_relevant_db_info(self, query: str, authenticated: bool = False) -> str:
         """Get relevant database information for the query based on authentication status"""
         info_parts = []
 
+        # Products named in the query take precedence over a generic listing
+        products = product_matcher.mentioned_products(query, limit=5)
+
         # Get product information if query seems product-related
-        if any(word in query.lower() for word in ["product", "item", "price", "cost", "buy"]):
-            products = await self.db_service.get_all_products()
-            if products:
-                info_parts.append("Available Products:")
-                for product in products[:5]:  # Limit to 5 products for context
-                    info_parts.append(
-                        f"- {product['designation']}: "
-                        f"${product['prix']:.2f}, "
-                        f"{product['stock_status']}"
-                    )
+        if not products and any(word in query.lower() for word in ["product", "item", "price", "cost", "buy"]):
+            products = await self.db_service.get_all_products(limit=5)  # Limit to 5 products for context
+
+        if products:
+            info_parts.append("Available Products:")
+            for product in products:
+                info_parts.append(
+                    f"- {product['designation']}: "
+                    f"${product['prix']:.2f}, "
+                    f"{product['stock_status']}"
+                )
         
         # If authenticated, add personalized information
         if authenticated:
@@ -81,24 +140,7 @@ class AuthChatService:
 
         return "\n".join(info_parts)
 
-    def _is_order_tracking_query(self, query: str) -> bool:
-        """Check if query is about order tracking"""
-        tracking_keywords = [
-            "track my order", "order status", "where is my order",
-            "shipping status", "delivery status", "order #", "order number",
-            "track order", "order tracking"
-        ]
-        return any(keyword in query.lower() for keyword in tracking_keywords)
-
-    def _is_stock_check_query(self, query: str) -> bool:
-        """Check if query is about stock availability"""
-        stock_keywords = [
-            "in stock", "available", "stock", "inventory",
-            "when will", "back in stock", "availability"
-        ]
-        return any(keyword in query.lower() for keyword in stock_keywords)
-
-    async def _handle_authenticated_order_tracking(self, query: str, authenticated: bool) -> ChatResponse:
+    async def _handle_authenticated_order_tracking(self, order_id: Optional[int], authenticated: bool) -> ChatResponse:
         """Handle order tracking query based on authentication status"""
         if not authenticated:
             return ChatResponse(
@@ -108,8 +150,6 @@ class AuthChatService:
             )
         
         # If authenticated, proceed with order tracking
-        order_id = self._extract_order_id(query)
-
         if not order_id:
             # For authenticated users, try to get their recent orders
             # In a real implementation, we would extract the user_id from the authentication token
@@ -173,86 +213,8 @@ class AuthChatService:
             sources=None
         )
 
-    async def _handle_stock_check(self, query: str) -> ChatResponse:
-        """Handle stock check query"""
-        product_name = self._extract_product_name(query)
-
-        if not product_name:
-            return ChatResponse(
-                answer="I'd be happy to check stock availability. Which product are you interested in?",
-                context=None,
-                sources=None
-            )
-
-        stock_info = await self.db_service.check_stock(product_name=product_name)
-
-        if not stock_info:
-            return ChatResponse(
-                answer=f"I couldn't find any product matching '{product_name}'. Could you please check the spelling or try a different product?",
-                context=None,
-                sources=None
-            )
-
-        # Format response
-        response_parts = [f"Here's the availability information for {stock_info['designation']}:"]
-
-        response_parts.append(f"\nStatus: {stock_info['stock_status']}")
-        response_parts.append(f"Price: ${stock_info['prix']:.2f}")
-
-        if stock_info.get('category_name'):
-            response_parts.append(f"Category: {stock_info['category_name']}")
-
-        if stock_info.get('nbrPoint', 0) > 0:
-            response_parts.append(f"Reward Points: {stock_info['nbrPoint']}")
-
-        return ChatResponse(
-            answer="\n".join(response_parts),
-            context=None,
-            sources=None
-        )
-
-    def _extract_order_id(self, query: str) -> Optional[int]:
-        """Extract order ID from query"""
-        import re
-        patterns = [
-            r"order\s*#?\s*(\d+)",
-            r"#\s*(\d+)",
-            r"order\s*number\s*(\d+)",
-            r"tracking\s*number\s*(\d+)"
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    continue
-        return None
-
-    def _extract_product_name(self, query: str) -> Optional[str]:
-        """Extract product name from query"""
-        import re
-        patterns = [
-            r"stock\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)",
-            r"([\w\s]+?)\s*(?:in stock|available)",
-            r"availability\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)",
-            r"do you have\s*([\w\s]+?)(?:\?|$|\.)",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                product_name = match.group(1).strip()
-                if product_name:
-                    return product_name
-
-        words = query.split()
-        if len(words) >= 2:
-            return " ".join(words[-3:])
-
-        return None
-        
+    @tracer.traced("auth_chat.format_response")
+    @RESPONSE_FORMAT_SECONDS.time()
     def _format_concise_response(self, response: str) -> str:
         """Format response to be more concise for e-commerce context"""
         # Remove unnecessary phrases and filler words
@@ -1,11 +1,26 @@
+import asyncio
 import logging
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, AsyncIterator, Optional, Tuple
 
-from app.core.rag_engine import rag_engine
+from app.core.rag_engine import rag_engine, DegradedAnswer
+from app.core.entities import product_matcher
+from app.core.intents import intent_router, ORDER_TRACKING
+from app.core.sessions import session_store, UnknownSessionError
 from app.utils.db import DBService
+from app.utils.concurrency import Branch, gather_branches
+from app.config import DB_ENRICHMENT_TIMEOUT, CHAT_DEADLINE, BATCH_DB_CONCURRENCY
 from app.models.schemas import ChatRequest, ChatResponse, MessageRole, Message
 from app.api.services.auth_chat_service import auth_chat_service
+from app.api.services.quick_answers import quick_answer_service
+from app.core.metrics import (
+    CHAT_REQUEST_SECONDS,
+    CHAT_REQUESTS_IN_PROGRESS,
+    DB_ENRICHMENT_SECONDS,
+    RESPONSE_FORMAT_SECONDS,
+)
+from app.core.resilience import deadline_scope
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +32,8 @@ class ChatService:
         self.rag_engine = rag_engine
         self.db_service = DBService
 
+    @tracer.traced("chat.process_message")
+    @CHAT_REQUEST_SECONDS.labels("chat").time()
     async def process_message(self, chat_request: ChatRequest) -> ChatResponse:
         """Process a chat message"""
         try:
@@ -31,31 +48,22 @@ class ChatService:
                 return await auth_chat_service.process_authenticated_message(chat_request)
 
             # For non-authenticated users, continue with standard processing
-            # Check for special queries
-            if self._is_order_tracking_query(query):
-                return await self._handle_order_tracking(query)
-            elif self._is_stock_check_query(query):
-                return await self._handle_stock_check(query)
-
-            # Get relevant database information
-            db_info = await self._get_relevant_db_info(query)
-
-            # Use RAG with database context
-            answer, relevant_docs = self.rag_engine.process_query(
-                query=query,
-                history=history,
-                db_info=db_info
-            )
-            
-            # Format answer to ensure it's concise
-            answer = self._format_concise_response(answer)
-
-            return ChatResponse(
-                answer=answer,
-                context=[doc["content"] for doc in relevant_docs[:3]],
-                sources=[doc.get("metadata", {}).get("source") for doc in relevant_docs if "metadata" in doc]
-            )
-
+            # A server-side session replaces the client-sent history
+            session_id = chat_request.session_id
+            if chat_request.new_session:
+                session_id = await session_store.create(history)
+            summary, history = await session_store.load(session_id, history)
+
+            with deadline_scope(CHAT_DEADLINE):
+                response = await self._answer(query, history, summary)
+
+            if session_id:
+                await session_store.append_turn(session_id, query, response.answer)
+                response.session_id = session_id
+            return response
+
+        except UnknownSessionError:
+            raise
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
             return ChatResponse(
@@ -64,45 +72,142 @@ class ChatService:
                 sources=None
             )
 
+    async def iter_batch(self, queries: List[str]) -> AsyncIterator[Tuple[int, ChatResponse]]:
+        """
+        Answer independent queries, yielding each response as soon as it is ready
+
+        Queries are routed concurrently, and those the intent router, quick
+        answers or FAQs can handle are answered first. The rest go through the
+        RAG engine's batch path, each enriched from the database inside its own
+        pipeline. Routing and enrichment share a limit of BATCH_DB_CONCURRENCY
+        lookups in flight, so a large batch does not exhaust the connection pool.
+
+        Args:
+            queries: The queries, each answered without history
+
+        Yields:
+            Tuples of (query index, response) in completion order
+        """
+        db_semaphore = asyncio.Semaphore(max(1, BATCH_DB_CONCURRENCY))
+
+        async def route(index: int) -> Tuple[int, Optional[ChatResponse]]:
+            async with db_semaphore:
+                try:
+                    return index, await self._direct_answer(queries[index])
+                except Exception as e:
+                    logger.error(f"Error routing batch query {index}: {str(e)}")
+                    return index, None
+
+        async def enrich(query: str) -> str:
+            async with db_semaphore:
+                results = await gather_branches({
+                    "db_info": Branch(self._get_relevant_db_info(query), DB_ENRICHMENT_TIMEOUT, ""),
+                })
+            return results["db_info"]
+
+        rag_indexes = []
+        routes = [asyncio.ensure_future(route(index)) for index in range(len(queries))]
+        try:
+            for next_done in asyncio.as_completed(routes):
+                index, response = await next_done
+                if response is not None:
+                    yield index, response
+                else:
+                    rag_indexes.append(index)
+        finally:
+            for task in routes:
+                task.cancel()
+
+        if not rag_indexes:
+            return
+
+        rag_indexes.sort()
+        rag_queries = [queries[index] for index in rag_indexes]
+        async for position, answer, relevant_docs in self.rag_engine.iter_batch(rag_queries, enrich):
+            yield rag_indexes[position], self._rag_response(answer, relevant_docs)
+
+    @tracer.traced("chat.process_batch")
+    async def process_batch(self, queries: List[str]) -> List[ChatResponse]:
+        """
+        Answer independent queries in bulk
+
+        Args:
+            queries: The queries, each answered without history
+
+        Returns:
+            One response per query, in query order
+        """
+        responses: List[Optional[ChatResponse]] = [None] * len(queries)
+        async for index, response in self.iter_batch(queries):
+            responses[index] = response
+        return responses
+
+    @CHAT_REQUESTS_IN_PROGRESS.track_inprogress()
+    async def _answer(self, query: str, history: List[Dict[str, str]], summary: str = "") -> ChatResponse:
+        """Answer a message from its conversation context"""
+        direct = await self._direct_answer(query)
+        if direct is not None:
+            return direct
+
+        # Use RAG, with database enrichment running alongside retrieval
+        answer, relevant_docs = await self.rag_engine.process_query_async(
+            query=query,
+            history=history,
+            enrichment={
+                "db_info": Branch(self._get_relevant_db_info(query), DB_ENRICHMENT_TIMEOUT, ""),
+            },
+            summary=summary
+        )
+        return self._rag_response(answer, relevant_docs)
+
+    async def _direct_answer(self, query: str) -> Optional[ChatResponse]:
+        """Answer without the LLM when the routed intent allows it"""
+        # Route the query; deterministic intents are answered without the LLM
+        match = await intent_router.route(query)
+        if match.intent == ORDER_TRACKING:
+            return await self._handle_order_tracking(match.slots.get("order_id"))
+        return await quick_answer_service.answer(match, query)
+
+    def _rag_response(self, answer: str, relevant_docs: List[Dict[str, Any]]) -> ChatResponse:
+        # Degraded answers quote facts verbatim; only generated answers are shortened
+        degraded = isinstance(answer, DegradedAnswer)
+        if not degraded:
+            # Format answer to ensure it's concise
+            answer = self._format_concise_response(answer)
+
+        return ChatResponse(
+            answer=answer,
+            context=[doc["content"] for doc in relevant_docs[:3]],
+            sources=[doc.get("metadata", {}).get("source") for doc in relevant_docs if "metadata" in doc],
+            degraded=degraded
+        )
+
+    @tracer.traced("chat.db_enrichment")
+    @DB_ENRICHMENT_SECONDS.time()
     async def _get_relevant_db_info(self, query: str) -> str:
         """Get relevant database information for the query"""
         info_parts = []
 
+        # Products named in the query take precedence over a generic listing
+        products = product_matcher.mentioned_products(query, limit=5)
+
         # Get product information if query seems product-related
-        if any(word in query.lower() for word in ["product", "item", "price", "cost", "buy"]):
-            products = await self.db_service.get_all_products()
-            if products:
-                info_parts.append("Available Products:")
-                for product in products[:5]:  # Limit to 5 products for context
-                    info_parts.append(
-                        f"- {product['designation']}: "
-                        f"${product['prix']:.2f}, "
-                        f"{product['stock_status']}"
-                    )
+        if not products and any(word in query.lower() for word in ["product", "item", "price", "cost", "buy"]):
+            products = await self.db_service.get_all_products(limit=5)  # Limit to 5 products for context
+
+        if products:
+            info_parts.append("Available Products:")
+            for product in products:
+                info_parts.append(
+                    f"- {product['designation']}: "
+                    f"${product['prix']:.2f}, "
+                    f"{product['stock_status']}"
+                )
 
         return "\n".join(info_parts)
 
-    def _is_order_tracking_query(self, query: str) -> bool:
-        """Check if query is about order tracking"""
-        tracking_keywords = [
-            "track my order", "order status", "where is my order",
-            "shipping status", "delivery status", "order #", "order number",
-            "track order", "order tracking"
-        ]
-        return any(keyword in query.lower() for keyword in tracking_keywords)
-
-    def _is_stock_check_query(self, query: str) -> bool:
-        """Check if query is about stock availability"""
-        stock_keywords = [
-            "in stock", "available", "stock", "inventory",
-            "when will", "back in stock", "availability"
-        ]
-        return any(keyword in query.lower() for keyword in stock_keywords)
-
-    async def _handle_order_tracking(self, query: str) -> ChatResponse:
+    async def _handle_order_tracking(self, order_id: Optional[int]) -> ChatResponse:
         """Handle order tracking query for non-authenticated users"""
-        order_id = self._extract_order_id(query)
-
         if not order_id:
             return ChatResponse(
                 answer="I'd be happy to help you track your order. Could you please provide your order number? For personalized tracking, you can also log in to your account.",
@@ -146,86 +251,8 @@ class ChatService:
             sources=None
         )
 
-    async def _handle_stock_check(self, query: str) -> ChatResponse:
-        """Handle stock check query"""
-        product_name = self._extract_product_name(query)
-
-        if not product_name:
-            return ChatResponse(
-                answer="I'd be happy to check stock availability. Which product are you interested in?",
-                context=None,
-                sources=None
-            )
-
-        stock_info = await self.db_service.check_stock(product_name=product_name)
-
-        if not stock_info:
-            return ChatResponse(
-                answer=f"I couldn't find any product matching '{product_name}'. Could you please check the spelling or try a different product?",
-                context=None,
-                sources=None
-            )
-
-        # Format response
-        response_parts = [f"Here's the availability information for {stock_info['designation']}:"]
-
-        response_parts.append(f"\nStatus: {stock_info['stock_status']}")
-        response_parts.append(f"Price: ${stock_info['prix']:.2f}")
-
-        if stock_info.get('category_name'):
-            response_parts.append(f"Category: {stock_info['category_name']}")
-
-        if stock_info.get('nbrPoint', 0) > 0:
-            response_parts.append(f"Reward Points: {stock_info['nbrPoint']}")
-
-        return ChatResponse(
-            answer="\n".join(response_parts),
-            context=None,
-            sources=None
-        )
-
-    def _extract_order_id(self, query: str) -> Optional[int]:
-        """Extract order ID from query"""
-        import re
-        patterns = [
-            r"order\s*#?\s*(\d+)",
-            r"#\s*(\d+)",
-            r"order\s*number\s*(\d+)",
-            r"tracking\s*number\s*(\d+)"
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    continue
-        return None
-
-    def _extract_product_name(self, query: str) -> Optional[str]:
-        """Extract product name from query"""
-        import re
-        patterns = [
-            r"stock\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)",
-            r"([\w\s]+?)\s*(?:in stock|available)",
-            r"availability\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)",
-            r"do you have\s*([\w\s]+?)(?:\?|$|\.)",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
-            if match:
-                product_name = match.group(1).strip()
-                if product_name:
-                    return product_name
-
-        words = query.split()
-        if len(words) >= 2:
-            return " ".join(words[-3:])
-
-        return None
-        
+    @tracer.traced("chat.format_response")
+    @RESPONSE_FORMAT_SECONDS.time()
     def _format_concise_response(self, response: str) -> str:
         """Format response to be more concise for e-commerce context"""
         # Remove unnecessary phrases and filler words
@@ -1,3 +1,5 @@
+import asyncio
+import glob
 import logging
 import os
 import json
@@ -8,8 +10,9 @@ from app.database.connection import SessionLocal
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.models.schemas import DocumentInfo, DocumentType
-from app.utils.parsers import DocumentParser
+from app.config import BULK_INGEST_CONCURRENCY
+from app.models.schemas import DocumentInfo, DocumentType, BulkUploadResult
+from app.utils.parsers import DocumentParser, DOCUMENT_TYPE_DIRS
 from app.core.vector_store import vector_store
 
 logger = logging.getLogger(__name__)
@@ -19,48 +22,194 @@ class DocumentService:
     """Service for managing knowledge base documents"""
 
     @staticmethod
-    async def add_document(
-            content: bytes,
+    def _prepare_document(
+            staged_path: str,
             filename: str,
             description: str,
             doc_type: DocumentType,
+            metadata: Optional[Dict[str, Any]] = None,
+            sha256: Optional[str] = None
+    ) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Parse a document and build its metadata
+
+        Args:
+            staged_path: Path of the staged upload on disk
+            filename: Original filename
+            description: Document description
+            doc_type: Type of document
+            metadata: Additional metadata
+            sha256: Hex digest of the file content
+
+        Returns:
+            Tuple of (extracted_text, saved_file_path, file_metadata)
+        """
+        # Parse the document
+        text_content, file_path = DocumentParser.parse_document(staged_path, filename, doc_type, sha256)
+
+        # Extract metadata and combine with user-provided metadata
+        file_metadata = DocumentParser.extract_metadata(file_path)
+        # Stored names are content hashes, so cite the original filename instead
+        file_metadata["source"] = filename
+        # Selects the chunking strategy configured for this document type
+        file_metadata["document_type"] = doc_type.value
+        if sha256:
+            file_metadata["sha256"] = sha256
+        if metadata:
+            file_metadata.update(metadata)
+
+        file_metadata["description"] = description
+
+        return text_content, file_path, file_metadata
+
+    @staticmethod
+    def find_document_by_hash(sha256: str) -> Optional[DocumentInfo]:
+        """
+        Look up an already stored document with the same content
+
+        The metadata sidecar next to the content-addressed file acts as the index,
+        so no database round-trip is needed. Only the content counts: the same
+        bytes uploaded as a.txt and a.md are one document.
+
+        Args:
+            sha256: Hex digest of the file content
+
+        Returns:
+            The existing document info, or None if the content is new
+        """
+        for directory in sorted(set(DOCUMENT_TYPE_DIRS.values())):
+            for metadata_path in sorted(glob.glob(os.path.join(glob.escape(directory), f"{sha256}*.metadata.json"))):
+                try:
+                    with open(metadata_path, "r") as f:
+                        return DocumentInfo(**json.load(f))
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable metadata file {metadata_path}: {str(e)}")
+        return None
+
+    @staticmethod
+    def _duplicate_of(
+            existing: DocumentInfo,
+            description: str = "",
             metadata: Optional[Dict[str, Any]] = None
+    ) -> DocumentInfo:
+        """
+        Report an upload of already stored content as the existing document
+
+        The stored document is not changed, so a description or metadata that
+        differ from it are listed in `ignored_fields`.
+
+        Args:
+            existing: The stored document
+            description: Description sent with the upload
+            metadata: Metadata sent with the upload
+
+        Returns:
+            The existing document info, flagged as duplicate
+        """
+        ignored_fields = []
+        if description and description != existing.description:
+            ignored_fields.append("description")
+        stored_metadata = existing.metadata or {}
+        if metadata and any(stored_metadata.get(key) != value for key, value in metadata.items()):
+            ignored_fields.append("metadata")
+        return existing.model_copy(update={"duplicate": True, "ignored_fields": ignored_fields})
+
+    @staticmethod
+    def _record_documents(doc_infos: List[DocumentInfo]) -> None:
+        """
+        Write metadata sidecar files and store document rows in a single transaction
+
+        Args:
+            doc_infos: Documents that were added to the vector store
+        """
+        for doc_info in doc_infos:
+            # Save metadata to a JSON file for tracking
+            metadata_path = doc_info.file_path + ".metadata.json"
+            with open(metadata_path, "w") as f:
+                json.dump({
+                    "id": doc_info.id,
+                    "name": doc_info.name,
+                    "description": doc_info.description,
+                    "document_type": doc_info.document_type.value,
+                    "metadata": doc_info.metadata,
+                    "created_at": doc_info.created_at.isoformat(),
+                    "updated_at": doc_info.updated_at.isoformat(),
+                    "file_path": doc_info.file_path
+                }, f, indent=2)
+
+        # Store document metadata in database
+        try:
+            with SessionLocal() as db:
+                from app.database.models import Document
+
+                for doc_info in doc_infos:
+                    db.add(Document(
+                        id=doc_info.id,
+                        name=doc_info.name,
+                        description=doc_info.description,
+                        document_type=doc_info.document_type.value,
+                        file_path=doc_info.file_path,
+                        doc_metadata=doc_info.metadata,
+                        created_at=doc_info.created_at,
+                        updated_at=doc_info.updated_at
+                    ))
+
+                db.commit()
+                logger.info(f"Stored metadata for {len(doc_infos)} document(s) in database")
+        except Exception as db_error:
+            logger.error(f"Error storing document in database: {str(db_error)}")
+            # Continue even if database storage fails
+            # The documents are still available in the file system
+
+    @staticmethod
+    async def add_document(
+            staged_path: str,
+            filename: str,
+            description: str,
+            doc_type: DocumentType,
+            metadata: Optional[Dict[str, Any]] = None,
+            sha256: Optional[str] = None
     ) -> Optional[DocumentInfo]:
         """
         Add a document to the knowledge base and database
 
+        If a document with the same content hash is already stored, it is
+        returned (flagged as duplicate) without parsing or embedding again;
+        a differing description or metadata is reported in `ignored_fields`.
+
         Args:
-            content: Raw document content
+            staged_path: Path of the staged upload on disk
             filename: Original filename
             description: Document description
             doc_type: Type of document
             metadata: Additional metadata
+            sha256: Hex digest of the file content
 
         Returns:
             Document info or None if failed
         """
         try:
-            # 1. Parse the document
-            text_content, file_path = DocumentParser.parse_document(content, filename, doc_type)
-
-            # 2. Extract metadata
-            file_metadata = DocumentParser.extract_metadata(file_path)
-
-            # 3. Combine with user-provided metadata
-            if metadata:
-                file_metadata.update(metadata)
-
-            # 4. Add description
-            file_metadata["description"] = description
+            # 0. Reuse the stored document for duplicate content
+            if sha256:
+                existing = DocumentService.find_document_by_hash(sha256)
+                if existing:
+                    logger.info(f"Duplicate upload of {filename}, reusing document {existing.id}")
+                    return DocumentService._duplicate_of(existing, description, metadata)
+
+            # 1. Parse the document and build its metadata
+            text_content, file_path, file_metadata = await asyncio.to_thread(
+                DocumentService._prepare_document,
+                staged_path, filename, description, doc_type, metadata, sha256
+            )
 
-            # 5. Add to vector store
-            ids = vector_store.add_documents([text_content], [file_metadata])
+            # 2. Add to vector store; embedding is CPU-bound, so keep it off the event loop
+            ids = await asyncio.to_thread(vector_store.add_documents, [text_content], [file_metadata])
 
             if not ids:
                 logger.error("Failed to add document to vector store")
                 return None
 
-            # 6. Create document info
+            # 3. Create document info
             doc_info = DocumentInfo(
                 id=ids[0],
                 name=filename,
@@ -72,45 +221,8 @@ class DocumentService:
                 file_path=file_path
             )
 
-            # 7. Save metadata to a JSON file for tracking
-            metadata_path = file_path + ".metadata.json"
-            with open(metadata_path, "w") as f:
-                json.dump({
-                    "id": ids[0],
-                    "name": filename,
-                    "description": description,
-                    "document_type": doc_type.value,
-                    "metadata": file_metadata,
-                    "created_at": doc_info.created_at.isoformat(),
-                    "updated_at": doc_info.updated_at.isoformat(),
-                    "file_path": file_path
-                }, f, indent=2)
-            
-            # 8. Store document metadata in database
-            try:
-                with SessionLocal() as db:
-                    from app.database.models import Document
-                    
-                    # Create document record
-                    db_document = Document(
-                        id=ids[0],
-                        name=filename,
-                        description=description,
-                        document_type=doc_type.value,
-                        file_path=file_path,
-                        doc_metadata=file_metadata,
-                        created_at=doc_info.created_at,
-                        updated_at=doc_info.updated_at
-                    )
-                    
-                    # Add to database
-                    db.add(db_document)
-                    db.commit()
-                    logger.info(f"Document metadata stored in database with ID: {ids[0]}")
-            except Exception as db_error:
-                logger.error(f"Error storing document in database: {str(db_error)}")
-                # Continue even if database storage fails
-                # The document is still available in the file system
+            # 4. Save metadata sidecar and database record
+            DocumentService._record_documents([doc_info])
 
             return doc_info
 
@@ -118,6 +230,141 @@ class DocumentService:
             logger.error(f"Error adding document: {str(e)}")
             return None
 
+    @staticmethod
+    async def add_documents_bulk(entries: List[Dict[str, Any]], description: str = "") -> List[BulkUploadResult]:
+        """
+        Add many documents to the knowledge base in one ingestion pass
+
+        Entries are parsed concurrently, then all extracted texts are embedded
+        and persisted together, and the database rows are committed once.
+        Content that is already stored (or repeated within the batch) is
+        reported as a duplicate of the existing document.
+
+        Args:
+            entries: List of dicts with "filename", "path" (staged upload) and "sha256" keys,
+                or "filename" and "error" for files rejected while staging
+            description: Description applied to every document
+
+        Returns:
+            One BulkUploadResult per entry, in input order
+        """
+        results: List[Optional[BulkUploadResult]] = [None] * len(entries)
+        semaphore = asyncio.Semaphore(BULK_INGEST_CONCURRENCY)
+        batch_primaries: Dict[str, int] = {}
+        batch_duplicates: List[Tuple[int, int]] = []
+
+        async def prepare(index: int, entry: Dict[str, Any]):
+            filename = entry["filename"]
+            if entry.get("error"):
+                # Rejected while staging, e.g. over the size limit
+                results[index] = BulkUploadResult(
+                    filename=filename,
+                    success=False,
+                    error=entry["error"]
+                )
+                return None
+
+            doc_type = DocumentParser.detect_document_type(filename)
+            if doc_type is None:
+                results[index] = BulkUploadResult(
+                    filename=filename,
+                    success=False,
+                    error="Unsupported file type"
+                )
+                return None
+
+            sha256 = entry.get("sha256")
+            if sha256:
+                existing = DocumentService.find_document_by_hash(sha256)
+                if existing:
+                    results[index] = BulkUploadResult(
+                        filename=filename,
+                        document_type=existing.document_type,
+                        success=True,
+                        document=DocumentService._duplicate_of(existing, description)
+                    )
+                    return None
+
+                # Identical files within the same batch are only ingested once, whatever their names
+                if sha256 in batch_primaries:
+                    batch_duplicates.append((index, batch_primaries[sha256]))
+                    return None
+                batch_primaries[sha256] = index
+
+            try:
+                async with semaphore:
+                    # Parsing is blocking (disk IO, pypdf, pandas) so run it off the event loop
+                    prepared = await asyncio.to_thread(
+                        DocumentService._prepare_document,
+                        entry["path"], filename, description, doc_type, None, sha256
+                    )
+                return index, doc_type, prepared
+            except Exception as e:
+                logger.error(f"Error parsing {filename} during bulk upload: {str(e)}")
+                results[index] = BulkUploadResult(
+                    filename=filename,
+                    document_type=doc_type,
+                    success=False,
+                    error=str(e)
+                )
+                return None
+
+        prepared_entries = [
+            item for item in await asyncio.gather(*(prepare(i, e) for i, e in enumerate(entries)))
+            if item is not None
+        ]
+
+        if prepared_entries:
+            # Shared embedding stage: a single add_texts call and a single persist
+            id_groups = await asyncio.to_thread(
+                vector_store.add_documents_batch,
+                [text_content for _, _, (text_content, _, _) in prepared_entries],
+                [file_metadata for _, _, (_, _, file_metadata) in prepared_entries],
+            )
+
+            doc_infos = []
+            for (index, doc_type, (_, file_path, file_metadata)), ids in zip(prepared_entries, id_groups):
+                filename = entries[index]["filename"]
+                if not ids:
+                    results[index] = BulkUploadResult(
+                        filename=filename,
+                        document_type=doc_type,
+                        success=False,
+                        error="Failed to add document to vector store"
+                    )
+                    continue
+
+                now = datetime.now()
+                doc_info = DocumentInfo(
+                    id=ids[0],
+                    name=filename,
+                    description=description,
+                    document_type=doc_type,
+                    metadata=file_metadata,
+                    created_at=now,
+                    updated_at=now,
+                    file_path=file_path
+                )
+                doc_infos.append(doc_info)
+                results[index] = BulkUploadResult(
+                    filename=filename,
+                    document_type=doc_type,
+                    success=True,
+                    document=doc_info
+                )
+
+            if doc_infos:
+                DocumentService._record_documents(doc_infos)
+
+        for index, primary_index in batch_duplicates:
+            primary = results[primary_index]
+            results[index] = primary.model_copy(update={
+                "filename": entries[index]["filename"],
+                "document": primary.document.model_copy(update={"duplicate": True}) if primary.document else None,
+            })
+
+        return results
+
     @staticmethod
     def get_product_data() -> List[Dict[str, Any]]:
         """
@@ -289,10 +536,14 @@ class DocumentService:
             
             # 3. Delete from vector store
             try:
-                # Delete from Chroma vector store
-                vector_store.db._collection.delete(ids=[document_id])
-                vector_store.db.persist()
-                logger.info(f"Document with ID {document_id} deleted from vector store")
+                # Delete from Chroma vector store, every chunk when the content hash is known
+                sha256 = (document_info.get("metadata") or {}).get("sha256")
+                if sha256:
+                    deleted = vector_store.delete_documents(where={"sha256": sha256})
+                else:
+                    deleted = vector_store.delete_documents(ids=[document_id])
+                if deleted:
+                    logger.info(f"Document with ID {document_id} deleted from vector store")
             except Exception as vs_error:
                 logger.error(f"Error deleting document from vector store: {str(vs_error)}")
                 # Continue even if vector store deletion fails
@@ -0,0 +1,175 @@
+import json
+import asyncio
+import logging
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select
+
+from app.core.faq import faq_index
+from app.database.async_connection import AsyncSessionLocal, ASYNC_DB_ERRORS
+from app.models.schemas import FAQInfo, FAQCandidate
+
+logger = logging.getLogger(__name__)
+
+
+def _to_info(faq) -> FAQInfo:
+    return FAQInfo(
+        id=faq.id,
+        question=faq.question,
+        answer=faq.answer,
+        created_at=faq.created_at,
+        updated_at=faq.updated_at
+    )
+
+
+class FAQService:
+    """Service for managing FAQ entries and their embedding index"""
+
+    @staticmethod
+    async def load_index() -> None:
+        """Load every FAQ from the database into the in-memory index"""
+        from app.database.models import FAQ
+
+        try:
+            async with AsyncSessionLocal() as db:
+                faqs = (await db.execute(select(FAQ))).scalars().all()
+            rows = [{"id": faq.id, "question": faq.question, "answer": faq.answer} for faq in faqs]
+            await asyncio.to_thread(faq_index.load, rows)
+            logger.info(f"FAQ index loaded with {len(rows)} entries")
+        except Exception as e:
+            logger.error(f"Error loading FAQ index: {str(e)}")
+
+    @staticmethod
+    async def list_faqs() -> List[FAQInfo]:
+        """
+        Get all FAQ entries
+
+        Returns:
+            List of FAQs
+        """
+        from app.database.models import FAQ
+
+        try:
+            async with AsyncSessionLocal() as db:
+                faqs = (await db.execute(select(FAQ).order_by(FAQ.id))).scalars().all()
+            return [_to_info(faq) for faq in faqs]
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Error listing FAQs: {str(e)}")
+            return []
+
+    @staticmethod
+    async def add_faq(question: str, answer: str) -> Optional[FAQInfo]:
+        """
+        Store an FAQ and add it to the index
+
+        Args:
+            question: Canonical question
+            answer: Approved answer
+
+        Returns:
+            The stored FAQ, or None on error
+        """
+        from app.database.models import FAQ
+
+        try:
+            async with AsyncSessionLocal() as db:
+                faq = FAQ(question=question.strip(), answer=answer.strip())
+                db.add(faq)
+                await db.commit()
+                await db.refresh(faq)
+            await asyncio.to_thread(faq_index.add, faq.id, faq.question, faq.answer)
+            logger.info(f"Added FAQ {faq.id}: {faq.question}")
+            return _to_info(faq)
+        except Exception as e:
+            logger.error(f"Error adding FAQ: {str(e)}")
+            return None
+
+    @staticmethod
+    async def delete_faq(faq_id: int) -> bool:
+        """
+        Delete an FAQ
+
+        Args:
+            faq_id: FAQ ID
+
+        Returns:
+            True if the FAQ existed and was deleted
+        """
+        from app.database.models import FAQ
+
+        try:
+            async with AsyncSessionLocal() as db:
+                faq = await db.get(FAQ, faq_id)
+                if faq is None:
+                    return False
+                await db.delete(faq)
+                await db.commit()
+            faq_index.remove(faq_id)
+            return True
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Error deleting FAQ {faq_id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def parse_query_log(lines: Iterable[str]) -> List[str]:
+        """
+        Extract user queries from a chat log
+
+        Each line is either a JSON object (a chat request with "query", or a
+        message with "role" and "content") or a plain-text query.
+
+        Args:
+            lines: Log lines
+
+        Returns:
+            The user queries, repeats included
+        """
+        queries = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("query"):
+                    queries.append(str(record["query"]))
+                elif record.get("role") == "user" and record.get("content"):
+                    queries.append(str(record["content"]))
+                continue
+            queries.append(line)
+        return queries
+
+    @staticmethod
+    async def generate_candidates(
+            queries: List[str],
+            min_count: int = 2,
+            limit: int = 20,
+            draft_answers: bool = False
+    ) -> List[FAQCandidate]:
+        """
+        Propose FAQs from the most frequently asked logged queries
+
+        Args:
+            queries: Logged user queries
+            min_count: Minimum number of queries in a candidate
+            limit: Maximum number of candidates
+            draft_answers: Draft an answer for each candidate with the RAG pipeline
+
+        Returns:
+            Candidates for review, most asked first
+        """
+        clusters = await asyncio.to_thread(faq_index.cluster_queries, queries, min_count=min_count, limit=limit)
+        candidates = [FAQCandidate(**cluster) for cluster in clusters]
+
+        if draft_answers:
+            from app.core.rag_engine import rag_engine
+
+            # One at a time: drafting is an offline admin task and should not starve chat traffic
+            for candidate in candidates:
+                answer, _ = await asyncio.to_thread(rag_engine.process_query, candidate.question)
+                candidate.draft_answer = answer
+
+        return candidates
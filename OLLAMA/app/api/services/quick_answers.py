@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
+
+from app.core.intents import IntentMatch, STOCK_CHECK, PRICE_CHECK, GREETING, THANKS
+from app.core.catalog import product_catalog
+from app.core.faq import faq_index
+from app.core.metrics import record_cache
+from app.core.tracing import tracer
+from app.utils.db import DBService
+from app.models.schemas import ChatResponse
+
+logger = logging.getLogger(__name__)
+
+
+class QuickAnswerService:
+    """Deterministic answers for routed intents that need no retrieval or LLM call"""
+
+    def __init__(self):
+        self.db_service = DBService
+
+    @tracer.traced("quick_answer")
+    async def answer(self, match: IntentMatch, query: str) -> Optional[ChatResponse]:
+        """
+        Answer a routed query directly if its intent or an FAQ allows it
+
+        Args:
+            match: Routing decision from the intent router
+            query: The user's message
+
+        Returns:
+            The response, or None when the query needs the RAG path
+        """
+        if match.intent == STOCK_CHECK:
+            return await self.stock_check(match.slots)
+        if match.intent == PRICE_CHECK:
+            response = await self.price_check(match.slots)
+            return response or await self.faq_answer(query)
+        if match.intent == GREETING:
+            return self._reply("Hi there! How can I help you today? I can check prices, stock or your orders.")
+        if match.intent == THANKS:
+            return self._reply("You're welcome! Let me know if there's anything else I can help with.")
+        return await self.faq_answer(query)
+
+    async def faq_answer(self, query: str) -> Optional[ChatResponse]:
+        """Stored answer of the FAQ the query asks, if any"""
+        if not len(faq_index):
+            return None
+        try:
+            match = await asyncio.to_thread(faq_index.match, query)
+        except Exception as e:
+            logger.error(f"Error matching FAQ: {str(e)}")
+            return None
+        record_cache("faq", match is not None)
+        if match is None:
+            return None
+        logger.info(f"Answered from FAQ {match.faq_id} (similarity {match.score:.2f})")
+        return ChatResponse(answer=match.answer, context=None, sources=[f"faq:{match.faq_id}"])
+
+    async def stock_check(self, slots: Dict[str, Any]) -> ChatResponse:
+        """Handle stock check query"""
+        product = await self._find_product(slots)
+        if product is None:
+            return self._category_listing(slots, "availability") or self._not_found(slots, "check stock availability")
+
+        # Format response
+        response_parts = [f"Here's the availability information for {product['designation']}:"]
+
+        response_parts.append(f"\nStatus: {product['stock_status']}")
+        response_parts.append(f"Price: ${product['prix']:.2f}")
+
+        if product.get('category_name'):
+            response_parts.append(f"Category: {product['category_name']}")
+
+        if product.get('nbrPoint', 0) > 0:
+            response_parts.append(f"Reward Points: {product['nbrPoint']}")
+
+        return self._reply("\n".join(response_parts))
+
+    async def price_check(self, slots: Dict[str, Any]) -> Optional[ChatResponse]:
+        """Handle price query"""
+        product = await self._find_product(slots)
+        if product is None:
+            listing = self._category_listing(slots, "prices")
+            if listing is None and "product_name" not in slots:
+                # A price question about nothing in particular is better served by RAG
+                return None
+            return listing or self._not_found(slots, "look up a price")
+
+        answer = f"{product['designation']} costs ${product['prix']:.2f} ({product['stock_status']})."
+        if product.get('nbrPoint', 0) > 0:
+            answer += f" It also earns {product['nbrPoint']} reward points."
+        return self._reply(answer)
+
+    async def _find_product(self, slots: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if slots.get("product_id") is not None:
+            return await self.db_service.check_stock(product_id=slots["product_id"])
+        if slots.get("product_name"):
+            return await self.db_service.check_stock(product_name=slots["product_name"])
+        return None
+
+    def _category_listing(self, slots: Dict[str, Any], topic: str) -> Optional[ChatResponse]:
+        """List the products of a mentioned category"""
+        products: List[Dict[str, Any]] = []
+        for category_id in slots.get("category_ids", []):
+            products.extend(product_catalog.by_category(category_id))
+        if not products:
+            return None
+
+        products.sort(key=lambda p: p["designation"])
+        response_parts = [f"Here's the {topic} for {products[0].get('category_name') or 'that category'}:"]
+        for product in products[:5]:
+            response_parts.append(f"- {product['designation']}: ${product['prix']:.2f}, {product['stock_status']}")
+        return self._reply("\n".join(response_parts))
+
+    def _not_found(self, slots: Dict[str, Any], action: str) -> ChatResponse:
+        product_name = slots.get("product_name")
+        if not product_name:
+            return self._reply(f"I'd be happy to {action}. Which product are you interested in?")
+        return self._reply(
+            f"I couldn't find any product matching '{product_name}'. Could you please check the spelling or try a different product?"
+        )
+
+    @staticmethod
+    def _reply(answer: str) -> ChatResponse:
+        return ChatResponse(answer=answer, context=None, sources=None)
+
+
+# Create a singleton instance
+quick_answer_service = QuickAnswerService()
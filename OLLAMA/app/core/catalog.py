@@ -0,0 +1,360 @@
+import json
+import asyncio
+import logging
+from array import array
+from typing import Dict, List, Any, Optional, Set, FrozenSet
+
+from sqlalchemy import text
+
+from app.config import (
+    DATABASE_URL,
+    CATALOG_REFRESH_SECONDS,
+    CATALOG_NOTIFY_CHANNEL,
+    PRODUCT_SEARCH_MIN_SIMILARITY,
+    PRODUCT_SEARCH_LIMIT,
+)
+from app.database.async_connection import AsyncSessionLocal, ASYNC_DB_ERRORS
+from app.utils.search import normalize, trigrams, trigram_similarity, trigram_containment
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SELECT = """
+                 SELECT p.id,
+                        p.designation,
+                        p.description,
+                        p.prix,
+                        p."qteStock",
+                        p."seuilMin",
+                        p."nbrPoint",
+                        p."categoryId",
+                        c.name as category_name
+                 FROM "Produit" p
+                          LEFT JOIN "Category" c ON p."categoryId" = c.id
+                 WHERE p.deleted = FALSE
+                 """
+
+NO_CATEGORY = -1
+
+
+class ProductCatalog:
+    """
+    Process-local snapshot of the product catalog
+
+    Rows are kept as parallel per-field arrays with an id -> position index and
+    a category -> ids index, so stock and price lookups never touch the database.
+    The snapshot is loaded once and then updated row by row from change
+    notifications (see CatalogSync).
+    """
+
+    def __init__(self):
+        self.is_loaded = False
+        # Incremented on every change so derived structures know when to rebuild
+        self.version = 0
+        self._clear()
+
+    def _clear(self):
+        self.ids = array("q")
+        self.prices = array("d")
+        self.stock = array("q")
+        self.min_stock = array("q")
+        self.points = array("q")
+        self.category_ids = array("q")
+        self.designations: List[str] = []
+        self.descriptions: List[Optional[str]] = []
+        # Search keys precomputed per row
+        self.search_names: List[str] = []
+        self.name_trigrams: List[FrozenSet[str]] = []
+        self.category_names: Dict[int, str] = {}
+        self._positions: Dict[int, int] = {}
+        self._by_category: Dict[int, Set[int]] = {}
+        self._sorted_positions: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # Loading and incremental updates
+
+    def load_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """Replace the snapshot with the given product rows"""
+        self._clear()
+        for row in rows:
+            self._append(row)
+        self.is_loaded = True
+        self.version += 1
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert or update a single product row"""
+        product_id = row["id"]
+        position = self._positions.get(product_id)
+        if position is None:
+            self._append(row)
+        else:
+            self._unindex_category(product_id, self.category_ids[position])
+            self._write(position, row)
+        self._sorted_positions = None
+        self.version += 1
+
+    def remove(self, product_id: int) -> None:
+        """Remove a product (deleted or soft-deleted)"""
+        position = self._positions.pop(product_id, None)
+        if position is None:
+            return
+
+        self._unindex_category(product_id, self.category_ids[position])
+
+        # Swap the last row into the freed slot so the arrays stay dense
+        last = len(self.ids) - 1
+        if position != last:
+            for field in self._fields():
+                field[position] = field[last]
+            self._positions[self.ids[position]] = position
+        for field in self._fields():
+            field.pop()
+
+        self._sorted_positions = None
+        self.version += 1
+
+    def rename_category(self, category_id: int, name: Optional[str]) -> None:
+        """Apply a category name change"""
+        if name is None:
+            self.category_names.pop(category_id, None)
+        else:
+            self.category_names[category_id] = name
+        self.version += 1
+
+    def _fields(self):
+        return (self.ids, self.prices, self.stock, self.min_stock, self.points, self.category_ids,
+                self.designations, self.descriptions, self.search_names, self.name_trigrams)
+
+    def _append(self, row: Dict[str, Any]) -> None:
+        self.ids.append(row["id"])
+        self.prices.append(0.0)
+        self.stock.append(0)
+        self.min_stock.append(0)
+        self.points.append(0)
+        self.category_ids.append(NO_CATEGORY)
+        self.designations.append("")
+        self.descriptions.append(None)
+        self.search_names.append("")
+        self.name_trigrams.append(frozenset())
+        position = len(self.ids) - 1
+        self._positions[row["id"]] = position
+        self._write(position, row)
+
+    def _write(self, position: int, row: Dict[str, Any]) -> None:
+        category_id = row.get("categoryId")
+        category_id = NO_CATEGORY if category_id is None else category_id
+        self.prices[position] = float(row.get("prix") or 0)
+        self.stock[position] = int(row.get("qteStock") or 0)
+        self.min_stock[position] = int(row.get("seuilMin") or 0)
+        self.points[position] = int(row.get("nbrPoint") or 0)
+        self.category_ids[position] = category_id
+        self.designations[position] = row.get("designation") or ""
+        self.descriptions[position] = row.get("description")
+        self.search_names[position] = normalize(self.designations[position])
+        self.name_trigrams[position] = trigrams(self.designations[position])
+        if row.get("category_name") is not None and category_id != NO_CATEGORY:
+            self.category_names[category_id] = row["category_name"]
+        self._by_category.setdefault(category_id, set()).add(row["id"])
+
+    def _unindex_category(self, product_id: int, category_id: int) -> None:
+        ids = self._by_category.get(category_id)
+        if ids is not None:
+            ids.discard(product_id)
+            if not ids:
+                del self._by_category[category_id]
+
+    # Lookups
+
+    def _row(self, position: int) -> Dict[str, Any]:
+        """Materialise a row with the same keys the DB queries return"""
+        stock = self.stock[position]
+        min_stock = self.min_stock[position]
+        category_id = self.category_ids[position]
+        if stock > min_stock:
+            stock_status = "In Stock"
+        elif stock > 0:
+            stock_status = "Low Stock"
+        else:
+            stock_status = "Out of Stock"
+
+        return {
+            "id": self.ids[position],
+            "designation": self.designations[position],
+            "description": self.descriptions[position],
+            "prix": self.prices[position],
+            "qteStock": stock,
+            "seuilMin": min_stock,
+            "nbrPoint": self.points[position],
+            "categoryId": None if category_id == NO_CATEGORY else category_id,
+            "category_name": self.category_names.get(category_id),
+            "stock_status": stock_status,
+        }
+
+    def _ordered_positions(self) -> List[int]:
+        if self._sorted_positions is None:
+            self._sorted_positions = sorted(range(len(self.ids)), key=self.designations.__getitem__)
+        return self._sorted_positions
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Get a product by id"""
+        position = self._positions.get(product_id)
+        return None if position is None else self._row(position)
+
+    def search(self, name: str, limit: int = PRODUCT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Products ranked by how well their designation matches name
+
+        Mirrors DBService.search_products: designations containing the name come
+        first, then trigram matches above PRODUCT_SEARCH_MIN_SIMILARITY, which
+        tolerates typos.
+
+        Args:
+            name: Product name or fragment
+            limit: Maximum number of results
+
+        Returns:
+            Product rows with a "score" entry, best first
+        """
+        needle = normalize(name)
+        if not needle:
+            return []
+        query_trigrams = trigrams(needle)
+
+        ranked = []
+        for position in range(len(self.ids)):
+            target = self.name_trigrams[position]
+            contained = needle in self.search_names[position]
+            score = trigram_containment(query_trigrams, target)
+            if contained or score >= PRODUCT_SEARCH_MIN_SIMILARITY:
+                ranked.append((contained, score, trigram_similarity(query_trigrams, target), position))
+
+        ranked.sort(key=lambda item: (not item[0], -item[1], -item[2], self.designations[item[3]]))
+        results = []
+        for contained, score, _, position in ranked[:limit]:
+            row = self._row(position)
+            row["score"] = 1.0 if contained else round(score, 3)
+            results.append(row)
+        return results
+
+    def find_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """Best-ranked product for a name, or None"""
+        results = self.search(name, limit=1)
+        return results[0] if results else None
+
+    def list_products(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Products ordered by designation"""
+        positions = self._ordered_positions()
+        if limit is not None:
+            positions = positions[:limit]
+        return [self._row(position) for position in positions]
+
+    def by_category(self, category_id: int) -> List[Dict[str, Any]]:
+        """Products of a category"""
+        return [self._row(self._positions[product_id]) for product_id in self._by_category.get(category_id, ())]
+
+
+class CatalogSync:
+    """
+    Keeps a ProductCatalog in step with PostgreSQL
+
+    Row-level changes arrive through LISTEN on CATALOG_NOTIFY_CHANNEL (triggers
+    installed by app.database.migrations.install_catalog_triggers, which fire for
+    writes made by the Node backend too). Produit has no updatedAt column to use
+    as a watermark, so a periodic full reload is the safety net for missed
+    notifications or a database without the triggers.
+    """
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+        self._connection = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """Listen for changes, load the snapshot and schedule periodic reloads"""
+        # Listen first so changes made during the initial load are not missed
+        await self._listen()
+        await self.reload()
+        if CATALOG_REFRESH_SECONDS > 0:
+            self._refresh_task = asyncio.create_task(self._periodic_reload())
+
+    async def stop(self) -> None:
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        for task in list(self._pending):
+            task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def reload(self) -> None:
+        """Full snapshot reload"""
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(text(CATALOG_SELECT))).fetchall()
+            self.catalog.load_rows([dict(row._mapping) for row in rows])
+            logger.info(f"Product catalog loaded with {len(self.catalog)} products")
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Error loading product catalog: {str(e)}")
+
+    async def refresh_product(self, product_id: int) -> None:
+        """Re-read one product after a change notification"""
+        try:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(text(CATALOG_SELECT + " AND p.id = :product_id"),
+                                        {"product_id": product_id})).first()
+            if row is None:
+                self.catalog.remove(product_id)
+            else:
+                self.catalog.upsert(dict(row._mapping))
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Error refreshing product {product_id} in catalog: {str(e)}")
+
+    async def refresh_category(self, category_id: int) -> None:
+        """Re-read a category name after a change notification"""
+        try:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(text('SELECT name FROM "Category" WHERE id = :category_id'),
+                                        {"category_id": category_id})).first()
+            self.catalog.rename_category(category_id, row[0] if row else None)
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Error refreshing category {category_id} in catalog: {str(e)}")
+
+    async def _listen(self) -> None:
+        try:
+            import asyncpg
+            from app.database.async_connection import to_async_url
+
+            dsn = to_async_url(DATABASE_URL).replace("postgresql+asyncpg://", "postgresql://", 1)
+            self._connection = await asyncpg.connect(dsn, timeout=10)
+            await self._connection.add_listener(CATALOG_NOTIFY_CHANNEL, self._on_notification)
+            logger.info(f"Listening for catalog changes on {CATALOG_NOTIFY_CHANNEL}")
+        except Exception as e:
+            self._connection = None
+            logger.warning(f"Catalog change notifications unavailable, relying on periodic reload: {str(e)}")
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            change = json.loads(payload)
+            if change.get("table") == "Category":
+                coroutine = self.refresh_category(int(change["id"]))
+            else:
+                coroutine = self.refresh_product(int(change["id"]))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed catalog notification {payload!r}: {str(e)}")
+            return
+
+        task = asyncio.create_task(coroutine)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _periodic_reload(self) -> None:
+        while True:
+            await asyncio.sleep(CATALOG_REFRESH_SECONDS)
+            await self.reload()
+
+
+# Create singleton instances
+product_catalog = ProductCatalog()
+catalog_sync = CatalogSync(product_catalog)
@@ -0,0 +1,230 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Any
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
+
+from app.config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNK_TOKENS,
+    CHUNK_TOKEN_OVERLAP,
+    TOKEN_ENCODING,
+    DEFAULT_CHUNKING_STRATEGY,
+    CHUNKING_STRATEGY_BY_TYPE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends followed by whitespace, or blank lines between paragraphs
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+MARKDOWN_HEADERS = [("#", "h1"), ("##", "h2"), ("###", "h3")]
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        # The encoding file is downloaded on first use and may be unavailable offline
+        logger.warning(f"Could not load tiktoken encoding {TOKEN_ENCODING}, estimating tokens: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the configured tiktoken encoding"""
+    encoding = _get_encoding()
+    if encoding is None:
+        # Roughly four characters per token for English text
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class TextChunker:
+    """Base class for text chunking strategies"""
+
+    name = "base"
+
+    def split_text(self, text: str) -> List[str]:
+        raise NotImplementedError
+
+
+class CharacterChunker(TextChunker):
+    """Recursive splitter measured in characters (the original behaviour)"""
+
+    name = "character"
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+
+    def split_text(self, text: str) -> List[str]:
+        return self.splitter.split_text(text)
+
+
+class TokenChunker(TextChunker):
+    """Recursive splitter measured in tokens"""
+
+    name = "token"
+
+    def __init__(
+            self,
+            chunk_tokens: int = CHUNK_TOKENS,
+            chunk_overlap: int = CHUNK_TOKEN_OVERLAP,
+            length_function: Callable[[str], int] = count_tokens
+    ):
+        self.chunk_tokens = chunk_tokens
+        self.length_function = length_function
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    def split_text(self, text: str) -> List[str]:
+        return self.splitter.split_text(text)
+
+
+class SentenceChunker(TextChunker):
+    """Packs whole sentences into chunks up to a token budget"""
+
+    name = "sentence"
+
+    def __init__(
+            self,
+            chunk_tokens: int = CHUNK_TOKENS,
+            chunk_overlap: int = CHUNK_TOKEN_OVERLAP,
+            length_function: Callable[[str], int] = count_tokens
+    ):
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+        # Sentences longer than the budget fall back to token splitting
+        self.fallback = TokenChunker(chunk_tokens, chunk_overlap, length_function)
+
+    def split_text(self, text: str) -> List[str]:
+        chunks = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+
+            tokens = self.length_function(sentence)
+            if tokens > self.chunk_tokens:
+                if current:
+                    chunks.append(" ".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(self.fallback.split_text(sentence))
+                continue
+
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = self._overlap(current)
+
+            current.append(sentence)
+            current_tokens += tokens
+
+        if current:
+            chunks.append(" ".join(current))
+
+        return chunks
+
+    def _overlap(self, sentences: List[str]):
+        """Carry trailing sentences of the previous chunk, up to the overlap budget"""
+        carried: List[str] = []
+        carried_tokens = 0
+        for sentence in reversed(sentences):
+            tokens = self.length_function(sentence)
+            if carried_tokens + tokens > self.chunk_overlap:
+                break
+            carried.insert(0, sentence)
+            carried_tokens += tokens
+        return carried, carried_tokens
+
+
+class MarkdownChunker(TextChunker):
+    """Splits on markdown headings, then token-splits oversized sections"""
+
+    name = "markdown"
+
+    def __init__(
+            self,
+            chunk_tokens: int = CHUNK_TOKENS,
+            chunk_overlap: int = CHUNK_TOKEN_OVERLAP,
+            length_function: Callable[[str], int] = count_tokens
+    ):
+        self.header_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=MARKDOWN_HEADERS,
+            strip_headers=False,
+        )
+        self.chunk_tokens = chunk_tokens
+        self.length_function = length_function
+        self.section_splitter = TokenChunker(chunk_tokens, chunk_overlap, length_function)
+
+    def split_text(self, text: str) -> List[str]:
+        chunks = []
+        for section in self.header_splitter.split_text(text):
+            content = section.page_content
+            if self.length_function(content) <= self.chunk_tokens:
+                chunks.append(content)
+                continue
+
+            # Repeat the heading trail on continuation chunks so they stay attributable
+            trail = " > ".join(section.metadata[key] for _, key in MARKDOWN_HEADERS if key in section.metadata)
+            for i, piece in enumerate(self.section_splitter.split_text(content)):
+                chunks.append(piece if i == 0 or not trail else f"{trail}\n{piece}")
+
+        return chunks
+
+
+CHUNKERS = {
+    CharacterChunker.name: CharacterChunker,
+    TokenChunker.name: TokenChunker,
+    SentenceChunker.name: SentenceChunker,
+    MarkdownChunker.name: MarkdownChunker,
+}
+
+
+@lru_cache(maxsize=None)
+def get_chunker(strategy: str) -> TextChunker:
+    """
+    Get the chunker for a strategy name
+
+    Args:
+        strategy: One of "character", "token", "sentence" or "markdown"
+
+    Returns:
+        A shared chunker instance
+    """
+    if strategy not in CHUNKERS:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return CHUNKERS[strategy]()
+
+
+def chunker_for_metadata(metadata: Optional[Dict[str, Any]]) -> TextChunker:
+    """
+    Pick the chunker for a document from its metadata
+
+    An explicit "chunking" entry wins, then the per-DocumentType setting,
+    then the default strategy.
+
+    Args:
+        metadata: Document metadata
+
+    Returns:
+        The chunker to use
+    """
+    metadata = metadata or {}
+    strategy = metadata.get("chunking") or CHUNKING_STRATEGY_BY_TYPE.get(
+        metadata.get("document_type"), DEFAULT_CHUNKING_STRATEGY
+    )
+    return get_chunker(strategy)
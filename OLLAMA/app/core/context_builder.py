@@ -0,0 +1,175 @@
+import logging
+from typing import Dict, List, Any, NamedTuple, FrozenSet, Optional, Tuple
+
+from app.config import CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA, CONTEXT_DEDUP_THRESHOLD
+from app.core.chunking import count_tokens
+from app.utils.search import normalize
+
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT = "No relevant information found."
+
+# Words per shingle when comparing chunks
+SHINGLE_SIZE = 3
+
+
+class BuiltContext(NamedTuple):
+    """Prompt context and how it was assembled"""
+    text: str
+    documents: List[Dict[str, Any]]
+    tokens: int
+    candidates: int
+    duplicates: int
+
+
+def _shingles(text: str) -> FrozenSet[Tuple[str, ...]]:
+    words = normalize(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return frozenset((word,) for word in words)
+    return frozenset(tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def _jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _source(doc: Dict[str, Any], position: int) -> str:
+    return doc.get("metadata", {}).get("source", f"Document {position + 1}")
+
+
+def _document_key(doc: Dict[str, Any], position: int) -> str:
+    metadata = doc.get("metadata", {})
+    return metadata.get("sha256") or metadata.get("document_id") or _source(doc, position)
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """Concatenate neighbouring chunks, dropping the words the splitter repeated"""
+    first_words, second_words = first.split(), second.split()
+    for size in range(min(len(first_words), len(second_words)) // 2, 0, -1):
+        if first_words[-size:] == second_words[:size]:
+            return first + " " + " ".join(second_words[size:])
+    return first + "\n" + second
+
+
+class ContextBuilder:
+    """
+    Assembles retrieved chunks into prompt context under a token budget
+
+    Chunks are deduplicated by word-shingle similarity, selected by maximal
+    marginal relevance (relevance score against similarity to chunks already
+    taken) until the budget is spent, and neighbouring chunks of the same
+    document are merged back into one passage.
+    """
+
+    def __init__(
+            self,
+            token_budget: int = CONTEXT_TOKEN_BUDGET,
+            mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+            dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD
+    ):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.dedup_threshold = dedup_threshold
+
+    def build(self, documents: List[Dict[str, Any]], token_budget: Optional[int] = None) -> BuiltContext:
+        """
+        Build the context string for retrieved documents
+
+        Args:
+            documents: Search results, best first, with optional relevance_score
+            token_budget: Override of the configured budget
+
+        Returns:
+            The context and assembly statistics
+        """
+        budget = token_budget or self.token_budget
+        if not documents:
+            return BuiltContext(NO_CONTEXT, [], count_tokens(NO_CONTEXT), 0, 0)
+
+        candidates = []
+        for position, doc in enumerate(documents):
+            shingles = _shingles(doc["content"])
+            if any(_jaccard(shingles, kept["shingles"]) >= self.dedup_threshold for kept in candidates):
+                continue
+            relevance = doc.get("relevance_score")
+            candidates.append({
+                "position": position,
+                "doc": doc,
+                "shingles": shingles,
+                "relevance": relevance if relevance is not None else 1.0 / (1 + position),
+                "tokens": count_tokens(f"[Source: {_source(doc, position)}]\n{doc['content']}\n\n"),
+            })
+        duplicates = len(documents) - len(candidates)
+
+        selected = self._select(candidates, budget)
+        text, used = self._render(selected)
+        logger.debug(f"Context: {len(selected)}/{len(documents)} chunks, {duplicates} duplicates, {used} tokens")
+        return BuiltContext(text, [c["doc"] for c in selected], used, len(documents), duplicates)
+
+    def _select(self, candidates: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """Greedy MMR selection within the token budget"""
+        selected: List[Dict[str, Any]] = []
+        remaining = list(candidates)
+        used = 0
+
+        while remaining:
+            def mmr(candidate):
+                redundancy = max((_jaccard(candidate["shingles"], s["shingles"]) for s in selected), default=0.0)
+                return self.mmr_lambda * candidate["relevance"] - (1 - self.mmr_lambda) * redundancy
+
+            best = max(remaining, key=mmr)
+            remaining.remove(best)
+            if used + best["tokens"] <= budget:
+                selected.append(best)
+                used += best["tokens"]
+            elif not selected:
+                # Even the best chunk is too large: keep as much of it as fits
+                selected.append(self._truncated(best, budget))
+                break
+
+        return selected
+
+    def _truncated(self, candidate: Dict[str, Any], budget: int) -> Dict[str, Any]:
+        words = candidate["doc"]["content"].split()
+        keep = max(1, int(len(words) * budget / max(candidate["tokens"], 1)))
+        while keep > 1 and count_tokens(" ".join(words[:keep])) > budget:
+            keep = int(keep * 0.9)
+        doc = {**candidate["doc"], "content": " ".join(words[:keep])}
+        return {**candidate, "doc": doc, "tokens": budget}
+
+    def _render(self, selected: List[Dict[str, Any]]) -> Tuple[str, int]:
+        """Merge neighbouring chunks of a document and format with source headers"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for rank, candidate in enumerate(selected):
+            key = _document_key(candidate["doc"], candidate["position"])
+            groups.setdefault(key, []).append({**candidate, "rank": rank})
+
+        passages = []
+        for members in groups.values():
+            members.sort(key=lambda c: (c["doc"].get("metadata", {}).get("chunk_index", c["position"]), c["rank"]))
+            current = None
+            for member in members:
+                index = member["doc"].get("metadata", {}).get("chunk_index")
+                if current is not None and index is not None and current["last_index"] == index - 1:
+                    current["content"] = _join_overlapping(current["content"], member["doc"]["content"])
+                    current["last_index"] = index
+                    current["rank"] = min(current["rank"], member["rank"])
+                    continue
+                current = {
+                    "source": _source(member["doc"], member["position"]),
+                    "content": member["doc"]["content"],
+                    "last_index": index,
+                    "rank": member["rank"],
+                }
+                passages.append(current)
+
+        # Most relevant passages first
+        passages.sort(key=lambda p: p["rank"])
+        text = "\n\n".join(f"[Source: {p['source']}]\n{p['content']}" for p in passages)
+        return text, count_tokens(text)
+
+
+# Create a singleton instance
+context_builder = ContextBuilder()
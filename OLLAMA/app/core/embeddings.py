@@ -0,0 +1,273 @@
+import os
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    ONNX_MODEL_DIR,
+    EMBEDDING_ONNX_QUANTIZE,
+    EMBEDDING_ONNX_THREADS,
+    EMBEDDING_BATCH_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILE = "model.onnx"
+QUANTIZED_ONNX_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MANIFEST_FILE = "export.json"
+
+
+def onnx_model_path(model_name: str = EMBEDDING_MODEL, model_dir: str = ONNX_MODEL_DIR) -> str:
+    """Directory holding the ONNX export of a model"""
+    return os.path.join(model_dir, model_name.strip("/").replace("/", "__"))
+
+
+def quantize_onnx(export_dir: str) -> str:
+    """
+    Quantize the weights of an exported model to int8
+
+    Dynamic quantization stores the linear layer weights as int8 and
+    quantizes activations on the fly, so no calibration data is needed.
+
+    Args:
+        export_dir: Directory of the export
+
+    Returns:
+        Path of the quantized model file
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    path = os.path.join(export_dir, QUANTIZED_ONNX_FILE)
+    staging = f"{path}.{os.getpid()}.tmp"
+    quantize_dynamic(os.path.join(export_dir, ONNX_FILE), staging, weight_type=QuantType.QInt8)
+    os.replace(staging, path)
+    return path
+
+
+def export_onnx(
+        model_name: str = EMBEDDING_MODEL,
+        model_dir: str = ONNX_MODEL_DIR,
+        quantize: bool = EMBEDDING_ONNX_QUANTIZE
+) -> str:
+    """
+    Export a sentence-transformers model to ONNX
+
+    The transformer is exported up to its last hidden state, with dynamic
+    batch and sequence axes; pooling and normalization are done in numpy by
+    OnnxEmbeddings, following the pooling mode of the original model.
+
+    Args:
+        model_name: sentence-transformers model name or local path
+        model_dir: Root directory of ONNX exports
+        quantize: Also write an int8 quantized copy
+
+    Returns:
+        Directory of the export
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    target = onnx_model_path(model_name, model_dir)
+    os.makedirs(model_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".export-", dir=model_dir)
+
+    try:
+        model = SentenceTransformer(model_name, device="cpu")
+        transformer = model[0].auto_model.eval()
+        tokenizer = model.tokenizer
+        pooling = "cls" if getattr(model[1], "pooling_mode_cls_token", False) else "mean"
+
+        # A padded batch, so the attention mask is traced as an input rather than folded into constants
+        dummy = tokenizer(["an example sentence for tracing the model", "short"], padding=True, return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+        class LastHiddenState(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *inputs):
+                return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                LastHiddenState().eval(),
+                tuple(dummy[name] for name in input_names),
+                os.path.join(staging, ONNX_FILE),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        if quantize:
+            quantize_onnx(staging)
+
+        tokenizer.backend_tokenizer.save(os.path.join(staging, TOKENIZER_FILE))
+        manifest = {
+            "model_name": model_name,
+            "max_length": model.max_seq_length,
+            "pooling": pooling,
+            "normalize": True,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Several workers may export at once on first start; the first finished export wins
+        try:
+            os.rename(staging, target)
+            staging = None
+            logger.info(f"Exported {model_name} to ONNX at {target}")
+        except OSError:
+            logger.info(f"ONNX export of {model_name} already present at {target}")
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return target
+
+
+class OnnxEmbeddings:
+    """
+    Sentence embeddings from an ONNX export of the model, run with onnxruntime
+
+    Drop-in replacement of HuggingFaceEmbeddings (same LangChain interface,
+    same normalized vectors) without torch in the request path. The model is
+    exported on first use if no export exists yet.
+    """
+
+    def __init__(
+            self,
+            model_name: str = EMBEDDING_MODEL,
+            model_dir: str = ONNX_MODEL_DIR,
+            quantize: bool = EMBEDDING_ONNX_QUANTIZE,
+            threads: int = EMBEDDING_ONNX_THREADS,
+            batch_size: int = EMBEDDING_BATCH_SIZE
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        export_dir = onnx_model_path(model_name, model_dir)
+        if not os.path.exists(os.path.join(export_dir, MANIFEST_FILE)):
+            export_dir = export_onnx(model_name, model_dir, quantize)
+        path = os.path.join(export_dir, QUANTIZED_ONNX_FILE if quantize else ONNX_FILE)
+        if not os.path.exists(path):
+            path = quantize_onnx(export_dir)
+
+        with open(os.path.join(export_dir, MANIFEST_FILE), "r") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(export_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.manifest["max_length"])
+        self.tokenizer.enable_padding(pad_id=self.manifest["pad_token_id"], pad_token=self.manifest["pad_token"])
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        # Requests are parallel across threads already; one inter-op thread avoids oversubscription
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+        self.model_name = model_name
+        self.model_path = path
+        self.batch_size = batch_size
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        if self.manifest["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][:, :, None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.manifest["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into a (len(texts), dim) float32 array
+
+        Texts are sorted by length before batching, so each batch pads to
+        similar lengths instead of to the longest text of the input.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        result: Optional[np.ndarray] = None
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            vectors = self._embed_batch([texts[i] for i in indices])
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[indices] = vectors
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def create_embedding_model(backend: str = EMBEDDING_BACKEND):
+    """
+    Create the embedding model of the configured backend
+
+    Args:
+        backend: "torch" for sentence-transformers, "onnx" for onnxruntime
+
+    Returns:
+        An embedding model with the LangChain Embeddings interface
+    """
+    if backend == "onnx":
+        return OnnxEmbeddings()
+    if backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="sentence-transformers model name or path")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR, help="Root directory of ONNX exports")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 quantized copy")
+    parser.add_argument("--force", action="store_true", help="Replace an existing export")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    target = onnx_model_path(args.model, args.output)
+    if args.force and os.path.exists(target):
+        shutil.rmtree(target)
+    print(export_onnx(args.model, args.output, quantize=not args.no_quantize))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, NamedTuple, Tuple
+
+from app.core.catalog import ProductCatalog, product_catalog
+from app.utils.search import normalize
+
+logger = logging.getLogger(__name__)
+
+# Single words too generic to identify a product on their own
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "you", "your", "have", "has", "are", "can", "new", "pro", "max", "mini", "plus",
+    "set", "kit", "pack", "size", "color", "colour", "black", "white", "blue", "red", "green", "grey", "gray",
+})
+
+# Longest sub-phrase of a designation indexed as a product alias, in tokens
+MAX_ALIAS_TOKENS = 6
+
+_TERMINAL = ""
+
+
+class EntityMention(NamedTuple):
+    """A catalog entity found in a query"""
+    text: str
+    start: int
+    end: int
+    # Products whose designation contains the phrase, and those equal to it
+    product_ids: Tuple[int, ...]
+    exact_product_ids: Tuple[int, ...]
+    category_ids: Tuple[int, ...]
+
+    @property
+    def product_id(self) -> Optional[int]:
+        """The product this mention identifies unambiguously, if any"""
+        if len(self.exact_product_ids) == 1:
+            return self.exact_product_ids[0]
+        if len(self.product_ids) == 1:
+            return self.product_ids[0]
+        return None
+
+
+def _build_trie(products: List[Tuple[int, str]], categories: List[Tuple[int, str]]) -> Dict[str, Any]:
+    """
+    Token trie over product designations, their sub-phrases and category names
+
+    Each terminal node holds (product_ids, exact_product_ids, category_ids).
+    """
+    payloads: Dict[Tuple[str, ...], Tuple[set, set, set]] = {}
+
+    def payload(phrase: Tuple[str, ...]):
+        if phrase not in payloads:
+            payloads[phrase] = (set(), set(), set())
+        return payloads[phrase]
+
+    for product_id, designation in products:
+        tokens = tuple(normalize(designation).split())
+        if not tokens:
+            continue
+        payload(tokens)[1].add(product_id)
+        # Customers rarely type the whole designation, so index its sub-phrases too
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(len(tokens), start + MAX_ALIAS_TOKENS) + 1):
+                phrase = tokens[start:end]
+                if len(phrase) == 1 and (len(phrase[0]) < 3 or phrase[0] in STOPWORDS or phrase[0].isdigit()):
+                    continue
+                payload(phrase)[0].add(product_id)
+
+    for category_id, name in categories:
+        tokens = tuple(normalize(name).split())
+        if tokens:
+            payload(tokens)[2].add(category_id)
+            # "phones" should also find the "Phone" category and vice versa
+            singular = tokens[:-1] + (tokens[-1].rstrip("s"),)
+            plural = tokens[:-1] + (tokens[-1] + "s",)
+            for variant in (singular, plural):
+                if variant != tokens and variant[-1]:
+                    payload(variant)[2].add(category_id)
+
+    root: Dict[str, Any] = {}
+    for phrase, (product_ids, exact_ids, category_ids) in payloads.items():
+        node = root
+        for token in phrase:
+            node = node.setdefault(token, {})
+        node[_TERMINAL] = (tuple(sorted(product_ids | exact_ids)), tuple(sorted(exact_ids)), tuple(sorted(category_ids)))
+    return root
+
+
+class ProductEntityMatcher:
+    """
+    Finds product and category mentions in chat queries
+
+    A token trie compiled from the catalog is walked once over the normalised
+    query (case and accents folded), taking the longest match at each position.
+    When the catalog version changes the trie is rebuilt in a worker thread
+    while the previous one keeps serving.
+    """
+
+    def __init__(self, catalog: ProductCatalog):
+        self.catalog = catalog
+        self._trie: Optional[Dict[str, Any]] = None
+        self._built_version = -1
+        self._rebuild_task: Optional[asyncio.Future] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._trie is not None
+
+    def _snapshot(self):
+        """Copy what the build needs, so it can run off the event loop"""
+        products = list(zip(self.catalog.ids, self.catalog.designations))
+        categories = list(self.catalog.category_names.items())
+        return self.catalog.version, products, categories
+
+    def rebuild(self) -> None:
+        """Rebuild the trie synchronously"""
+        version, products, categories = self._snapshot()
+        self._install(version, _build_trie(products, categories))
+
+    def _install(self, version: int, trie: Dict[str, Any]) -> None:
+        self._trie = trie
+        self._built_version = version
+        logger.info(f"Product entity matcher built for catalog version {version}")
+
+    def _ensure_current(self) -> None:
+        if not self.catalog.is_loaded or self._built_version == self.catalog.version:
+            return
+        if self._trie is None:
+            # Nothing to serve yet: the first build happens inline
+            self.rebuild()
+            return
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.rebuild()
+            return
+
+        version, products, categories = self._snapshot()
+
+        async def rebuild_in_background():
+            try:
+                trie = await asyncio.to_thread(_build_trie, products, categories)
+                self._install(version, trie)
+            except Exception as e:
+                logger.error(f"Error rebuilding product entity matcher: {str(e)}")
+
+        self._rebuild_task = loop.create_task(rebuild_in_background())
+
+    def find(self, query: str) -> List[EntityMention]:
+        """
+        Find catalog mentions in a query
+
+        Args:
+            query: The user's message
+
+        Returns:
+            Non-overlapping mentions in query order
+        """
+        self._ensure_current()
+        trie = self._trie
+        if trie is None:
+            return []
+
+        tokens = normalize(query).split()
+        mentions = []
+        i = 0
+        while i < len(tokens):
+            node = trie
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    best = (j, node[_TERMINAL])
+            if best is None:
+                i += 1
+                continue
+
+            end, (product_ids, exact_ids, category_ids) = best
+            mentions.append(EntityMention(" ".join(tokens[i:end]), i, end, product_ids, exact_ids, category_ids))
+            i = end
+        return mentions
+
+    def best_product(self, query: str) -> Optional[EntityMention]:
+        """The longest product mention in a query, preferring unambiguous ones"""
+        return self.best_of(self.find(query))
+
+    @staticmethod
+    def best_of(mentions: List[EntityMention]) -> Optional[EntityMention]:
+        """The longest product mention among already found mentions"""
+        mentions = [m for m in mentions if m.product_ids]
+        if not mentions:
+            return None
+        return max(mentions, key=lambda m: (m.product_id is not None, m.end - m.start, -len(m.product_ids)))
+
+    def categories(self, query: str) -> List[int]:
+        """Category ids mentioned in a query"""
+        return [category_id for m in self.find(query) for category_id in m.category_ids]
+
+    def mentioned_products(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Catalog rows for the products and categories mentioned in a query
+
+        Args:
+            query: The user's message
+            limit: Maximum number of products
+
+        Returns:
+            Product rows, direct mentions first
+        """
+        mentions = self.find(query)
+        product_ids: List[int] = []
+        for mention in mentions:
+            product_ids.extend(mention.exact_product_ids or mention.product_ids)
+        for mention in mentions:
+            for category_id in mention.category_ids:
+                product_ids.extend(p["id"] for p in self.catalog.by_category(category_id))
+
+        products = []
+        for product_id in dict.fromkeys(product_ids):
+            product = self.catalog.get(product_id)
+            if product is not None:
+                products.append(product)
+            if len(products) >= limit:
+                break
+        return products
+
+
+# Create a singleton instance
+product_matcher = ProductEntityMatcher(product_catalog)
@@ -0,0 +1,198 @@
+import logging
+from collections import Counter
+from typing import Dict, List, Any, Optional, NamedTuple, Tuple
+
+from app.config import FAQ_MATCH_THRESHOLD, FAQ_CLUSTER_THRESHOLD
+from app.utils.search import normalize
+
+logger = logging.getLogger(__name__)
+
+# Example queries kept per FAQ candidate
+CANDIDATE_EXAMPLES = 5
+
+
+class FAQMatch(NamedTuple):
+    """A canonical question matched by a query"""
+    faq_id: int
+    question: str
+    answer: str
+    score: float
+
+
+def _unit_rows(vectors):
+    import numpy as np
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FAQIndex:
+    """
+    In-memory embedding index of canonical FAQ questions
+
+    Questions are embedded once when added and kept as one normalized matrix,
+    so matching a query costs a single query embedding and a matrix-vector
+    product. Queries that equal a canonical question after normalization are
+    answered without embedding at all.
+    """
+
+    def __init__(self, threshold: float = FAQ_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._exact: Dict[str, int] = {}
+        # (faq ids, question matrix) swapped as a whole so readers never see a partial update
+        self._index: Tuple[List[int], Any] = ([], None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _embedding_model(self):
+        # Reuse the model already loaded for retrieval
+        from app.core.vector_store import vector_store
+        return vector_store.embedding_model
+
+    def load(self, faqs: List[Dict[str, Any]]) -> None:
+        """
+        Replace the index contents
+
+        Args:
+            faqs: Rows with id, question and answer
+        """
+        entries = {faq["id"]: {"question": faq["question"], "answer": faq["answer"]} for faq in faqs}
+        ids = list(entries)
+        matrix = None
+        if ids:
+            matrix = _unit_rows(self._embedding_model().embed_documents([entries[i]["question"] for i in ids]))
+        self._entries = entries
+        self._exact = {normalize(entry["question"]): faq_id for faq_id, entry in entries.items()}
+        self._index = (ids, matrix)
+
+    def add(self, faq_id: int, question: str, answer: str) -> None:
+        """Add or replace one FAQ"""
+        import numpy as np
+
+        self.remove(faq_id)
+        vector = _unit_rows([self._embedding_model().embed_query(question)])
+        ids, matrix = self._index
+        self._entries[faq_id] = {"question": question, "answer": answer}
+        self._exact[normalize(question)] = faq_id
+        self._index = (ids + [faq_id], vector if matrix is None else np.vstack([matrix, vector]))
+
+    def remove(self, faq_id: int) -> None:
+        """Drop an FAQ from the index"""
+        import numpy as np
+
+        entry = self._entries.pop(faq_id, None)
+        if entry is None:
+            return
+        self._exact.pop(normalize(entry["question"]), None)
+        ids, matrix = self._index
+        position = ids.index(faq_id)
+        remaining = ids[:position] + ids[position + 1:]
+        self._index = (remaining, np.delete(matrix, position, axis=0) if remaining else None)
+
+    def _best(self, vector) -> Tuple[Optional[int], float]:
+        ids, matrix = self._index
+        if matrix is None:
+            return None, 0.0
+        similarities = matrix @ vector
+        best = int(similarities.argmax())
+        return ids[best], float(similarities[best])
+
+    def match(self, query: str) -> Optional[FAQMatch]:
+        """
+        Find the canonical question a query asks
+
+        Args:
+            query: The user's message
+
+        Returns:
+            The matched FAQ, or None when no question reaches the threshold
+        """
+        if not self._entries:
+            return None
+
+        faq_id = self._exact.get(normalize(query))
+        score = 1.0
+        if faq_id is None:
+            vector = _unit_rows([self._embedding_model().embed_query(query)])[0]
+            faq_id, score = self._best(vector)
+            if faq_id is None or score < self.threshold:
+                return None
+
+        entry = self._entries.get(faq_id)
+        if entry is None:
+            return None
+        return FAQMatch(faq_id, entry["question"], entry["answer"], score)
+
+    def cluster_queries(
+            self,
+            queries: List[str],
+            threshold: float = FAQ_CLUSTER_THRESHOLD,
+            min_count: int = 2,
+            limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Group logged queries into FAQ candidates
+
+        Distinct queries are embedded in one batch and clustered greedily, most
+        frequent first: a query joins the first cluster whose representative it
+        is similar enough to, otherwise it starts a new one. Clusters already
+        answered by an FAQ are left out.
+
+        Args:
+            queries: Logged user queries, repeats included
+            threshold: Cosine similarity for joining a cluster
+            min_count: Minimum number of queries in a candidate
+            limit: Maximum number of candidates
+
+        Returns:
+            Candidates with question, count and examples, most asked first
+        """
+        import numpy as np
+
+        counts: Counter = Counter()
+        originals: Dict[str, str] = {}
+        for query in queries:
+            key = normalize(query)
+            if not key:
+                continue
+            counts[key] += 1
+            originals.setdefault(key, query.strip())
+        if not counts:
+            return []
+
+        keys = [key for key, _ in counts.most_common()]
+        vectors = _unit_rows(self._embedding_model().embed_documents([originals[key] for key in keys]))
+
+        representatives: List[int] = []
+        clusters: List[Dict[str, Any]] = []
+        for position, key in enumerate(keys):
+            if representatives:
+                similarities = vectors[representatives] @ vectors[position]
+                best = int(similarities.argmax())
+                if similarities[best] >= threshold:
+                    clusters[best]["count"] += counts[key]
+                    clusters[best]["examples"].append(originals[key])
+                    continue
+            representatives.append(position)
+            clusters.append({"question": originals[key], "count": counts[key], "examples": [originals[key]]})
+
+        candidates = []
+        for representative, cluster in zip(representatives, clusters):
+            if cluster["count"] < min_count:
+                continue
+            faq_id, score = self._best(vectors[representative])
+            if faq_id is not None and score >= self.threshold:
+                continue
+            cluster["examples"] = cluster["examples"][:CANDIDATE_EXAMPLES]
+            candidates.append(cluster)
+
+        candidates.sort(key=lambda c: c["count"], reverse=True)
+        return candidates[:limit]
+
+
+# Create a singleton instance
+faq_index = FAQIndex()
@@ -0,0 +1,236 @@
+import queue
+import socket
+import logging
+import itertools
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config import INDEX_SOCKET_PATH, INDEX_SIDECAR_TIMEOUT, TOP_K_RESULTS
+from app.core.index_protocol import (
+    OP_PING,
+    OP_EMBED,
+    OP_SEARCH,
+    OP_ADD,
+    OP_DELETE,
+    OP_ERROR,
+    IndexSidecarError,
+    pack_frame,
+    read_frame,
+    encode_texts,
+    encode_search,
+    encode_json,
+    decode_vectors,
+    decode_json,
+)
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class IndexClient:
+    """
+    Blocking client of the index sidecar
+
+    Connections are pooled and each carries one request at a time, so the
+    client can be shared by the threads of asyncio.to_thread. Concurrent
+    requests from every worker are batched on the sidecar side.
+    """
+
+    def __init__(self, socket_path: str = INDEX_SOCKET_PATH, timeout: float = INDEX_SIDECAR_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        self._request_ids = itertools.count(1)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise IndexSidecarError(f"Cannot connect to the index sidecar at {self.socket_path}: {str(e)}")
+        return sock
+
+    def request(self, op: int, body: bytes = b"") -> Tuple[int, bytes]:
+        """
+        Send one request and wait for its reply
+
+        Args:
+            op: Request operation
+            body: Encoded request body
+
+        Returns:
+            Tuple of (reply operation, reply body)
+        """
+        try:
+            sock = self._idle.get_nowait()
+        except queue.Empty:
+            sock = self._connect()
+
+        request_id = next(self._request_ids) & 0xFFFFFFFF
+        try:
+            sock.sendall(pack_frame(op, request_id, body))
+            reply_op, reply_id, reply = read_frame(sock)
+            if reply_id != request_id:
+                raise IndexSidecarError(f"Reply {reply_id} does not match request {request_id}")
+        except BaseException as e:
+            # The stream may be mid-frame; never reuse it
+            sock.close()
+            if isinstance(e, OSError):
+                raise IndexSidecarError(f"Index sidecar request failed: {str(e)}")
+            raise
+        self._idle.put(sock)
+
+        if reply_op == OP_ERROR:
+            raise IndexSidecarError(reply.decode("utf-8", errors="replace"))
+        return reply_op, reply
+
+    def ping(self) -> bool:
+        try:
+            self.request(OP_PING)
+            return True
+        except IndexSidecarError:
+            return False
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of the texts as a (len(texts), dim) float32 array"""
+        _, reply = self.request(OP_EMBED, encode_texts(texts))
+        return decode_vectors(reply)
+
+    def search(self, queries: List[str], k: int) -> List[List[Dict[str, Any]]]:
+        _, reply = self.request(OP_SEARCH, encode_search(queries, k))
+        return decode_json(reply)
+
+    def add(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]], batch: bool) -> Any:
+        _, reply = self.request(OP_ADD, encode_json({"texts": texts, "metadatas": metadatas, "batch": batch}))
+        return decode_json(reply)
+
+    def delete(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> bool:
+        _, reply = self.request(OP_DELETE, encode_json({"ids": ids, "where": where}))
+        return bool(decode_json(reply))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class RemoteEmbeddings:
+    """Embedding model served by the index sidecar, with the LangChain Embeddings interface"""
+
+    def __init__(self, client: IndexClient):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.client.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed([text])[0].tolist()
+
+
+class RemoteVectorStore:
+    """
+    Drop-in replacement of VectorStore that forwards to the index sidecar
+
+    Workers using it load neither the embedding model nor Chroma, and every
+    write goes through the single sidecar process.
+    """
+
+    def __init__(self, socket_path: str = INDEX_SOCKET_PATH, timeout: float = INDEX_SIDECAR_TIMEOUT):
+        self.client = IndexClient(socket_path, timeout)
+        self.embedding_model = RemoteEmbeddings(self.client)
+
+    @tracer.traced("vector_store.search")
+    def search(self, query: str, k: int = TOP_K_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Search for similar documents
+
+        Args:
+            query: The search query
+            k: Number of results to return
+
+        Returns:
+            List of documents with their content and metadata
+        """
+        try:
+            return self.client.search([query], k)[0]
+        except Exception as e:
+            logger.error(f"Error searching vector store: {str(e)}")
+            return []
+
+    @tracer.traced("vector_store.search_batch")
+    def search_batch(self, queries: List[str], k: int = TOP_K_RESULTS) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once
+
+        Args:
+            queries: The search queries
+            k: Number of results to return per query
+
+        Returns:
+            One result list per query, in the same order (empty lists on failure)
+        """
+        if not queries:
+            return []
+        try:
+            return self.client.search(queries, k)
+        except Exception as e:
+            logger.error(f"Error batch searching vector store: {str(e)}")
+            return [[] for _ in queries]
+
+    def add_documents(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """
+        Add documents to the vector store
+
+        Args:
+            texts: List of document texts
+            metadatas: List of metadata dictionaries for each document
+
+        Returns:
+            List of document IDs
+        """
+        try:
+            return self.client.add(texts, metadatas, batch=False)
+        except Exception as e:
+            logger.error(f"Error adding documents to vector store: {str(e)}")
+            return []
+
+    def add_documents_batch(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Add several documents with a single embedding pass and a single persist
+
+        Args:
+            texts: List of document texts
+            metadatas: List of metadata dictionaries, one per document
+
+        Returns:
+            List of chunk ID lists, one per input document (empty lists on failure)
+        """
+        try:
+            return self.client.add(texts, metadatas, batch=True)
+        except Exception as e:
+            logger.error(f"Error adding document batch to vector store: {str(e)}")
+            return [[] for _ in texts]
+
+    def delete_documents(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Delete chunks by ID or by metadata filter
+
+        Args:
+            ids: Chunk IDs to delete
+            where: Metadata filter, e.g. {"sha256": ...} for every chunk of a document
+
+        Returns:
+            True if the deletion was persisted
+        """
+        try:
+            return self.client.delete(ids, where)
+        except Exception as e:
+            logger.error(f"Error deleting documents from vector store: {str(e)}")
+            return False
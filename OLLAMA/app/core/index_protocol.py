@@ -0,0 +1,112 @@
+import json
+import socket
+import struct
+from typing import List, Any, Tuple
+
+import numpy as np
+
+# Wire format between API workers and the index sidecar
+#
+# Every frame is a header (body length, operation, request ID) followed by
+# the body. Vectors travel as raw little-endian float32 rows; text lists are
+# length-prefixed UTF-8; search results, chunk metadata and write requests,
+# whose shape varies, are JSON.
+HEADER = struct.Struct("!IBI")
+_COUNT = struct.Struct("!I")
+_SHAPE = struct.Struct("!II")
+
+# Request operations
+OP_PING = 0
+OP_EMBED = 1  # texts -> vectors
+OP_SEARCH = 2  # k + queries -> results
+OP_ADD = 3  # JSON {texts, metadatas, batch} -> JSON ids
+OP_DELETE = 4  # JSON {ids, where} -> JSON bool
+
+# Reply operations
+OP_VECTORS = 64
+OP_JSON = 65
+OP_ERROR = 255
+
+# Upper bound of a frame body, so a corrupt header cannot trigger a huge read
+MAX_BODY_SIZE = 256 * 1024 * 1024
+
+
+class IndexSidecarError(Exception):
+    """Raised when the index sidecar cannot be reached or reports an error"""
+
+
+def pack_frame(op: int, request_id: int, body: bytes = b"") -> bytes:
+    return HEADER.pack(len(body), op, request_id) + body
+
+
+def unpack_header(header: bytes) -> Tuple[int, int, int]:
+    """(body length, operation, request ID) of a frame header"""
+    length, op, request_id = HEADER.unpack(header)
+    if length > MAX_BODY_SIZE:
+        raise IndexSidecarError(f"Frame of {length} bytes exceeds the {MAX_BODY_SIZE} byte limit")
+    return length, op, request_id
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise IndexSidecarError("Index sidecar closed the connection")
+        received += count
+    return bytes(buffer)
+
+
+def read_frame(sock: socket.socket) -> Tuple[int, int, bytes]:
+    """Read one frame from a blocking socket as (operation, request ID, body)"""
+    length, op, request_id = unpack_header(_recv_exactly(sock, HEADER.size))
+    return op, request_id, _recv_exactly(sock, length) if length else b""
+
+
+def encode_texts(texts: List[str]) -> bytes:
+    parts = [_COUNT.pack(len(texts))]
+    for text in texts:
+        encoded = text.encode("utf-8")
+        parts.append(_COUNT.pack(len(encoded)))
+        parts.append(encoded)
+    return b"".join(parts)
+
+
+def decode_texts(body: bytes, offset: int = 0) -> List[str]:
+    (count,), offset = _COUNT.unpack_from(body, offset), offset + _COUNT.size
+    texts = []
+    for _ in range(count):
+        (size,), offset = _COUNT.unpack_from(body, offset), offset + _COUNT.size
+        texts.append(body[offset:offset + size].decode("utf-8"))
+        offset += size
+    return texts
+
+
+def encode_search(queries: List[str], k: int) -> bytes:
+    return _COUNT.pack(k) + encode_texts(queries)
+
+
+def decode_search(body: bytes) -> Tuple[List[str], int]:
+    (k,) = _COUNT.unpack_from(body)
+    return decode_texts(body, _COUNT.size), k
+
+
+def encode_vectors(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    rows, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+    return _SHAPE.pack(rows, dim) + vectors.tobytes()
+
+
+def decode_vectors(body: bytes) -> np.ndarray:
+    rows, dim = _SHAPE.unpack_from(body)
+    return np.frombuffer(body, dtype="<f4", count=rows * dim, offset=_SHAPE.size).reshape(rows, dim)
+
+
+def encode_json(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def decode_json(body: bytes) -> Any:
+    return json.loads(body.decode("utf-8"))
@@ -0,0 +1,240 @@
+import os
+import asyncio
+import logging
+import argparse
+from typing import Callable, List, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config import INDEX_SOCKET_PATH, INDEX_BATCH_WINDOW_MS, INDEX_BATCH_MAX, VECTOR_STORE_SNAPSHOT
+from app.core.index_protocol import (
+    OP_PING,
+    OP_EMBED,
+    OP_SEARCH,
+    OP_ADD,
+    OP_DELETE,
+    OP_VECTORS,
+    OP_JSON,
+    OP_ERROR,
+    HEADER,
+    pack_frame,
+    unpack_header,
+    decode_texts,
+    decode_search,
+    encode_vectors,
+    encode_json,
+    decode_json,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Batcher:
+    """
+    Coalesces requests into one call of a batch function
+
+    Requests arriving within the window, or while the previous batch is
+    still running, are handed to the batch function together; its results
+    are split back to the callers in order.
+    """
+
+    def __init__(self, run: Callable[[List[Any]], List[Any]], window: float, max_size: int):
+        self._run = run
+        self._window = window
+        self._max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, request: Any, size: int = 1) -> Any:
+        """Queue a request counting `size` items toward the batch limit and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((request, size, future))
+        return await future
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            total = batch[0][1]
+            deadline = loop.time() + self._window
+            while total < self._max_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                total += item[1]
+
+            try:
+                results = await asyncio.to_thread(self._run, [request for request, _, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class IndexSidecar:
+    """
+    Process owning the embedding model and the vector index
+
+    API workers connect over a Unix socket (see app.core.index_protocol).
+    Embedding and search requests from every connection are batched into one
+    model forward pass and one index query; writes are serialized, so the
+    persist directory only ever has one writer.
+    """
+
+    def __init__(
+            self,
+            store,
+            socket_path: str = INDEX_SOCKET_PATH,
+            batch_window: float = INDEX_BATCH_WINDOW_MS / 1000,
+            batch_max: int = INDEX_BATCH_MAX
+    ):
+        self.store = store
+        self.socket_path = socket_path
+        self._embed_batcher = _Batcher(self._embed_batch, batch_window, batch_max)
+        self._search_batcher = _Batcher(self._search_batch, batch_window, batch_max)
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Listen on the socket, replacing a stale socket file of a previous run"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._write_lock = asyncio.Lock()
+        self._embed_batcher.start()
+        self._search_batcher.start()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        # Workers run as the same user or group; nobody else may query or write the index
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Index sidecar listening on {self.socket_path}")
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self._embed_batcher.stop()
+        await self._search_batcher.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                length, op, request_id = unpack_header(await reader.readexactly(HEADER.size))
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    reply_op, reply = await self._dispatch(op, body)
+                except Exception as e:
+                    logger.error(f"Error handling index request {op}: {str(e)}")
+                    reply_op, reply = OP_ERROR, str(e).encode("utf-8")
+                writer.write(pack_frame(reply_op, request_id, reply))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            # The worker closed its connection
+            pass
+        except Exception as e:
+            logger.error(f"Index sidecar connection failed: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, op: int, body: bytes) -> Tuple[int, bytes]:
+        if op == OP_PING:
+            return OP_JSON, encode_json("ok")
+        if op == OP_EMBED:
+            texts = decode_texts(body)
+            return OP_VECTORS, encode_vectors(await self._embed_batcher.submit(texts, len(texts)))
+        if op == OP_SEARCH:
+            queries, k = decode_search(body)
+            return OP_JSON, encode_json(await self._search_batcher.submit((queries, k), len(queries)))
+        if op == OP_ADD:
+            request = decode_json(body)
+            add = self.store.add_documents_batch if request.get("batch") else self.store.add_documents
+            async with self._write_lock:
+                return OP_JSON, encode_json(await asyncio.to_thread(add, request["texts"], request.get("metadatas")))
+        if op == OP_DELETE:
+            request = decode_json(body)
+            async with self._write_lock:
+                deleted = await asyncio.to_thread(self.store.delete_documents, request.get("ids"), request.get("where"))
+            return OP_JSON, encode_json(deleted)
+        raise ValueError(f"Unknown operation {op}")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(self.store.embedding_model.embed_documents(texts), dtype=np.float32)
+
+    def _embed_batch(self, requests: List[List[str]]) -> List[np.ndarray]:
+        vectors = self._embed([text for texts in requests for text in texts])
+        results, offset = [], 0
+        for texts in requests:
+            results.append(vectors[offset:offset + len(texts)])
+            offset += len(texts)
+        return results
+
+    def _search_batch(self, requests: List[Tuple[List[str], int]]) -> List[List[List[Any]]]:
+        queries = [query for request_queries, _ in requests for query in request_queries]
+        if not queries:
+            return [[] for _ in requests]
+        # One index query at the largest k serves every request; smaller ks are prefixes of it
+        results = self.store.search_by_vectors(self._embed(queries).tolist(), max(k for _, k in requests))
+        grouped, offset = [], 0
+        for request_queries, k in requests:
+            grouped.append([documents[:k] for documents in results[offset:offset + len(request_queries)]])
+            offset += len(request_queries)
+        return grouped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the embedding model and vector index to API workers")
+    parser.add_argument("--socket", default=INDEX_SOCKET_PATH, help="Unix socket path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from app.core.vector_store import VectorStore, vector_store
+    # The sidecar always owns a local store, whatever VECTOR_STORE_BACKEND the shared .env selects
+    store = vector_store if isinstance(vector_store, VectorStore) else VectorStore()
+    # As the index's only writer, the sidecar is where a new replica loads its snapshot
+    if VECTOR_STORE_SNAPSHOT and store.db._collection.count() == 0:
+        store.import_snapshot(VECTOR_STORE_SNAPSHOT)
+
+    try:
+        asyncio.run(IndexSidecar(store, args.socket).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import re
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, NamedTuple, Tuple
+
+from app.config import INTENT_CENTROID_CLASSIFIER, INTENT_CENTROID_THRESHOLD
+from app.core.entities import ProductEntityMatcher, product_matcher
+from app.core.metrics import INTENT_ROUTING_SECONDS
+from app.core.tracing import tracer
+from app.utils.search import fold
+
+logger = logging.getLogger(__name__)
+
+ORDER_TRACKING = "order_tracking"
+STOCK_CHECK = "stock_check"
+PRICE_CHECK = "price_check"
+GREETING = "greeting"
+THANKS = "thanks"
+GENERAL = "general"
+
+# Ties are broken in this order
+INTENT_PRIORITY = [ORDER_TRACKING, PRICE_CHECK, STOCK_CHECK, GREETING, THANKS]
+
+# A rule intent needs this score to win; weak cues need a product mention or a second cue
+MIN_INTENT_SCORE = 2
+
+# (intent, weight, regex) over the case- and accent-folded query
+INTENT_RULES: List[Tuple[str, int, str]] = [
+    (ORDER_TRACKING, 2, r"track(?:ing)? (?:my )?order|order (?:status|tracking|number)|where is my (?:order|package|parcel)"),
+    (ORDER_TRACKING, 2, r"(?:shipping|delivery) status|tracking number|order\s*#"),
+    (ORDER_TRACKING, 1, r"\b(?:my )?(?:delivery|shipment|package)\b"),
+    (STOCK_CHECK, 2, r"(?:back |out of |in )stock|\bstock\b|\binventory\b|\bavailability\b"),
+    (STOCK_CHECK, 1, r"\bavailable\b|when will|do you (?:have|sell|carry)"),
+    (PRICE_CHECK, 2, r"how much (?:is|are|does|do|for)|price (?:of|for)|cost of|what does .{1,60} cost"),
+    (PRICE_CHECK, 1, r"\b(?:price|prices|cost|costs|cheap|expensive)\b"),
+    (GREETING, 2, r"^(?:hi|hello|hey|hiya|good (?:morning|afternoon|evening)|bonjour|salut)\b"),
+    (THANKS, 2, r"^(?:thanks|thank you|thx|merci|cheers)\b"),
+]
+
+# Greetings and thanks are only answered directly for short messages
+SMALL_TALK_MAX_WORDS = 5
+
+ORDER_ID_PATTERN = re.compile(r"(?:order|tracking)\s*(?:number|no\.?|#)?\s*#?\s*(\d+)|#\s*(\d+)")
+
+PRODUCT_NAME_PATTERNS = [
+    re.compile(r"stock\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)"),
+    re.compile(r"([\w\s]+?)\s*(?:in stock|available)"),
+    re.compile(r"availability\s*(?:for|of)\s*([\w\s]+?)(?:\?|$|\.)"),
+    re.compile(r"do you have\s*([\w\s]+?)(?:\?|$|\.)"),
+    re.compile(r"(?:how much (?:is|are|does|do)|price (?:of|for)|cost of)\s*(?:the |a |an )?([\w\s]+?)(?:\s+cost)?(?:\?|$|\.)"),
+]
+
+# Seed utterances for the optional embedding classifier
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    ORDER_TRACKING: [
+        "where is my order", "has my parcel shipped yet", "when will my delivery arrive",
+        "I want to know the status of my purchase", "my package has not arrived",
+    ],
+    STOCK_CHECK: [
+        "is this product in stock", "do you still have this item", "when will it be back",
+        "is it sold out", "can I still buy this",
+    ],
+    PRICE_CHECK: [
+        "how much does it cost", "what is the price", "is it expensive", "how much should I pay for this",
+    ],
+    GREETING: ["hello", "hi there", "good morning", "hey"],
+    THANKS: ["thank you", "thanks a lot", "that was helpful, thanks"],
+}
+
+
+class IntentMatch(NamedTuple):
+    """Routing decision for a query"""
+    intent: str
+    slots: Dict[str, Any]
+    score: float
+    source: str  # "rules", "centroid" or "default"
+
+
+class IntentCentroidClassifier:
+    """Nearest-centroid intent classifier over sentence embeddings"""
+
+    def __init__(self, examples: Dict[str, List[str]], threshold: float = INTENT_CENTROID_THRESHOLD):
+        self.examples = examples
+        self.threshold = threshold
+        self._intents: List[str] = []
+        self._centroids = None
+
+    def _embedding_model(self):
+        # Reuse the model already loaded for retrieval
+        from app.core.vector_store import vector_store
+        return vector_store.embedding_model
+
+    def _build(self) -> None:
+        import numpy as np
+
+        model = self._embedding_model()
+        intents, centroids = [], []
+        for intent, utterances in self.examples.items():
+            vectors = np.asarray(model.embed_documents(utterances), dtype=np.float32)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+            intents.append(intent)
+        self._intents = intents
+        self._centroids = np.vstack(centroids)
+
+    def classify(self, query: str) -> Optional[Tuple[str, float]]:
+        """
+        Nearest intent centroid for a query
+
+        Args:
+            query: The user's message
+
+        Returns:
+            (intent, cosine similarity), or None below the threshold
+        """
+        import numpy as np
+
+        if self._centroids is None:
+            self._build()
+        vector = np.asarray(self._embedding_model().embed_query(query), dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        similarities = self._centroids @ vector
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return self._intents[best], float(similarities[best])
+
+
+class IntentRouter:
+    """
+    Routes chat queries to a handler intent with extracted slots
+
+    The query is folded once and scanned by a single compiled alternation of
+    every rule; each hit adds its weight to its intent. Slots (order_id,
+    product_id, product_name) are extracted in the same call, so handlers never
+    re-parse the query. Queries no rule claims can optionally go through an
+    embedding nearest-centroid classifier before falling back to RAG.
+    """
+
+    def __init__(
+            self,
+            matcher: ProductEntityMatcher,
+            rules: List[Tuple[str, int, str]] = INTENT_RULES,
+            classifier: Optional[IntentCentroidClassifier] = None
+    ):
+        self.matcher = matcher
+        self.classifier = classifier
+        self._group_rules: Dict[str, Tuple[str, int]] = {}
+        alternatives = []
+        for i, (intent, weight, pattern) in enumerate(rules):
+            group = f"r{i}"
+            self._group_rules[group] = (intent, weight)
+            alternatives.append(f"(?P<{group}>{pattern})")
+        self._pattern = re.compile("|".join(alternatives))
+
+    def extract_slots(self, query: str, folded: Optional[str] = None) -> Dict[str, Any]:
+        """Order and product slots of a query"""
+        folded = folded if folded is not None else fold(query)
+        slots: Dict[str, Any] = {}
+
+        match = ORDER_ID_PATTERN.search(folded)
+        if match:
+            slots["order_id"] = int(match.group(1) or match.group(2))
+
+        # One pass of the entity matcher serves both product and category slots
+        mentions = self.matcher.find(query)
+        mention = self.matcher.best_of(mentions)
+        if mention is not None:
+            slots["product_id"] = mention.product_id
+            slots["product_name"] = mention.text
+        else:
+            for pattern in PRODUCT_NAME_PATTERNS:
+                found = pattern.search(folded)
+                if found and found.group(1).strip():
+                    slots["product_name"] = found.group(1).strip()
+                    break
+
+        category_ids = [category_id for m in mentions for category_id in m.category_ids]
+        if category_ids:
+            slots["category_ids"] = category_ids
+        return slots
+
+    def match_rules(self, query: str) -> IntentMatch:
+        """
+        Rule-based routing
+
+        Args:
+            query: The user's message
+
+        Returns:
+            The winning intent, or GENERAL when no intent reaches MIN_INTENT_SCORE
+        """
+        folded = " ".join(fold(query).split())
+        slots = self.extract_slots(query, folded)
+
+        scores: Dict[str, int] = {}
+        for match in self._pattern.finditer(folded):
+            intent, weight = self._group_rules[match.lastgroup]
+            scores[intent] = scores.get(intent, 0) + weight
+
+        # Catalog mentions (product_id is set, possibly to None, when one is found)
+        # and order numbers back up weak cues
+        if "product_id" in slots:
+            for intent in (STOCK_CHECK, PRICE_CHECK):
+                if intent in scores:
+                    scores[intent] += 1
+        if "order_id" in slots and ORDER_TRACKING in scores:
+            scores[ORDER_TRACKING] += 1
+
+        if len(folded.split()) > SMALL_TALK_MAX_WORDS:
+            scores.pop(GREETING, None)
+            scores.pop(THANKS, None)
+
+        candidates = [intent for intent in INTENT_PRIORITY if scores.get(intent, 0) >= MIN_INTENT_SCORE]
+        if not candidates:
+            return IntentMatch(GENERAL, slots, 0.0, "default")
+        best = max(candidates, key=lambda intent: (scores[intent], -INTENT_PRIORITY.index(intent)))
+        return IntentMatch(best, slots, float(scores[best]), "rules")
+
+    @tracer.traced("intent.route")
+    @INTENT_ROUTING_SECONDS.time()
+    async def route(self, query: str) -> IntentMatch:
+        """
+        Route a query, consulting the centroid classifier when rules are inconclusive
+
+        Args:
+            query: The user's message
+
+        Returns:
+            The routing decision
+        """
+        result = self.match_rules(query)
+        if result.intent != GENERAL or self.classifier is None:
+            return result
+
+        try:
+            classified = await asyncio.to_thread(self.classifier.classify, query)
+        except Exception as e:
+            logger.error(f"Error classifying intent: {str(e)}")
+            return result
+
+        if classified is None:
+            return result
+        intent, similarity = classified
+        # Small talk from the classifier alone is not trusted for long messages
+        if intent in (GREETING, THANKS) and len(query.split()) > SMALL_TALK_MAX_WORDS:
+            return result
+        return IntentMatch(intent, result.slots, similarity, "centroid")
+
+
+# Create a singleton instance
+intent_router = IntentRouter(
+    product_matcher,
+    classifier=IntentCentroidClassifier(INTENT_EXAMPLES) if INTENT_CENTROID_CLASSIFIER else None
+)
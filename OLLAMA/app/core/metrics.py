@@ -0,0 +1,350 @@
+import time
+import bisect
+import inspect
+import functools
+import threading
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache lookups up to slow LLM generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _ShardedValues:
+    """
+    Fixed-size vector of floats split into one shard per thread
+
+    Each thread only ever writes its own shard, so updates need no lock and
+    never contend; readers sum the shards. The lock is only taken the first
+    time a thread touches the metric and when it is scraped.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(shard[i] for shard in shards) for i in range(self._size)]
+
+
+class _Timer:
+    """Observes elapsed seconds into a histogram, as a context manager or decorator"""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "_HistogramChild"):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+    def __call__(self, function: Callable) -> Callable:
+        histogram = self._histogram
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed
+
+
+class _InProgress:
+    """Raises a gauge while a block or function runs"""
+
+    __slots__ = ("_gauge",)
+
+    def __init__(self, gauge: "_GaugeChild"):
+        self._gauge = gauge
+
+    def __enter__(self):
+        self._gauge.inc()
+        return self
+
+    def __exit__(self, *exc):
+        self._gauge.dec()
+
+    def __call__(self, function: Callable) -> Callable:
+        gauge = self._gauge
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def tracked_async(*args, **kwargs):
+                gauge.inc()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    gauge.dec()
+            return tracked_async
+
+        @functools.wraps(function)
+        def tracked(*args, **kwargs):
+            gauge.inc()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                gauge.dec()
+        return tracked
+
+
+class _CounterChild:
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._values.shard()[0] += amount
+
+    def value(self) -> float:
+        return self._values.totals()[0]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self._values.shard()[0] -= amount
+
+    def track_inprogress(self) -> _InProgress:
+        return _InProgress(self)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # One count per bucket, one for +Inf, then the sum
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._values.shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(cumulative bucket counts including +Inf, count, sum)"""
+        totals = self._values.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child metric for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            # setdefault is atomic, so racing threads end up sharing one child
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _labelled_children(self):
+        for values, child in list(self._children.items()):
+            yield list(zip(self.labelnames, values)), child
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(labels)} {_format_value(child.value())}"
+            for labels, child in self._labelled_children()
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def value(self) -> float:
+        return self._children[()].value()
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is computed when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY, function: Optional[Callable[[], float]] = None):
+        self.function = function
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+    def track_inprogress(self) -> _InProgress:
+        return _InProgress(self._children[()])
+
+    def value(self) -> float:
+        return self.function() if self.function else self._children[()].value()
+
+    def samples(self) -> List[str]:
+        if self.function:
+            return [f"{self.name} {_format_value(self.value())}"]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._children[()])
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        return self._children[()].snapshot()
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, child in self._labelled_children():
+            cumulative, count, total = child.snapshot()
+            for bound, value in zip([*self.buckets, "+Inf"], cumulative):
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels([*labels, ('le', le)])} {_format_value(value)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(count)}")
+        return lines
+
+
+# Chat pipeline stages
+CHAT_REQUEST_SECONDS = Histogram("chat_request_seconds", "End-to-end chat message handling time", ["service"])
+INTENT_ROUTING_SECONDS = Histogram("chat_intent_routing_seconds", "Time to route a query to an intent")
+QUERY_EMBEDDING_SECONDS = Histogram("chat_query_embedding_seconds", "Time to embed a search query")
+VECTOR_SEARCH_SECONDS = Histogram("chat_vector_search_seconds", "Time to query the vector index")
+DB_ENRICHMENT_SECONDS = Histogram("chat_db_enrichment_seconds", "Time to gather database context for a query")
+PROMPT_BUILD_SECONDS = Histogram("chat_prompt_build_seconds", "Time to assemble the LLM prompt")
+RESPONSE_FORMAT_SECONDS = Histogram("chat_response_format_seconds", "Time to post-process an LLM answer")
+LLM_FIRST_TOKEN_SECONDS = Histogram("llm_time_to_first_token_seconds", "Time until the LLM streams its first token")
+LLM_GENERATION_SECONDS = Histogram("llm_generation_seconds", "Total LLM generation time")
+
+# Caches: catalog (in-memory products), faq (stored answers), session (server-side history)
+CACHE_REQUESTS = Counter("chat_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+# Queue depth
+CHAT_REQUESTS_IN_PROGRESS = Gauge("chat_requests_in_progress", "Chat messages being handled")
+LLM_CALLS_IN_PROGRESS = Gauge("llm_calls_in_progress", "LLM calls waiting on Ollama")
+BATCH_GENERATIONS_WAITING = Gauge("batch_generations_waiting", "Batch generations queued behind the concurrency limit")
+
+# Load shedding: answers built from retrieval without generation, by reason
+# (deadline, circuit_open, llm_error), and breaker states (0 closed, 1 half-open, 2 open)
+DEGRADED_ANSWERS = Counter("chat_degraded_answers_total", "Answers returned without LLM generation", ["reason"])
+CIRCUIT_BREAKER_STATE = Gauge("circuit_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+                              ["backend"])
+
+# Requests abandoned by their client, by route, and the generations aborted with them
+CANCELLED_REQUESTS = Counter("chat_cancelled_requests_total", "Requests cancelled after the client disconnected",
+                             ["route"])
+LLM_CANCELLED_CALLS = Counter("llm_calls_cancelled_total", "LLM generations aborted because their request was cancelled")
+
+# Tokens, as counted for the prompt budget
+LLM_PROMPT_TOKENS = Counter("llm_prompt_tokens_total", "Tokens sent to the LLM (system prompt and prompt)")
+LLM_COMPLETION_TOKENS = Counter("llm_completion_tokens_total", "Tokens generated by the LLM")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count one lookup of a cache"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
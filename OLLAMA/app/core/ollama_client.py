@@ -1,17 +1,49 @@
+import json
+import time
+import asyncio
 import logging
 from typing import Dict, List, Any, Optional, Generator
 
 import httpx  # This is the problematic import
-from langchain_community.llms import Ollama
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain.schema import LLMResult
 
-from app.config import OLLAMA_BASE_URL, OLLAMA_MODEL, SYSTEM_PROMPT
+from app.config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    OLLAMA_CONNECT_TIMEOUT,
+    SYSTEM_PROMPT,
+    LLM_MIN_GENERATION_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+)
+from app.core.chunking import count_tokens
+from app.core.metrics import (
+    LLM_FIRST_TOKEN_SECONDS,
+    LLM_GENERATION_SECONDS,
+    LLM_CALLS_IN_PROGRESS,
+    LLM_PROMPT_TOKENS,
+    LLM_COMPLETION_TOKENS,
+    LLM_CANCELLED_CALLS,
+)
+from app.core.resilience import CircuitBreaker, time_remaining, run_cancellable
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 
+class LLMUnavailableError(Exception):
+    """
+    Raised when no answer can be generated in time
+
+    `reason` is "circuit_open" when the breaker refuses the call, "deadline"
+    when the request deadline is too close or passes during generation, and
+    "llm_error" when Ollama fails.
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
 class OllamaClient:
     """Client for interacting with Ollama hosting Llama 3.2"""
 
@@ -19,12 +51,7 @@ class OllamaClient:
         self.base_url = OLLAMA_BASE_URL
         self.model = OLLAMA_MODEL
 
-        # Initialize the Ollama client for LangChain
-        self.llm = Ollama(
-            base_url=self.base_url,
-            model=self.model,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()])
-        )
+        self.breaker = CircuitBreaker("ollama", LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
 
         # Test connection
         self._test_connection()
@@ -46,26 +73,104 @@ class OllamaClient:
         except Exception as e:
             logger.error(f"Error connecting to Ollama: {str(e)}")
 
-    def query(self, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+    async def aquery(self, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
         """
         Send a query to the LLM model
 
+        The call is refused up front when the circuit breaker is open or the
+        request deadline leaves less than LLM_MIN_GENERATION_SECONDS, and
+        aborted when the deadline passes, so a saturated Ollama sheds load
+        instead of queueing requests that will time out anyway.
+
         Args:
             prompt: The user prompt
             system_prompt: System instructions for the LLM
 
         Returns:
             The response from the LLM
+
+        Raises:
+            LLMUnavailableError: No answer could be generated in time
         """
+        remaining = time_remaining()
+        if remaining is not None and remaining < LLM_MIN_GENERATION_SECONDS:
+            raise LLMUnavailableError("deadline", f"Only {max(remaining, 0.0):.2f}s left before the deadline")
+        if not self.breaker.allow():
+            raise LLMUnavailableError("circuit_open", "Ollama circuit breaker is open")
+
         try:
-            response = self.llm.invoke(
-                prompt,
-                system=system_prompt
-            )
-            return response
+            with tracer.span("llm.query", model=self.model) as span:
+                with LLM_CALLS_IN_PROGRESS.track_inprogress():
+                    start = time.perf_counter()
+                    response = await asyncio.wait_for(self._generate(prompt, system_prompt, span, start), remaining)
+                    LLM_GENERATION_SECONDS.observe(time.perf_counter() - start)
+
+                prompt_tokens = count_tokens(system_prompt) + count_tokens(prompt)
+                completion_tokens = count_tokens(response)
+                LLM_PROMPT_TOKENS.inc(prompt_tokens)
+                LLM_COMPLETION_TOKENS.inc(completion_tokens)
+                span.set_attribute("prompt_tokens", prompt_tokens)
+                span.set_attribute("completion_tokens", completion_tokens)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise LLMUnavailableError("deadline", "Generation did not finish before the request deadline")
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Error querying Ollama: {str(e)}")
-            return "I'm having trouble processing your request. Please try again later."
+            raise LLMUnavailableError("llm_error", str(e)) from e
+        except BaseException as e:
+            # Cancelled with its request; leaving the stream closes the connection, so Ollama stops generating
+            self.breaker.record_abandoned()
+            if isinstance(e, asyncio.CancelledError):
+                LLM_CANCELLED_CALLS.inc()
+            raise
+        self.breaker.record_success()
+        return response
+
+    async def _generate(self, prompt: str, system_prompt: str, span, start: float) -> str:
+        """Stream a generation from Ollama's generate endpoint and join its chunks"""
+        payload = {"model": self.model, "prompt": prompt, "system": system_prompt, "stream": True}
+        # Generation time is bounded by the request deadline, not by a read timeout.
+        # A client per call: query() runs on a fresh event loop each time, and
+        # connecting to Ollama costs next to nothing next to a generation.
+        timeout = httpx.Timeout(None, connect=OLLAMA_CONNECT_TIMEOUT)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=timeout) as client:
+            async with client.stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise RuntimeError(f"Ollama returned HTTP {response.status_code}: {body[:200]!r}")
+
+                # Streamed so the time to first token can be measured
+                parts = []
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if chunk.get("response"):
+                        if not parts:
+                            first_token = time.perf_counter() - start
+                            LLM_FIRST_TOKEN_SECONDS.observe(first_token)
+                            span.set_attribute("first_token_ms", round(first_token * 1000, 3))
+                        parts.append(chunk["response"])
+                    if chunk.get("done"):
+                        break
+        return "".join(parts)
+
+    def query(self, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+        """
+        Blocking variant of aquery, for scripts and other callers outside an event loop
+
+        Request handlers await aquery instead: this runs a new event loop and
+        holds its thread for the whole generation.
+
+        Raises:
+            LLMUnavailableError: No answer could be generated in time
+        """
+        # asyncio.run copies the caller's context, so the request deadline still applies, and
+        # cancelling the request cancels the generation on this thread's loop
+        return asyncio.run(run_cancellable(self.aquery(prompt, system_prompt)))
 
     def query_with_context(self, prompt: str, context: str, system_prompt: str = SYSTEM_PROMPT) -> str:
         """
@@ -0,0 +1,283 @@
+import io
+import os
+import sys
+import time
+import pstats
+import marshal
+import asyncio
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, Any, Optional
+
+from app.config import PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS, HEAP_TRACE_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads parked on a lock, queue or socket; their samples are noise
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile of the same kind is already running"""
+
+
+class ProfilerStateError(Exception):
+    """Raised when a heap diff is requested before heap tracing was started"""
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages or the working directory, for readable frames"""
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    try:
+        relative = os.path.relpath(filename)
+    except ValueError:
+        return filename
+    return filename if relative.startswith("..") else relative
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def _collapse(thread_name: str, frame) -> str:
+    """One stack in the collapsed format of flamegraph.pl / speedscope, outermost frame first"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})".replace(";", ":"))
+        frame = frame.f_back
+    frames.append(thread_name.replace(";", ":").replace(" ", "_"))
+    return ";".join(reversed(frames))
+
+
+def sample_stacks(seconds: float, interval: float, include_idle: bool = False) -> Counter:
+    """
+    Sample the Python stacks of every thread of this process
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        include_idle: Keep samples of threads waiting on a lock, queue or socket
+
+    Returns:
+        Counter of collapsed stacks to sample counts
+    """
+    own = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        for ident, frame in frames.items():
+            if ident == own or (not include_idle and _is_idle(frame)):
+                continue
+            stacks[_collapse(names.get(ident, f"thread-{ident}"), frame)] += 1
+        # Drop the frame references before sleeping so they do not keep locals alive
+        del frames, frame
+        time.sleep(interval)
+    return stacks
+
+
+class Profiler:
+    """
+    On-demand CPU and heap profiling of the running worker
+
+    Only one CPU profile runs at a time, and runs are capped at
+    PROFILE_MAX_SECONDS. The sampler reads thread stacks from a background
+    thread, so the request path is not instrumented and overhead stays
+    proportional to the sampling rate. cProfile instruments every call on the
+    event loop thread for the duration and costs more. Heap tracing is
+    stopped automatically after HEAP_TRACE_MAX_SECONDS in case nobody stops
+    it.
+    """
+
+    def __init__(self):
+        self._cpu_lock = threading.Lock()
+        self._heap_lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_time = 0.0
+        self._started_tracing = False
+        self._heap_timer: Optional[threading.Timer] = None
+
+    async def sample(
+            self,
+            seconds: float,
+            interval: float = PROFILE_SAMPLE_INTERVAL_MS / 1000,
+            include_idle: bool = False
+    ) -> str:
+        """
+        Run the sampling profiler
+
+        Args:
+            seconds: How long to sample, capped at PROFILE_MAX_SECONDS
+            interval: Seconds between samples
+            include_idle: Keep samples of idle threads
+
+        Returns:
+            Collapsed stacks, one "frame;frame;... count" line each, most sampled first
+        """
+        if not self._cpu_lock.acquire(blocking=False):
+            raise ProfilerBusyError("A CPU profile is already running")
+        try:
+            seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+            stacks = await asyncio.to_thread(sample_stacks, seconds, max(interval, 0.001), include_idle)
+        finally:
+            self._cpu_lock.release()
+        logger.info(f"Sampled {sum(stacks.values())} stacks over {seconds}s")
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+    async def profile_event_loop(self, seconds: float) -> cProfile.Profile:
+        """
+        Run cProfile on the event loop thread
+
+        Every coroutine and callback run by the loop during the window is
+        profiled; work handed to worker threads is not.
+
+        Args:
+            seconds: How long to profile, capped at PROFILE_MAX_SECONDS
+
+        Returns:
+            The finished profile
+        """
+        if not self._cpu_lock.acquire(blocking=False):
+            raise ProfilerBusyError("A CPU profile is already running")
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) already owns this thread
+                raise ProfilerBusyError(str(e))
+            try:
+                await asyncio.sleep(min(max(seconds, 0.1), PROFILE_MAX_SECONDS))
+            finally:
+                profile.disable()
+            return profile
+        finally:
+            self._cpu_lock.release()
+
+    @staticmethod
+    def pstats_bytes(profile: cProfile.Profile) -> bytes:
+        """The profile in the pstats file format, as written by dump_stats"""
+        profile.create_stats()
+        return marshal.dumps(profile.stats)
+
+    @staticmethod
+    def pstats_text(profile: cProfile.Profile, limit: int = 50, sort: str = "cumulative") -> str:
+        """The top functions of the profile as a pstats table"""
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def start_heap(self, frames: int = 10) -> Dict[str, Any]:
+        """
+        Start tracing allocations and take the baseline snapshot
+
+        Args:
+            frames: Stack frames stored per allocation
+
+        Returns:
+            Tracing status
+        """
+        with self._heap_lock:
+            if self._baseline is not None:
+                raise ProfilerBusyError("Heap tracing is already running")
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start(max(1, frames))
+            self._baseline = self._snapshot()
+            self._baseline_time = time.time()
+            self._heap_timer = threading.Timer(HEAP_TRACE_MAX_SECONDS, self.stop_heap)
+            self._heap_timer.daemon = True
+            self._heap_timer.start()
+        logger.info(f"Heap tracing started with {tracemalloc.get_traceback_limit()} frames")
+        return self.heap_status()
+
+    def heap_diff(self, limit: int = 50, group_by: str = "lineno", reset: bool = False) -> Dict[str, Any]:
+        """
+        Compare the current heap with the baseline snapshot
+
+        Args:
+            limit: Number of allocation sites returned, largest growth first
+            group_by: "lineno", "filename" or "traceback"
+            reset: Make this snapshot the baseline of the next diff
+
+        Returns:
+            Traced memory totals and the allocation sites that changed most
+        """
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError(f"Unknown group_by: {group_by}")
+        with self._heap_lock:
+            if self._baseline is None:
+                raise ProfilerStateError("Heap tracing is not running")
+            baseline, since = self._baseline, self._baseline_time
+            snapshot = self._snapshot()
+            if reset:
+                self._baseline, self._baseline_time = snapshot, time.time()
+
+        current, peak = tracemalloc.get_traced_memory()
+        stats = snapshot.compare_to(baseline, group_by)
+        return {
+            "seconds_since_baseline": round(time.time() - since, 3),
+            "traced_memory_bytes": current,
+            "peak_traced_memory_bytes": peak,
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "stats": [
+                {
+                    "traceback": [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback],
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:max(1, limit)]
+            ],
+        }
+
+    def stop_heap(self) -> Dict[str, Any]:
+        """Stop heap tracing and release its snapshots"""
+        with self._heap_lock:
+            if self._heap_timer is not None:
+                self._heap_timer.cancel()
+                self._heap_timer = None
+            self._baseline = None
+            # Tracing started outside the profiler (PYTHONTRACEMALLOC) is left running
+            if self._started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("Heap tracing stopped")
+            self._started_tracing = False
+        return self.heap_status()
+
+    def heap_status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": self._baseline is not None,
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "traced_memory_bytes": current,
+            "peak_traced_memory_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        }
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+
+# Create a singleton instance
+profiler = Profiler()
@@ -1,19 +1,46 @@
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
 
-from app.core.ollama_client import ollama_client
-from app.core.vector_store import vector_store
-from app.config import QUERY_PROMPT, SYSTEM_PROMPT
+from app.core.ollama_client import ollama_client, LLMUnavailableError
+from app.core.vector_store import vector_store, select_relevant
+from app.config import (
+    QUERY_PROMPT,
+    DIRECT_PROMPT,
+    SYSTEM_PROMPT,
+    RETRIEVAL_TIMEOUT,
+    CONTEXT_DEADLINE,
+    RETRIEVAL_MAX_K,
+    BATCH_CONCURRENCY,
+    DEGRADED_ANSWER_INTRO,
+    DEGRADED_NO_CONTEXT_ANSWER,
+)
+from app.utils.concurrency import Branch, gather_branches
+from app.core.context_builder import context_builder
+from app.core.chunking import count_tokens
+from app.core.metrics import PROMPT_BUILD_SECONDS, BATCH_GENERATIONS_WAITING, DEGRADED_ANSWERS
+from app.core.resilience import time_remaining
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
 
+class DegradedAnswer(str):
+    """Answer assembled from retrieval and database facts without the LLM, with the reason why"""
+
+    def __new__(cls, text: str, reason: str):
+        answer = super().__new__(cls, text)
+        answer.reason = reason
+        return answer
+
+
 class RAGEngine:
     """Retrieval-Augmented Generation engine for the chatbot"""
 
     def __init__(self):
         self.vector_store = vector_store
         self.llm = ollama_client
+        self.context_builder = context_builder
 
     def process_query(
             self,
@@ -22,7 +49,10 @@ class RAGEngine:
             db_info: str = ""
     ) -> Tuple[str, List[Dict[str, Any]]]:
         """
-        Process a user query using RAG
+        Process a user query using RAG, blocking until the answer is ready
+
+        For scripts and other callers outside an event loop; the API awaits
+        process_query_async instead.
 
         Args:
             query: The user's query
@@ -32,51 +62,208 @@ class RAGEngine:
         Returns:
             Tuple of (answer, relevant_docs)
         """
+        relevant_docs = self.retrieve(query)
+        answer = asyncio.run(self.generate(query, relevant_docs, history, db_info))
+        return answer, relevant_docs
+
+    @tracer.traced("rag.process_query")
+    async def process_query_async(
+            self,
+            query: str,
+            history: Optional[List[Dict[str, str]]] = None,
+            enrichment: Optional[Dict[str, Branch]] = None,
+            summary: str = ""
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Process a user query with retrieval and enrichment running concurrently
+
+        The vector search and every enrichment branch (catalog, orders, user
+        context, ...) run at the same time, each under its own timeout. The
+        prompt is built once all of them finish or CONTEXT_DEADLINE passes,
+        with defaults standing in for late branches.
+
+        Args:
+            query: The user's query
+            history: Optional chat history
+            enrichment: Branches whose string results are joined into the database info
+            summary: Running summary of older turns of a server-side session
+
+        Returns:
+            Tuple of (answer, relevant_docs)
+        """
+        enrichment = enrichment or {}
+        branches = {"documents": Branch(asyncio.to_thread(self.retrieve, query), RETRIEVAL_TIMEOUT, [])}
+        branches.update(enrichment)
+
+        # Context gathering never outlives the request deadline
+        remaining = time_remaining()
+        deadline = CONTEXT_DEADLINE if remaining is None else max(0.0, min(CONTEXT_DEADLINE, remaining))
+        results = await gather_branches(branches, deadline=deadline)
+        relevant_docs = results["documents"]
+        db_info = "\n\n".join(results[name] for name in enrichment if results[name])
+
+        answer = await self.generate(query, relevant_docs, history, db_info, summary)
+        return answer, relevant_docs
+
+    async def iter_batch(
+            self,
+            queries: List[str],
+            enrich: Optional[Callable[[str], Awaitable[str]]] = None,
+            concurrency: int = BATCH_CONCURRENCY
+    ) -> AsyncIterator[Tuple[int, str, List[Dict[str, Any]]]]:
+        """
+        Answer independent queries, yielding each result as soon as it is ready
+
+        Retrieval for the whole batch is one batched embedding pass and one
+        index query. Each query is enriched while that runs, then its
+        generation is pipelined through the LLM with at most `concurrency`
+        in flight.
+
+        Args:
+            queries: The queries, each answered without history
+            enrich: Optional coroutine function returning the database information for a query
+            concurrency: Maximum number of concurrent LLM calls
+
+        Yields:
+            Tuples of (query index, answer, relevant_docs) in completion order
+        """
+        retrieval = asyncio.ensure_future(asyncio.to_thread(self.retrieve_batch, queries))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def answer(index: int) -> Tuple[int, str, List[Dict[str, Any]]]:
+            db_info = await enrich(queries[index]) if enrich else ""
+            relevant = await retrieval
+            BATCH_GENERATIONS_WAITING.inc()
+            try:
+                await semaphore.acquire()
+            finally:
+                BATCH_GENERATIONS_WAITING.dec()
+            try:
+                text = await self.generate(queries[index], relevant[index], None, db_info)
+            finally:
+                semaphore.release()
+            return index, text, relevant[index]
+
+        tasks = [asyncio.ensure_future(answer(index)) for index in range(len(queries))]
         try:
-            # 1. Retrieve relevant documents
-            relevant_docs = self.vector_store.search(query)
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away (e.g. a closed stream): stop queued and running generations
+            retrieval.cancel()
+            for task in tasks:
+                task.cancel()
 
-            # 2. Format context for the LLM
-            context = self._format_context(relevant_docs)
+    @tracer.traced("rag.process_batch")
+    async def process_batch(
+            self,
+            queries: List[str],
+            enrich: Optional[Callable[[str], Awaitable[str]]] = None,
+            concurrency: int = BATCH_CONCURRENCY
+    ) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Answer independent queries with batched retrieval and bounded concurrency
 
-            # 3. Generate an answer with the LLM
-            prompt = QUERY_PROMPT.format(context=context, db_info=db_info, query=query)
+        Args:
+            queries: The queries, each answered without history
+            enrich: Optional coroutine function returning the database information for a query
+            concurrency: Maximum number of concurrent LLM calls
+
+        Returns:
+            List of (answer, relevant_docs), in query order
+        """
+        results: List[Optional[Tuple[str, List[Dict[str, Any]]]]] = [None] * len(queries)
+        async for index, answer, relevant_docs in self.iter_batch(queries, enrich, concurrency):
+            results[index] = (answer, relevant_docs)
+        return results
 
-            # 4. Process chat history if available
-            system_prompt = self._process_history(history) if history else SYSTEM_PROMPT
+    @tracer.traced("rag.retrieve")
+    def retrieve(self, query: str) -> List[Dict[str, Any]]:
+        """Retrieve relevant documents, adaptively sized by score, returning none on failure"""
+        try:
+            return select_relevant(self.vector_store.search(query, k=RETRIEVAL_MAX_K))
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {str(e)}")
+            return []
 
-            # 5. Generate the answer
-            answer = self.llm.query(prompt, system_prompt=system_prompt)
+    @tracer.traced("rag.retrieve_batch")
+    def retrieve_batch(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        """Retrieve relevant documents for several queries with one batched search"""
+        try:
+            return [select_relevant(documents) for documents in self.vector_store.search_batch(queries, k=RETRIEVAL_MAX_K)]
+        except Exception as e:
+            logger.error(f"Error retrieving documents for batch: {str(e)}")
+            return [[] for _ in queries]
 
-            return answer, relevant_docs
+    @tracer.traced("rag.generate")
+    async def generate(
+            self,
+            query: str,
+            relevant_docs: List[Dict[str, Any]],
+            history: Optional[List[Dict[str, str]]] = None,
+            db_info: str = "",
+            summary: str = ""
+    ) -> str:
+        """Build the prompt from retrieved documents and database info and query the LLM on the caller's loop"""
+        try:
+            with PROMPT_BUILD_SECONDS.time(), tracer.span("rag.build_prompt") as span:
+                built = self.context_builder.build(relevant_docs)
+                if relevant_docs or db_info:
+                    prompt = QUERY_PROMPT.format(context=built.text, db_info=db_info, query=query)
+                else:
+                    # Nothing relevant: skip the context sections entirely
+                    prompt = DIRECT_PROMPT.format(query=query)
+                system_prompt = self._process_history(history, summary) if history or summary else SYSTEM_PROMPT
+                span.set_attribute("context_chunks", len(built.documents))
+                span.set_attribute("context_tokens", built.tokens)
+            logger.info(
+                f"Prompt size: {count_tokens(system_prompt) + count_tokens(prompt)} tokens "
+                f"(context {built.tokens} tokens from {len(built.documents)}/{built.candidates} chunks, "
+                f"{built.duplicates} duplicates dropped)"
+            )
+            return await self.llm.aquery(prompt, system_prompt=system_prompt)
+        except LLMUnavailableError as e:
+            logger.warning(f"Answering without generation ({e.reason}): {str(e)}")
+            return self.degraded_answer(relevant_docs, db_info, e.reason)
         except Exception as e:
             logger.error(f"Error in RAG processing: {str(e)}")
-            return "I'm sorry, I encountered an error while processing your question. Please try again.", []
+            return "I'm sorry, I encountered an error while processing your question. Please try again."
 
-    def _format_context(self, documents: List[Dict[str, Any]]) -> str:
-        """Format retrieved documents into a context string"""
-        if not documents:
-            return "No relevant information found."
+    def degraded_answer(self, relevant_docs: List[Dict[str, Any]], db_info: str, reason: str) -> DegradedAnswer:
+        """
+        Answer from the top retrieved chunk and the database facts, without generation
 
-        context_parts = []
-        for i, doc in enumerate(documents):
-            # Extract source if available
-            source = doc.get("metadata", {}).get("source", f"Document {i + 1}")
+        Args:
+            relevant_docs: Retrieved documents, best first
+            db_info: Database information gathered for the query
+            reason: Why generation was skipped (deadline, circuit_open or llm_error)
 
-            # Add content with source reference
-            context_parts.append(f"[Source: {source}]\n{doc['content']}")
+        Returns:
+            The degraded answer
+        """
+        DEGRADED_ANSWERS.labels(reason).inc()
+        facts = [relevant_docs[0]["content"] if relevant_docs else "", db_info]
+        facts = [fact.strip() for fact in facts if fact and fact.strip()]
+        if not facts:
+            return DegradedAnswer(DEGRADED_NO_CONTEXT_ANSWER, reason)
+        return DegradedAnswer(DEGRADED_ANSWER_INTRO + "\n\n" + "\n\n".join(facts), reason)
 
-        return "\n\n".join(context_parts)
+    def _format_context(self, documents: List[Dict[str, Any]]) -> str:
+        """Format retrieved documents into a context string within the token budget"""
+        return self.context_builder.build(documents).text
 
-    def _process_history(self, history: List[Dict[str, str]]) -> str:
+    def _process_history(self, history: List[Dict[str, str]], summary: str = "") -> str:
         """Process chat history to enhance system prompt"""
-        if not history:
+        if not history and not summary:
             return SYSTEM_PROMPT
 
-        # Extract key information from history to enhance the system prompt
-        # This is a simple approach - can be improved with more sophisticated methods
-        history_str = "\nRecent conversation:\n"
-        for msg in history[-5:]:  # Use last 5 messages
+        # Server-side sessions keep their own bounded window behind a summary;
+        # client-sent history is cut to the last 5 messages
+        recent = history if summary else history[-5:]
+
+        history_str = f"\nSummary of the earlier conversation:\n{summary}\n" if summary else ""
+        history_str += "\nRecent conversation:\n"
+        for msg in recent:
             role = msg.get("role", "")
             content = msg.get("content", "")
             history_str += f"{role.upper()}: {content}\n"
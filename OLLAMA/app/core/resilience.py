@@ -0,0 +1,207 @@
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Coroutine, Iterator, List, Optional
+
+from app.core.metrics import CIRCUIT_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+# Monotonic time by which the current request must be answered. Context
+# variables are copied into asyncio tasks and asyncio.to_thread workers, so
+# every stage of the pipeline sees the deadline of the request it serves.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# Cancellation of the current request, shared the same way
+_cancellation: ContextVar[Optional["Cancellation"]] = ContextVar("request_cancellation", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Run a block under a deadline `seconds` from now
+
+    A nested scope never extends the deadline of its enclosing one. None or
+    a non-positive value leaves the current deadline unchanged.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, None without a deadline"""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend that keeps failing
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    allow() refuses calls, so requests fail fast instead of queueing behind a
+    saturated backend. Once `reset_timeout` has passed, one trial call is let
+    through (half-open): its success closes the breaker, its failure opens it
+    for another `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    # Exported as the circuit_breaker_state gauge
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._gauge = CIRCUIT_BREAKER_STATE.labels(name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+            self._gauge.inc(self.STATE_VALUES[state] - self.STATE_VALUES[self._state])
+            self._state = state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; every allowed call must end with a record_* call"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def record_abandoned(self) -> None:
+        """The allowed call ended without telling anything about the backend"""
+        with self._lock:
+            self._trial_running = False
+
+
+class Cancellation:
+    """
+    Cancellation signal of a request, shared with the threads working for it
+
+    Cancelling an asyncio task does not stop the asyncio.to_thread worker it
+    is awaiting. Blocking calls in such workers register a callback here that
+    aborts them, e.g. by closing their connection to Ollama. A child is
+    cancelled along with its parent.
+    """
+
+    def __init__(self, parent: Optional["Cancellation"] = None):
+        self._callbacks: List[Callable[[], None]] = []
+        self._cancelled = False
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent.add_callback(self.cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Call `callback` on cancellation, or right away if already cancelled"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in cancellation callback: {str(e)}")
+
+
+def current_cancellation() -> Optional[Cancellation]:
+    """Cancellation of the current request, None outside a cancellable request"""
+    return _cancellation.get()
+
+
+def cancellable_context(cancellation: Cancellation) -> contextvars.Context:
+    """Copy of the current context carrying `cancellation`, to create request tasks in"""
+    context = contextvars.copy_context()
+    context.run(_cancellation.set, cancellation)
+    return context
+
+
+async def run_cancellable(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Await a coroutine on this thread's event loop, cancelling it with the current request
+
+    Meant for event loops started in worker threads (asyncio.run inside
+    asyncio.to_thread), which the request's own task cannot cancel.
+    """
+    cancellation = current_cancellation()
+    if cancellation is None:
+        return await coroutine
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+
+    def cancel():
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            # The loop has already finished
+            pass
+
+    cancellation.add_callback(cancel)
+    try:
+        return await coroutine
+    finally:
+        cancellation.remove_callback(cancel)
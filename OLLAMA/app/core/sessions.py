@@ -0,0 +1,289 @@
+import json
+import time
+import asyncio
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
+
+from app.config import (
+    SESSION_BACKEND,
+    SESSION_MAX_SESSIONS,
+    SESSION_TTL_SECONDS,
+    SESSION_TOKEN_BUDGET,
+    SESSION_KEEP_MESSAGES,
+    REDIS_URL,
+    SUMMARY_PROMPT,
+)
+from app.core.chunking import count_tokens
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownSessionError(Exception):
+    """Raised when a request names a session the server did not create or has expired"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Unknown or expired session: {session_id}")
+        self.session_id = session_id
+
+
+def _empty_session() -> Dict[str, Any]:
+    return {"summary": "", "messages": [], "updated_at": time.time()}
+
+
+class SessionBackend:
+    """Storage for conversation sessions, keyed by session ID"""
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def set(self, session_id: str, session: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def update(self, session_id: str, change: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """
+        Apply `change` to a stored session atomically
+
+        Args:
+            session_id: The session to change
+            change: Function modifying the session in place
+
+        Returns:
+            The updated session, or None if it does not exist
+        """
+        raise NotImplementedError
+
+    async def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local LRU of sessions with idle expiry"""
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self.ttl_seconds and time.time() - session["updated_at"] > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def set(self, session_id: str, session: Dict[str, Any]) -> None:
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def update(self, session_id: str, change: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        # No await between reading and writing, so nothing can interleave
+        session = await self.get(session_id)
+        if session is not None:
+            change(session)
+        return session
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+class RedisSessionBackend(SessionBackend):
+    """Sessions shared between workers through Redis (requires the redis package)"""
+
+    def __init__(self, url: str = REDIS_URL, ttl_seconds: int = SESSION_TTL_SECONDS):
+        import redis.asyncio as redis
+        from redis.exceptions import WatchError
+
+        self.client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self._watch_error = WatchError
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(f"chat-session:{session_id}")
+        return json.loads(raw) if raw else None
+
+    async def set(self, session_id: str, session: Dict[str, Any]) -> None:
+        await self.client.set(f"chat-session:{session_id}", json.dumps(session), ex=self.ttl_seconds or None)
+
+    async def update(self, session_id: str, change: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        # WATCH/MULTI: the write is discarded and retried if another worker wrote the session in between
+        key = f"chat-session:{session_id}"
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if not raw:
+                        return None
+                    session = json.loads(raw)
+                    change(session)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(session), ex=self.ttl_seconds or None)
+                    await pipe.execute()
+                    return session
+                except self._watch_error:
+                    continue
+
+    async def delete(self, session_id: str) -> None:
+        await self.client.delete(f"chat-session:{session_id}")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_backend(name: str = SESSION_BACKEND) -> SessionBackend:
+    """Create the configured session backend, falling back to memory"""
+    if name == "redis":
+        try:
+            return RedisSessionBackend()
+        except ImportError as e:
+            logger.error(f"Redis session backend unavailable, using in-memory sessions: {str(e)}")
+    return InMemorySessionBackend()
+
+
+class SessionStore:
+    """
+    Server-side conversation history with rolling summarization
+
+    Each session holds a running summary plus the most recent messages. When
+    their token count exceeds SESSION_TOKEN_BUDGET, the older messages are
+    folded into the summary by the LLM in a background task, so requests only
+    need to carry the new message and prompts stay bounded.
+
+    Session IDs are generated by the server; requests naming any other ID are
+    rejected with UnknownSessionError.
+    """
+
+    def __init__(self, backend: SessionBackend, token_budget: int = SESSION_TOKEN_BUDGET,
+                 keep_messages: int = SESSION_KEEP_MESSAGES):
+        self.backend = backend
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def create(self, client_history: Optional[List[Dict[str, str]]] = None) -> str:
+        """
+        Start a session
+
+        Args:
+            client_history: History sent by the client; seeds the session
+
+        Returns:
+            The new session ID
+        """
+        session_id = secrets.token_urlsafe(24)
+        session = _empty_session()
+        session["messages"] = [
+            {"role": getattr(m["role"], "value", m["role"]), "content": m["content"]} for m in client_history or []
+        ]
+        await self.backend.set(session_id, session)
+        return session_id
+
+    async def load(
+            self,
+            session_id: Optional[str],
+            client_history: Optional[List[Dict[str, str]]] = None
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Get the conversation context for a request
+
+        Args:
+            session_id: Session ID from create(), or None for a stateless request
+            client_history: History sent by the client, used by stateless requests
+
+        Returns:
+            Tuple of (summary, messages)
+
+        Raises:
+            UnknownSessionError: The session does not exist or has expired
+        """
+        client_history = client_history or []
+        if not session_id:
+            return "", client_history
+
+        session = await self.backend.get(session_id)
+        record_cache("session", session is not None)
+        if session is None:
+            raise UnknownSessionError(session_id)
+        return session["summary"], list(session["messages"])
+
+    async def append_turn(self, session_id: str, query: str, answer: str) -> None:
+        """Record a user message and the assistant's answer"""
+        def append(session: Dict[str, Any]) -> None:
+            session["messages"].extend([
+                {"role": "user", "content": query},
+                {"role": "assistant", "content": answer},
+            ])
+            session["updated_at"] = time.time()
+
+        session = await self.backend.update(session_id, append)
+        if session is None:
+            logger.warning(f"Session {session_id} expired before its turn was recorded")
+            return
+
+        if self._token_count(session) > self.token_budget and session_id not in self._summarizing:
+            self._summarizing.add(session_id)
+            task = asyncio.create_task(self._summarize(session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def delete(self, session_id: str) -> None:
+        await self.backend.delete(session_id)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await self.backend.close()
+
+    def _token_count(self, session: Dict[str, Any]) -> int:
+        return count_tokens(session["summary"]) + sum(count_tokens(m["content"]) for m in session["messages"])
+
+    async def _summarize(self, session_id: str) -> None:
+        """Fold all but the most recent messages into the running summary"""
+        try:
+            session = await self.backend.get(session_id)
+            if session is None or len(session["messages"]) <= self.keep_messages:
+                return
+
+            older = session["messages"][:-self.keep_messages] if self.keep_messages else session["messages"]
+            summary = await self._summarize_messages(session["summary"], older)
+            if not summary:
+                return
+
+            def fold(latest: Dict[str, Any]) -> None:
+                # Messages may have been appended meanwhile; drop only what was summarized,
+                # unless another worker summarized them first
+                if latest["messages"][:len(older)] == older:
+                    latest["summary"] = summary
+                    latest["messages"] = latest["messages"][len(older):]
+
+            if await self.backend.update(session_id, fold) is not None:
+                logger.info(f"Summarized {len(older)} messages of session {session_id}")
+        except Exception as e:
+            logger.error(f"Error summarizing session {session_id}: {str(e)}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def _summarize_messages(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        from app.core.ollama_client import ollama_client
+
+        transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", transcript=transcript)
+        # Failures raise instead of returning an apology as the summary
+        answer = await ollama_client.aquery(prompt, system_prompt="You summarize customer support conversations.")
+        return answer.strip()
+
+
+# Create a singleton instance
+session_store = SessionStore(create_backend())
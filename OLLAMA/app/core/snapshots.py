@@ -0,0 +1,349 @@
+"""
+Snapshots of the vector index, to build it once and ship it to every replica
+
+A snapshot is a directory of plain files:
+- embeddings.npy: every chunk embedding as one contiguous float32 (count, dim) array
+- ids.bin / texts.bin: chunk IDs and texts as UTF-8 columns, with offsets in *.offsets.npy
+- metadata.json: chunk metadata as columns (one value list per key)
+- manifest.json: format version, embedding model, shape and SHA-256 of every file
+
+Loading memory-maps the arrays and columns, so it costs no parsing or copying
+of the embeddings. Importing into Chroma reuses the stored embeddings instead
+of running the embedding model again.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.config import EMBEDDING_MODEL, EMBEDDING_BACKEND, SNAPSHOT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.bin"
+TEXTS_FILE = "texts.bin"
+METADATA_FILE = "metadata.json"
+
+
+class SnapshotError(Exception):
+    """The snapshot cannot be written, read or used with this index"""
+    pass
+
+
+def _offsets_file(column_file: str) -> str:
+    return f"{os.path.splitext(column_file)[0]}.offsets.npy"
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StringColumn:
+    """Memory-mapped column of UTF-8 strings, read one row or one slice at a time"""
+
+    def __init__(self, data_path: str, offsets_path: str):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        # np.memmap refuses empty files
+        self.data = np.memmap(data_path, dtype=np.uint8, mode="r") if self.offsets[-1] else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def slice(self, start: int, stop: int) -> List[str]:
+        return [self[index] for index in range(start, min(stop, len(self)))]
+
+
+class _StringColumnWriter:
+    """Appends strings to a column file, recording where each one ends"""
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        self.file = open(data_path, "wb")
+        self.offsets = [0]
+
+    def extend(self, values: List[str]) -> None:
+        for value in values:
+            encoded = (value or "").encode("utf-8")
+            self.file.write(encoded)
+            self.offsets.append(self.offsets[-1] + len(encoded))
+
+    def close(self) -> None:
+        self.file.close()
+        np.save(_offsets_file(self.data_path), np.asarray(self.offsets, dtype=np.int64))
+
+
+class Snapshot:
+    """A loaded snapshot; embeddings and columns are memory-mapped, not read"""
+
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        self.ids = StringColumn(os.path.join(path, IDS_FILE), os.path.join(path, _offsets_file(IDS_FILE)))
+        self.texts = StringColumn(os.path.join(path, TEXTS_FILE), os.path.join(path, _offsets_file(TEXTS_FILE)))
+        self._metadata_columns: Optional[Dict[str, List[Any]]] = None
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def metadata_columns(self) -> Dict[str, List[Any]]:
+        # Parsed on first use, so opening a snapshot stays a memory-map
+        if self._metadata_columns is None:
+            with open(os.path.join(self.path, METADATA_FILE)) as f:
+                self._metadata_columns = json.load(f)
+        return self._metadata_columns
+
+    def metadatas(self, start: int, stop: int) -> List[Optional[Dict[str, Any]]]:
+        """Metadata of rows start..stop, None for rows without any"""
+        rows = []
+        for index in range(start, min(stop, len(self))):
+            metadata = {
+                key: values[index] for key, values in self.metadata_columns.items() if values[index] is not None
+            }
+            rows.append(metadata or None)
+        return rows
+
+
+PAGE_FIELDS = ["embeddings", "documents", "metadatas"]
+
+
+def _hash_page(digest, page: Dict[str, Any]) -> None:
+    """Add a page of the collection to a content digest"""
+    digest.update(json.dumps([page["ids"], page["documents"], page["metadatas"]], sort_keys=True).encode())
+    digest.update(np.asarray(page["embeddings"], dtype=np.float32).tobytes())
+
+
+def _collection_digest(collection, count: int, batch_size: int) -> str:
+    """Content digest of the first `count` chunks of a collection, read in pages"""
+    digest = hashlib.sha256()
+    for offset in range(0, count, batch_size):
+        _hash_page(digest, collection.get(limit=batch_size, offset=offset, include=PAGE_FIELDS))
+    return digest.hexdigest()
+
+
+def export_snapshot(collection, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Write a snapshot of a Chroma collection
+
+    The files are written to a staging directory that replaces `path` once
+    complete, so readers never see a partial snapshot. The collection is read
+    in pages, then read again to compare content digests: if a chunk was
+    added, updated or deleted meanwhile, the export fails instead of
+    producing a mix of two states.
+
+    Args:
+        collection: The Chroma collection (VectorStore.db._collection)
+        path: Snapshot directory
+        batch_size: Chunks read per page
+
+    Returns:
+        The manifest
+
+    Raises:
+        SnapshotError: The collection changed during the export
+    """
+    start_time = time.perf_counter()
+    count = collection.count()
+    staging = f"{path.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    try:
+        ids = _StringColumnWriter(os.path.join(staging, IDS_FILE))
+        texts = _StringColumnWriter(os.path.join(staging, TEXTS_FILE))
+        metadata_rows = []
+        embeddings = None
+        dimension = 0
+        digest = hashlib.sha256()
+
+        for offset in range(0, count, batch_size):
+            page = collection.get(limit=batch_size, offset=offset, include=PAGE_FIELDS)
+            if not page["ids"]:
+                raise SnapshotError("The collection shrank during the export")
+            _hash_page(digest, page)
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if embeddings is None:
+                dimension = vectors.shape[1]
+                embeddings = np.lib.format.open_memmap(
+                    os.path.join(staging, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(count, dimension)
+                )
+            if offset + len(page["ids"]) > count:
+                raise SnapshotError("The collection grew during the export")
+            embeddings[offset:offset + len(vectors)] = vectors
+            ids.extend(page["ids"])
+            texts.extend(page["documents"])
+            metadata_rows.extend(metadata or {} for metadata in page["metadatas"])
+
+        ids.close()
+        texts.close()
+        if (len(metadata_rows) != count or collection.count() != count
+                or _collection_digest(collection, count, batch_size) != digest.hexdigest()):
+            raise SnapshotError("The collection changed during the export")
+
+        if embeddings is None:
+            np.save(os.path.join(staging, EMBEDDINGS_FILE), np.zeros((0, 0), dtype=np.float32))
+        else:
+            embeddings.flush()
+            del embeddings
+
+        keys = sorted({key for metadata in metadata_rows for key in metadata})
+        with open(os.path.join(staging, METADATA_FILE), "w") as f:
+            json.dump({key: [metadata.get(key) for metadata in metadata_rows] for key in keys}, f)
+
+        files = {}
+        for name in sorted(os.listdir(staging)):
+            files[name] = {"sha256": _sha256(os.path.join(staging, name)),
+                           "bytes": os.path.getsize(os.path.join(staging, name))}
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            # Identifies the content: equal snapshots have equal IDs
+            "snapshot_id": hashlib.sha256(
+                "".join(files[name]["sha256"] for name in sorted(files)).encode()
+            ).hexdigest()[:16],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "embedding_model": EMBEDDING_MODEL,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "count": count,
+            "dimension": dimension,
+            "dtype": "float32",
+            "files": files,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the complete snapshot in; a previous one is removed only afterwards
+        previous = f"{path.rstrip(os.sep)}.{os.getpid()}.old"
+        if os.path.exists(path):
+            os.replace(path, previous)
+        os.replace(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Exported {count} chunks to snapshot {manifest['snapshot_id']} at {path} "
+                f"in {time.perf_counter() - start_time:.2f}s")
+    return manifest
+
+
+def load_snapshot(path: str, verify: bool = False) -> Snapshot:
+    """
+    Open a snapshot
+
+    Args:
+        path: Snapshot directory
+        verify: Check every file against its manifest checksum (reads the whole snapshot)
+
+    Returns:
+        The memory-mapped snapshot
+
+    Raises:
+        SnapshotError: Missing, unsupported or corrupt snapshot
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise SnapshotError(f"No snapshot manifest at {manifest_path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != expected["bytes"]:
+            raise SnapshotError(f"Snapshot file {name} is missing or truncated")
+        if verify and _sha256(file_path) != expected["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for snapshot file {name}")
+
+    snapshot = Snapshot(path, manifest)
+    if snapshot.embeddings.shape[0] != manifest["count"] or len(snapshot.ids) != manifest["count"]:
+        raise SnapshotError("Snapshot files do not match the manifest count")
+    return snapshot
+
+
+def import_snapshot(collection, path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> int:
+    """
+    Load a snapshot into a Chroma collection without re-embedding
+
+    Chunks are upserted under their original IDs, so importing twice is
+    harmless. The snapshot must come from the configured embedding model,
+    otherwise its vectors would not be comparable with query embeddings.
+
+    Args:
+        collection: The Chroma collection (VectorStore.db._collection)
+        path: Snapshot directory
+        batch_size: Chunks written per upsert
+
+    Returns:
+        Number of chunks imported
+
+    Raises:
+        SnapshotError: Invalid snapshot or different embedding model
+    """
+    start_time = time.perf_counter()
+    snapshot = load_snapshot(path, verify=True)
+    manifest = snapshot.manifest
+    if manifest["embedding_model"] != EMBEDDING_MODEL:
+        raise SnapshotError(
+            f"Snapshot embeddings come from {manifest['embedding_model']}, the index uses {EMBEDDING_MODEL}"
+        )
+    if manifest["embedding_backend"] != EMBEDDING_BACKEND:
+        logger.warning(f"Snapshot embedded with the {manifest['embedding_backend']} backend, "
+                       f"queries use {EMBEDDING_BACKEND}; scores may differ slightly")
+
+    for start in range(0, len(snapshot), batch_size):
+        stop = min(start + batch_size, len(snapshot))
+        collection.upsert(
+            ids=snapshot.ids.slice(start, stop),
+            embeddings=np.ascontiguousarray(snapshot.embeddings[start:stop]),
+            documents=snapshot.texts.slice(start, stop),
+            metadatas=snapshot.metadatas(start, stop),
+        )
+
+    logger.info(f"Imported {len(snapshot)} chunks from snapshot {manifest['snapshot_id']} "
+                f"in {time.perf_counter() - start_time:.2f}s")
+    return len(snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import snapshots of the vector index")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("path", help="Snapshot directory")
+    parser.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE, help="Chunks per read or write")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "verify":
+        print(json.dumps(load_snapshot(args.path, verify=True).manifest, indent=2))
+        return
+
+    from app.core.vector_store import VectorStore, vector_store
+    # Snapshots are of the local index, whatever VECTOR_STORE_BACKEND the shared .env selects
+    store = vector_store if isinstance(vector_store, VectorStore) else VectorStore()
+    if args.command == "export":
+        print(json.dumps(export_snapshot(store.db._collection, args.path, args.batch_size), indent=2))
+    else:
+        print(import_snapshot(store.db._collection, args.path, args.batch_size))
+        store.db.persist()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+import sys
+import json
+import time
+import queue
+import random
+import inspect
+import logging
+import functools
+import importlib
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from app.config import TRACE_EXPORTER, TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_ID_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Spans exported together, and the longest a finished span waits for export
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL = 1.0
+# Finished spans are dropped rather than queued without bound if the exporter stalls
+MAX_QUEUED_SPANS = 10000
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "sampled", "attributes", "start", "_start_perf",
+                 "duration", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = {}
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when the trace is not sampled"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter:
+    """Destination of finished spans"""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """Writes one line per span to stderr"""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        for span in spans:
+            attributes = " ".join(f"{k}={v}" for k, v in span["attributes"].items())
+            sys.stderr.write(
+                f"[trace {span['trace_id']}] {span['name']} {span['duration_ms']}ms {span['status']} "
+                f"span={span['span_id']} parent={span['parent_id'] or '-'} {attributes}\n"
+            )
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends spans as JSON lines to a file"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps spans in a list, for tests and debugging"""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self.spans.extend(spans)
+
+
+def create_exporter(name: str = TRACE_EXPORTER) -> Optional[SpanExporter]:
+    """
+    Create the configured span exporter
+
+    Args:
+        name: "none", "console", "file", or "package.module:ClassName" of a SpanExporter
+
+    Returns:
+        The exporter, or None when tracing export is off
+    """
+    if not name or name == "none":
+        return None
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return FileSpanExporter()
+    try:
+        module_name, _, class_name = name.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)()
+    except Exception as e:
+        logger.error(f"Could not load span exporter {name}, tracing export disabled: {str(e)}")
+        return None
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[str, str, bool]]:
+    """(trace ID, parent span ID, sampled) from a W3C traceparent header"""
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3][:2], 16) & 1)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class Tracer:
+    """
+    Lightweight request tracer
+
+    The active span is held in a context variable, so it follows the request
+    through awaits, tasks and asyncio.to_thread without being passed around.
+    Sampling is decided once per trace: spans of unsampled traces are never
+    created, leaving only a trace ID for logs and the response header. Finished
+    spans of sampled traces are queued and exported in batches by a background
+    thread.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+        self._queue: queue.Queue = queue.Queue(MAX_QUEUED_SPANS)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace_id if span is not None else None
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, trace_id: Optional[str] = None) -> "_SpanScope":
+        """
+        Open the root span of a request
+
+        Args:
+            name: Span name
+            traceparent: Incoming W3C traceparent header; its trace ID, parent and sampling decision are kept
+            trace_id: Incoming plain trace ID, used when there is no traceparent
+
+        Returns:
+            Context manager yielding the root span
+        """
+        parent_id = None
+        parsed = parse_traceparent(traceparent) if traceparent else None
+        if parsed is not None:
+            trace_id, parent_id, sampled = parsed
+            sampled = sampled and self.exporter is not None
+        else:
+            trace_id = (trace_id or "").strip()[:64] or random.getrandbits(128).to_bytes(16, "big").hex()
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return _SpanScope(self, Span(name, trace_id, parent_id, sampled))
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Open a child span of the current span
+
+        Args:
+            name: Span name
+            **attributes: Initial span attributes
+
+        Returns:
+            Context manager yielding the span (a no-op outside sampled traces)
+        """
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return _NOOP_SCOPE
+        span = Span(name, parent.trace_id, parent.span_id, True)
+        if attributes:
+            span.attributes.update(attributes)
+        return _SpanScope(self, span)
+
+    def traced(self, name: str) -> Callable:
+        """Decorator running a function, sync or async, inside a span"""
+
+        def decorator(function: Callable) -> Callable:
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def traced_async(*args, **kwargs):
+                    with self.span(name):
+                        return await function(*args, **kwargs)
+                return traced_async
+
+            @functools.wraps(function)
+            def traced_sync(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return traced_sync
+
+        return decorator
+
+    def _finish(self, span: Span) -> None:
+        if not span.sampled or self.exporter is None:
+            return
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            return
+        if self._worker is None:
+            self._start_worker()
+
+    def _start_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+                self._worker.start()
+
+    def _export_loop(self) -> None:
+        while True:
+            batch, flushed = [], None
+            item = self._queue.get()
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    flushed = item
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= EXPORT_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._export(batch)
+            if flushed is not None:
+                flushed.set()
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.error(f"Error exporting {len(batch)} spans: {str(e)}")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export every finished span now"""
+        if self._worker is None:
+            return
+        # The worker exports what it holds once it reaches the marker
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        flushed.wait(timeout)
+
+    def shutdown(self) -> None:
+        self.flush()
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+class _SpanScope:
+    """Makes a span current for the duration of a with block"""
+
+    __slots__ = ("_tracer", "_span", "_token")
+
+    def __init__(self, tracer: Tracer, span: Span):
+        self._tracer = tracer
+        self._span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self._span
+        span.duration = time.perf_counter() - span._start_perf
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer._finish(span)
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NOOP_SPAN
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a root span per HTTP request
+
+    The trace continues an incoming W3C traceparent header or TRACE_ID_HEADER,
+    and the trace ID is returned in TRACE_ID_HEADER so clients can quote it.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None, header: str = TRACE_ID_HEADER):
+        self.app = app
+        self.tracer = tracer
+        self.header = header.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        active = self.tracer if self.tracer is not None else tracer
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent")
+        trace_id = headers.get(self.header)
+
+        with active.start_trace(
+                f"{scope['method']} {scope['path']}",
+                traceparent=traceparent.decode("latin-1") if traceparent else None,
+                trace_id=trace_id.decode("latin-1") if trace_id else None
+        ) as span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", []), (self.header, span.trace_id.encode())]
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+
+def install_log_correlation() -> None:
+    """Give every log record a trace_id attribute ("-" outside a request)"""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "adds_trace_id", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        span = _current_span.get()
+        record.trace_id = span.trace_id if span is not None else "-"
+        return record
+
+    record_factory.adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
+
+
+# Create a singleton instance
+tracer = Tracer(create_exporter())
@@ -1,36 +1,74 @@
 import os
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from app.config import (
+    VECTOR_STORE_DIR,
+    TOP_K_RESULTS,
+    RETRIEVAL_MAX_K,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_SCORE_GAP,
+    VECTOR_STORE_BACKEND,
+)
+from app.core.chunking import chunker_for_metadata
+from app.core.embeddings import create_embedding_model
+from app.core.metrics import QUERY_EMBEDDING_SECONDS, VECTOR_SEARCH_SECONDS
+from app.core.tracing import tracer
 
-from app.config import VECTOR_STORE_DIR, CHUNK_SIZE, CHUNK_OVERLAP, TOP_K_RESULTS
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
 
 logger = logging.getLogger(__name__)
 
 
+def select_relevant(
+        documents: List[Dict[str, Any]],
+        min_score: float = RETRIEVAL_MIN_SCORE,
+        max_k: int = RETRIEVAL_MAX_K,
+        score_gap: float = RETRIEVAL_SCORE_GAP
+) -> List[Dict[str, Any]]:
+    """
+    Choose how many search results to keep from their score distribution
+
+    Results under min_score are dropped, then the list is cut at the largest
+    drop between consecutive scores if that drop is at least score_gap (the
+    elbow between relevant and merely nearest chunks), and capped at max_k.
+    An empty list means nothing is relevant and context should be skipped.
+
+    Args:
+        documents: Search results with relevance_score, best first
+        min_score: Minimum relevance score
+        max_k: Maximum number of results
+        score_gap: Smallest score drop treated as an elbow
+
+    Returns:
+        The relevant prefix of the results
+    """
+    kept = [doc for doc in documents if doc.get("relevance_score", 0.0) >= min_score][:max_k]
+    if len(kept) < 2:
+        return kept
+
+    scores = [doc["relevance_score"] for doc in kept]
+    drops = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+    elbow = max(range(len(drops)), key=drops.__getitem__)
+    if drops[elbow] >= score_gap:
+        kept = kept[:elbow + 1]
+    return kept
+
+
 class VectorStore:
     """Vector database for storing and retrieving document embeddings"""
 
     def __init__(self):
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len,
-        )
+        self.embedding_model = create_embedding_model()
 
         self.db = self._load_or_create_db()
 
-    def _load_or_create_db(self) -> Chroma:
+    def _load_or_create_db(self) -> "Chroma":
         """Load existing vector store or create a new one"""
+        # Imported here, so workers using the sidecar backend never load Chroma
+        from langchain_community.vectorstores import Chroma
+
         try:
             if os.path.exists(VECTOR_STORE_DIR) and os.listdir(VECTOR_STORE_DIR):
                 logger.info(f"Loading vector store from {VECTOR_STORE_DIR}")
@@ -53,6 +91,43 @@ class VectorStore:
                 embedding_function=self.embedding_model
             )
 
+    def _split_documents(
+            self,
+            texts: List[str],
+            metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[int]]:
+        """
+        Split texts into chunks
+
+        The chunking strategy is chosen per document from its metadata
+        (see app.core.chunking.chunker_for_metadata).
+
+        Args:
+            texts: List of document texts
+            metadatas: List of metadata dictionaries for each document
+
+        Returns:
+            Tuple of (chunk_texts, chunk_metadatas, chunk_count_per_text)
+        """
+        split_texts = []
+        split_metadatas = []
+        chunk_counts = []
+
+        for i, text in enumerate(texts):
+            metadata = metadatas[i] if metadatas and i < len(metadatas) else None
+            chunker = chunker_for_metadata(metadata)
+            chunks = chunker.split_text(text)
+            split_texts.extend(chunks)
+            chunk_counts.append(len(chunks))
+
+            # Duplicate metadata for each chunk if provided; chunk_index lets
+            # the context builder merge neighbouring chunks back together
+            if metadata is not None:
+                for chunk_index in range(len(chunks)):
+                    split_metadatas.append({**metadata, "chunking": chunker.name, "chunk_index": chunk_index})
+
+        return split_texts, split_metadatas, chunk_counts
+
     def add_documents(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
         """
         Add documents to the vector store
@@ -66,17 +141,7 @@ class VectorStore:
         """
         try:
             # Split texts into chunks
-            split_texts = []
-            split_metadatas = []
-
-            for i, text in enumerate(texts):
-                chunks = self.text_splitter.split_text(text)
-                split_texts.extend(chunks)
-
-                # Duplicate metadata for each chunk if provided
-                if metadatas and i < len(metadatas):
-                    for _ in range(len(chunks)):
-                        split_metadatas.append(metadatas[i])
+            split_texts, split_metadatas, _ = self._split_documents(texts, metadatas)
 
             # Add to vector store
             ids = self.db.add_texts(
@@ -92,6 +157,38 @@ class VectorStore:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             return []
 
+    def add_documents_batch(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Add several documents with a single embedding pass and a single persist
+
+        Args:
+            texts: List of document texts
+            metadatas: List of metadata dictionaries, one per document
+
+        Returns:
+            List of chunk ID lists, one per input document (empty lists on failure)
+        """
+        try:
+            split_texts, split_metadatas, chunk_counts = self._split_documents(texts, metadatas)
+            if not split_texts:
+                return [[] for _ in texts]
+
+            # One add_texts call embeds every chunk of every document together
+            ids = self.db.add_texts(texts=split_texts, metadatas=split_metadatas)
+            self.db.persist()
+
+            grouped_ids = []
+            offset = 0
+            for count in chunk_counts:
+                grouped_ids.append(ids[offset:offset + count])
+                offset += count
+
+            return grouped_ids
+        except Exception as e:
+            logger.error(f"Error adding document batch to vector store: {str(e)}")
+            return [[] for _ in texts]
+
+    @tracer.traced("vector_store.search")
     def search(self, query: str, k: int = TOP_K_RESULTS) -> List[Dict[str, Any]]:
         """
         Search for similar documents
@@ -104,21 +201,116 @@ class VectorStore:
             List of documents with their content and metadata
         """
         try:
-            results = self.db.similarity_search_with_relevance_scores(query, k=k)
-
-            documents = []
-            for doc, score in results:
-                documents.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "relevance_score": score
-                })
-
-            return documents
+            with QUERY_EMBEDDING_SECONDS.time(), tracer.span("vector_store.embed"):
+                embedding = self.embedding_model.embed_query(query)
+            return self.search_by_vectors([embedding], k)[0]
         except Exception as e:
             logger.error(f"Error searching vector store: {str(e)}")
             return []
 
+    @tracer.traced("vector_store.search_batch")
+    def search_batch(self, queries: List[str], k: int = TOP_K_RESULTS) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once
+
+        The queries are embedded in one batched forward pass and the index is
+        queried once with every embedding, instead of once per query.
+
+        Args:
+            queries: The search queries
+            k: Number of results to return per query
+
+        Returns:
+            One result list per query, in the same order (empty lists on failure)
+        """
+        if not queries:
+            return []
+        try:
+            with QUERY_EMBEDDING_SECONDS.time(), tracer.span("vector_store.embed", queries=len(queries)):
+                embeddings = self.embedding_model.embed_documents(queries)
+            return self.search_by_vectors(embeddings, k)
+        except Exception as e:
+            logger.error(f"Error batch searching vector store: {str(e)}")
+            return [[] for _ in queries]
+
+    def search_by_vectors(self, embeddings: List[List[float]], k: int) -> List[List[Dict[str, Any]]]:
+        """Nearest chunks for each query embedding, with relevance scores"""
+        with VECTOR_SEARCH_SECONDS.time(), tracer.span("vector_store.query", k=k, queries=len(embeddings)):
+            # The LangChain wrapper only queries one embedding at a time; Chroma's collection takes many
+            results = self.db._collection.query(
+                query_embeddings=embeddings,
+                n_results=k,
+                include=["documents", "metadatas", "distances"]
+            )
+        relevance = self.db._select_relevance_score_fn()
+
+        return [
+            [
+                {"content": content, "metadata": metadata or {}, "relevance_score": relevance(distance)}
+                for content, metadata, distance in zip(contents, metadatas, distances)
+            ]
+            for contents, metadatas, distances in zip(
+                results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+    def delete_documents(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Delete chunks by ID or by metadata filter
+
+        Args:
+            ids: Chunk IDs to delete
+            where: Metadata filter, e.g. {"sha256": ...} for every chunk of a document
+
+        Returns:
+            True if the deletion was persisted
+        """
+        try:
+            self.db._collection.delete(ids=ids, where=where)
+            self.db.persist()
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting documents from vector store: {str(e)}")
+            return False
+
+    def export_snapshot(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Write a snapshot of the index (see app.core.snapshots)
+
+        Args:
+            path: Snapshot directory
+
+        Returns:
+            The snapshot manifest, or None on failure
+        """
+        from app.core.snapshots import export_snapshot
+
+        try:
+            return export_snapshot(self.db._collection, path)
+        except Exception as e:
+            logger.error(f"Error exporting vector store snapshot: {str(e)}")
+            return None
+
+    def import_snapshot(self, path: str) -> int:
+        """
+        Load a snapshot into the index, reusing its embeddings
+
+        Args:
+            path: Snapshot directory
+
+        Returns:
+            Number of chunks imported (0 on failure)
+        """
+        from app.core.snapshots import import_snapshot
+
+        try:
+            count = import_snapshot(self.db._collection, path)
+            self.db.persist()
+            return count
+        except Exception as e:
+            logger.error(f"Error importing vector store snapshot: {str(e)}")
+            return 0
+
     def get_relevant_context(self, query: str, k: int = TOP_K_RESULTS) -> str:
         """
         Get relevant context as a single string
@@ -134,12 +326,10 @@ class VectorStore:
         if not documents:
             return ""
 
-        # Filter out documents with low relevance scores
-        filtered_docs = [doc for doc in documents if doc["relevance_score"] > 0.5]
-
-        # If all documents have low relevance, use the original list
+        # Keep only the relevant prefix of the results
+        filtered_docs = select_relevant(documents, max_k=k)
         if not filtered_docs:
-            filtered_docs = documents
+            return ""
 
         # Create context string with source information
         context_parts = []
@@ -150,5 +340,9 @@ class VectorStore:
         return "\n".join(context_parts)
 
 
-# Create a singleton instance
-vector_store = VectorStore()
\ No newline at end of file
+# Create a singleton instance; with the sidecar backend the model and index live in one shared process
+if VECTOR_STORE_BACKEND == "sidecar":
+    from app.core.index_client import RemoteVectorStore
+    vector_store = RemoteVectorStore()
+else:
+    vector_store = VectorStore()
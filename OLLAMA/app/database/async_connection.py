@@ -0,0 +1,52 @@
+import logging
+from typing import AsyncGenerator
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def to_async_url(url: str) -> str:
+    """Switch a PostgreSQL URL to the asyncpg driver"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# Async engine used by the chat path so lookups never block the event loop
+async_engine = create_async_engine(
+    to_async_url(DATABASE_URL),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
+# asyncpg raises plain OSError (not a SQLAlchemyError) when the server is unreachable
+ASYNC_DB_ERRORS = (SQLAlchemyError, OSError)
+
+# Create async session factory
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def close_async_db():
+    """Dispose of pooled async connections"""
+    await async_engine.dispose()
+    logger.info("Async database connections closed")
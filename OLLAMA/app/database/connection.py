@@ -4,7 +4,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +12,10 @@ logger = logging.getLogger(__name__)
 engine = create_engine(
     DATABASE_URL,
     poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
     echo=True  # Set to False in production
 )
 
@@ -44,7 +44,7 @@ def init_db():
             logger.info("✅ Database connection successful")
 
             # Create all tables defined in models
-            from app.database.models import Document, Product, Category, Client, Panier, LignePanier, Commande, Livraison, Paiement
+            from app.database.models import Document, FAQ, Product, Category, Client, Panier, LignePanier, Commande, Livraison, Paiement
             Base.metadata.create_all(bind=engine)
             logger.info("✅ All database tables created successfully")
 
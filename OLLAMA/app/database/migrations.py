@@ -0,0 +1,74 @@
+import logging
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from sqlalchemy import text
+
+from app.config import CATALOG_NOTIFY_CHANNEL
+from app.database.connection import engine
+
+logger = logging.getLogger(__name__)
+
+# Produit has no updatedAt column, so changes are pushed with NOTIFY instead of
+# polled with a watermark. The triggers fire for every writer, including the Node backend.
+CATALOG_TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        '{CATALOG_NOTIFY_CHANNEL}',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+CATALOG_TRIGGER_TABLES = ["Produit", "Category"]
+
+
+def install_catalog_triggers() -> None:
+    """Create (or replace) the change-notification triggers used by the product catalog cache"""
+    with engine.begin() as conn:
+        conn.execute(text(CATALOG_TRIGGER_FUNCTION))
+        for table in CATALOG_TRIGGER_TABLES:
+            trigger = f"{table.lower()}_catalog_change"
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger} ON "{table}"'))
+            conn.execute(text(
+                f'CREATE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+                f'FOR EACH ROW EXECUTE FUNCTION notify_catalog_change()'
+            ))
+    logger.info(f"Catalog change triggers installed on {', '.join(CATALOG_TRIGGER_TABLES)}")
+
+
+# Indexes behind DBService.search_products: trigram GIN for ILIKE '%...%' and <%,
+# and a full-text GIN index on the designation
+PRODUCT_SEARCH_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS produit_designation_trgm_idx ON "Produit" USING gin (designation gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS produit_designation_fts_idx ON "Produit" '
+    "USING gin (to_tsvector('simple', designation))",
+]
+
+
+def install_product_search_indexes() -> None:
+    """Enable pg_trgm and create the product name search indexes"""
+    with engine.begin() as conn:
+        for statement in PRODUCT_SEARCH_INDEXES:
+            conn.execute(text(statement))
+    logger.info("Product search indexes installed")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    print("Installing catalog change triggers...")
+    install_catalog_triggers()
+    print("Installing product search indexes...")
+    install_product_search_indexes()
+    print("Migrations complete.")
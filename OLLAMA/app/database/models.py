@@ -134,4 +134,15 @@ class Document(Base):
     file_path = Column(String(255), nullable=False)  # Path to the file in the filesystem
     doc_metadata = Column(JSON, nullable=True)  # Additional metadata as JSON
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Canonical questions with approved answers, served without the LLM
+class FAQ(Base):
+    __tablename__ = "FAQ"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,15 +1,18 @@
+import hmac
 import logging
-from typing import Generator
+from typing import Generator, Optional
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
 
+from app.config import ADMIN_API_KEY
 from app.utils.db import get_db
 
 logger = logging.getLogger(__name__)
 
 # Security scheme for optional authentication
 security = HTTPBearer(auto_error=False)
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
 
 
 async def validate_token(
@@ -38,4 +41,26 @@ async def validate_token(
         )
 
     # For development purposes, accept any token
-    return True
\ No newline at end of file
+    return True
+
+
+async def require_admin_key(api_key: Optional[str] = Depends(admin_key_header)) -> None:
+    """
+    Restrict an endpoint to holders of ADMIN_API_KEY
+
+    Args:
+        api_key: Value of the X-Admin-Key header
+
+    Raises:
+        HTTPException: 403 when no admin key is configured, 401 when the header is missing or wrong
+    """
+    if not ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoint disabled: ADMIN_API_KEY is not configured"
+        )
+    if not api_key or not hmac.compare_digest(api_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing admin key"
+        )
@@ -1,15 +1,23 @@
 import logging
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.routes import chat, admin
-from app.config import API_PREFIX, API_V1_STR, PROJECT_NAME, DEBUG
+from app.config import API_PREFIX, API_V1_STR, PROJECT_NAME, DEBUG, TRACE_ID_HEADER
 from app.database.connection import init_db
+from app.database.async_connection import close_async_db
+from app.core.catalog import catalog_sync
+from app.core.sessions import session_store
+from app.api.services.faq_service import FAQService
+from app.core.metrics import REGISTRY
+from app.core.tracing import tracer, TracingMiddleware, install_log_correlation
 
-# Configure logging
+# Configure logging; every line carries the trace ID of the request it belongs to
+install_log_correlation()
 logging.basicConfig(
     level=logging.DEBUG if DEBUG else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] - %(message)s",
 )
 
 logger = logging.getLogger(__name__)
@@ -30,8 +38,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_ID_HEADER],
 )
 
+# Open a trace per request, continuing the caller's traceparent or trace ID header
+app.add_middleware(TracingMiddleware)
+
 # Create API router
 api_router = APIRouter()
 
@@ -54,6 +66,18 @@ async def startup_event():
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
+    # Chat lookups fall back to the database until the catalog is loaded
+    await catalog_sync.start()
+    await FAQService.load_index()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and release pooled connections on shutdown"""
+    await catalog_sync.stop()
+    await session_store.close()
+    await close_async_db()
+    tracer.shutdown()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -67,6 +91,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics of this worker"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=DEBUG)
\ No newline at end of file
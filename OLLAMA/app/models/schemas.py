@@ -19,12 +19,25 @@ class ChatRequest(BaseModel):
     query: str = Field(..., description="User query")
     history: Optional[List[Message]] = Field(default=[], description="Chat history")
     metadata: Optional[Dict[str, Any]] = Field(default={}, description="Additional metadata")
+    session_id: Optional[str] = Field(default=None, description="Server-side session returned by an earlier response; history is then kept by the server")
+    new_session: bool = Field(default=False, description="Start a server-side session, seeded with history; its ID is returned in the response")
 
 
 class ChatResponse(BaseModel):
     answer: str
     context: Optional[List[str]] = None
     sources: Optional[List[str]] = None
+    session_id: Optional[str] = None
+    degraded: bool = Field(default=False, description="Answered from retrieved facts without generation")
+
+
+class BatchChatRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, description="Independent queries, answered without history")
+    stream: bool = Field(default=False, description="Stream results as NDJSON in completion order")
+
+
+class BatchChatResponse(BaseModel):
+    results: List[ChatResponse]
 
 
 class DocumentType(str, Enum):
@@ -46,6 +59,25 @@ class DocumentInfo(DocumentUpload):
     created_at: datetime
     updated_at: datetime
     file_path: str
+    duplicate: bool = False
+    ignored_fields: List[str] = Field(
+        default_factory=list,
+        description="Upload fields not applied because the content was already stored"
+    )
+
+
+class BulkUploadResult(BaseModel):
+    filename: str
+    document_type: Optional[DocumentType] = None
+    success: bool
+    document: Optional[DocumentInfo] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResponse(BaseModel):
+    results: List[BulkUploadResult]
+    succeeded: int
+    failed: int
 
 
 class ErrorResponse(BaseModel):
@@ -74,4 +106,22 @@ class ProductStockResponse(BaseModel):
     product_name: Optional[str] = None
     available: int
     price: float
-    details: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    details: Optional[Dict[str, Any]] = None
+
+
+class FAQCreate(BaseModel):
+    question: str = Field(..., min_length=1, description="Canonical question")
+    answer: str = Field(..., min_length=1, description="Approved answer returned without the LLM")
+
+
+class FAQInfo(FAQCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class FAQCandidate(BaseModel):
+    question: str
+    count: int
+    examples: List[str]
+    draft_answer: Optional[str] = None
@@ -1,9 +1,9 @@
 import logging
 from typing import Dict, List, Any, Optional
 from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
 
-from app.database.connection import SessionLocal
+from app.database.async_connection import AsyncSessionLocal, ASYNC_DB_ERRORS
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +12,11 @@ class AuthDBService:
     """Service for interacting with the e-commerce database with authentication awareness"""
 
     @staticmethod
+    @tracer.traced("db.get_recent_orders_for_authenticated_user")
     async def get_recent_orders_for_authenticated_user(user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get recent orders for the authenticated user"""
         try:
-            with SessionLocal() as db:
+            async with AsyncSessionLocal() as db:
                 # If no user_id is provided, we can't fetch orders
                 if not user_id:
                     return []
@@ -33,40 +34,42 @@ class AuthDBService:
                              LIMIT 5
                              """)
 
-                results = db.execute(query, {"user_id": user_id}).fetchall()
+                results = (await db.execute(query, {"user_id": user_id})).fetchall()
 
                 if results:
                     return [dict(row._mapping) for row in results]
                 return []
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_recent_orders_for_authenticated_user: {str(e)}")
             return []
 
     @staticmethod
+    @tracer.traced("db.get_user_info")
     async def get_user_info(user_id: int) -> Optional[Dict[str, Any]]:
         """Get user information"""
         try:
-            with SessionLocal() as db:
+            async with AsyncSessionLocal() as db:
                 query = text("""
                              SELECT *
                              FROM "Client"
                              WHERE id = :user_id
                              """)
 
-                result = db.execute(query, {"user_id": user_id}).first()
+                result = (await db.execute(query, {"user_id": user_id})).first()
 
                 if result:
                     return dict(result._mapping)
                 return None
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_user_info: {str(e)}")
             return None
 
     @staticmethod
+    @tracer.traced("db.get_user_orders")
     async def get_user_orders(user_id: int) -> List[Dict[str, Any]]:
         """Get all orders for a specific user"""
         try:
-            with SessionLocal() as db:
+            async with AsyncSessionLocal() as db:
                 query = text("""
                              SELECT c.*,
                                     l."statutLivraison",
@@ -79,12 +82,12 @@ class AuthDBService:
                              ORDER BY c.id DESC
                              """)
 
-                results = db.execute(query, {"user_id": user_id}).fetchall()
+                results = (await db.execute(query, {"user_id": user_id})).fetchall()
 
                 if results:
                     return [dict(row._mapping) for row in results]
                 return []
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_user_orders: {str(e)}")
             return []
 
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Coroutine, NamedTuple, Optional
+
+from starlette.requests import Request
+
+from app.core.metrics import CANCELLED_REQUESTS
+from app.core.resilience import Cancellation, cancellable_context
+
+logger = logging.getLogger(__name__)
+
+# Non-standard status logged for requests whose client went away (as nginx does)
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnectedError(Exception):
+    """The client disconnected before its request was answered"""
+    pass
+
+
+class Branch(NamedTuple):
+    """One independent step of a fan-out, with its own timeout and fallback value"""
+    awaitable: Awaitable[Any]
+    timeout: float
+    default: Any = None
+
+
+async def gather_branches(branches: Dict[str, Branch], deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run independent branches concurrently and collect whatever finished in time
+
+    Each branch is bounded by its own timeout, and the whole fan-out by the
+    deadline. A branch that times out, fails or is still running at the
+    deadline contributes its default value, so callers always get partial data
+    instead of an error.
+
+    Args:
+        branches: Branches keyed by name
+        deadline: Overall limit in seconds (None waits for every branch timeout)
+
+    Returns:
+        Dict of branch name to result or default
+    """
+    tasks = {
+        name: asyncio.ensure_future(asyncio.wait_for(branch.awaitable, branch.timeout))
+        for name, branch in branches.items()
+    }
+    if not tasks:
+        return {}
+
+    try:
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    except asyncio.CancelledError:
+        # The request was cancelled: its branches are of no use to anyone
+        for task in tasks.values():
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for name, task in tasks.items():
+        branch = branches[name]
+        if task not in done:
+            logger.warning(f"Branch {name} still running at the {deadline}s deadline, using default")
+            results[name] = branch.default
+        elif task.exception() is not None:
+            error = task.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                logger.warning(f"Branch {name} timed out after {branch.timeout}s, using default")
+            else:
+                logger.error(f"Branch {name} failed: {str(error)}")
+            results[name] = branch.default
+        else:
+            results[name] = task.result()
+    return results
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client has disconnected"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Coroutine[Any, Any, Any], route: str) -> Any:
+    """
+    Await the work of a request unless its client disconnects first
+
+    The work runs as a task carrying a Cancellation. When the client goes
+    away, the task is cancelled and the cancellation aborts what it started in
+    worker threads, such as a generation in flight to Ollama, so the capacity
+    goes to requests someone still waits for.
+
+    Args:
+        request: The request whose connection is watched (its body must have been read)
+        work: Coroutine producing the response
+        route: Route name for the cancelled requests metric
+
+    Returns:
+        The result of the work
+
+    Raises:
+        ClientDisconnectedError: The client disconnected first
+    """
+    cancellation = Cancellation()
+    # A task runs in a copy of the context current at its creation, so it carries the cancellation
+    task = cancellable_context(cancellation).run(asyncio.get_running_loop().create_task, work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        # The server itself gave up on the request (e.g. shutdown)
+        cancellation.cancel()
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if task.done():
+        return task.result()
+
+    cancellation.cancel()
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Cancelled {route} request failed: {str(task.exception())}")
+    CANCELLED_REQUESTS.labels(route).inc()
+    logger.info(f"Client disconnected, cancelled {route} request")
+    raise ClientDisconnectedError(f"Client disconnected from {route} request")
@@ -1,64 +1,126 @@
 import logging
 from typing import Dict, List, Any, Optional
 from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
 
-from app.database.connection import SessionLocal, get_db
+from app.config import PRODUCT_SEARCH_MIN_SIMILARITY, PRODUCT_SEARCH_LIMIT
+from app.database.connection import get_db
+from app.database.async_connection import AsyncSessionLocal, ASYNC_DB_ERRORS
+from app.core.catalog import product_catalog
+from app.core.metrics import record_cache
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# PostgreSQL is case-sensitive with quoted identifiers
+# Ensure we use exact case matching for column names
+PRODUCT_SELECT = """
+                 SELECT p.*,
+                        c.name  as category_name,
+                        CASE
+                            WHEN p."qteStock" > p."seuilMin" THEN 'In Stock'
+                            WHEN p."qteStock" > 0 THEN 'Low Stock'
+                            ELSE 'Out of Stock'
+                            END as stock_status
+                 FROM "Produit" p
+                          LEFT JOIN "Category" c ON p."categoryId" = c.id
+                 WHERE p.deleted = FALSE
+                 """
+
+
+# Ranked name search, served by the pg_trgm and full-text GIN indexes from
+# app.database.migrations.install_product_search_indexes. Designations containing
+# the name rank first, then by trigram word similarity (typo tolerant) and text rank.
+PRODUCT_SEARCH = """
+                 SELECT p.*,
+                        c.name  as category_name,
+                        CASE
+                            WHEN p."qteStock" > p."seuilMin" THEN 'In Stock'
+                            WHEN p."qteStock" > 0 THEN 'Low Stock'
+                            ELSE 'Out of Stock'
+                            END as stock_status,
+                        CASE
+                            WHEN p.designation ILIKE :pattern THEN 1.0
+                            ELSE word_similarity(:name, p.designation)
+                            END as score
+                 FROM "Produit" p
+                          LEFT JOIN "Category" c ON p."categoryId" = c.id
+                 WHERE p.deleted = FALSE
+                   AND (p.designation ILIKE :pattern
+                     OR :name <% p.designation
+                     OR to_tsvector('simple', p.designation) @@ plainto_tsquery('simple', :name))
+                 ORDER BY score DESC,
+                          ts_rank(to_tsvector('simple', p.designation), plainto_tsquery('simple', :name)) DESC,
+                          p.designation
+                 LIMIT :limit
+                 """
+
+
+def _product_lookup(product_id: Optional[int], product_name: Optional[str]):
+    """
+    Build the single-product query for an id or a name
+
+    The filter is chosen in Python rather than with ":param IS NOT NULL" in SQL,
+    because asyncpg cannot infer the type of a parameter that is only NULL-tested.
+    """
+    if product_id is not None:
+        return text(PRODUCT_SELECT + ' AND p.id = :product_id'), {"product_id": product_id}
+    if product_name:
+        return text(PRODUCT_SELECT + ' AND p.designation ILIKE :product_name'), {"product_name": f"%{product_name}%"}
+    return None, None
+
+
+def _catalog_ready() -> bool:
+    """Whether lookups can be served from the in-memory catalog, counted as a cache hit or miss"""
+    loaded = product_catalog.is_loaded
+    record_cache("catalog", loaded)
+    return loaded
+
+
+def _catalog_lookup(product_id: Optional[int], product_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Single-product lookup against the in-memory catalog"""
+    if product_id is not None:
+        return product_catalog.get(product_id)
+    if product_name:
+        return product_catalog.find_by_name(product_name)
+    return None
+
 
 class DBService:
     """Service for interacting with the e-commerce database"""
 
     @staticmethod
+    @tracer.traced("db.get_product_info")
     async def get_product_info(product_id: Optional[int] = None, product_name: Optional[str] = None) -> Optional[
         Dict[str, Any]]:
         """Get product information"""
-        try:
-            with SessionLocal() as db:
-                # PostgreSQL is case-sensitive with quoted identifiers
-                # Ensure we use exact case matching for column names
-                query = text("""
-                             SELECT p.*,
-                                    c.name  as category_name,
-                                    CASE
-                                        WHEN p."qteStock" > p."seuilMin" THEN 'In Stock'
-                                        WHEN p."qteStock" > 0 THEN 'Low Stock'
-                                        ELSE 'Out of Stock'
-                                        END as stock_status
-                             FROM "Produit" p
-                                      LEFT JOIN "Category" c ON p."categoryId" = c.id
-                             WHERE p.deleted = FALSE
-                               AND (
-                                 CASE
-                                     WHEN :product_id IS NOT NULL THEN p.id = :product_id
-                                     WHEN :product_name IS NOT NULL THEN p.designation ILIKE :product_name
-                                     ELSE FALSE
-                                     END
-                                 )
-                             """)
+        if _catalog_ready():
+            return _catalog_lookup(product_id, product_name)
 
-                result = db.execute(
-                    query,
-                    {
-                        "product_id": product_id,
-                        "product_name": f"%{product_name}%" if product_name else None
-                    }
-                ).first()
+        if product_id is None and product_name:
+            results = await DBService.search_products(product_name, limit=1)
+            return results[0] if results else None
+
+        query, params = _product_lookup(product_id, product_name)
+        if query is None:
+            return None
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = (await db.execute(query, params)).first()
 
                 if result:
                     return dict(result._mapping)
                 return None
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_product_info: {str(e)}")
             return None
 
     @staticmethod
+    @tracer.traced("db.get_order_info")
     async def get_order_info(order_id: int) -> Optional[Dict[str, Any]]:
         """Get order information"""
         try:
-            with SessionLocal() as db:
+            async with AsyncSessionLocal() as db:
                 query = text("""
                              SELECT c.*,
                                     l."statutLivraison",
@@ -83,79 +145,95 @@ class DBService:
                              GROUP BY c.id, l.id, p.id
                              """)
 
-                result = db.execute(query, {"order_id": order_id}).first()
+                result = (await db.execute(query, {"order_id": order_id})).first()
 
                 if result:
                     return dict(result._mapping)
                 return None
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_order_info: {str(e)}")
             return None
 
     @staticmethod
+    @tracer.traced("db.check_stock")
     async def check_stock(product_id: Optional[int] = None, product_name: Optional[str] = None) -> Optional[
         Dict[str, Any]]:
         """Check product stock"""
-        try:
-            with SessionLocal() as db:
-                # Fix case sensitivity by quoting column names
-                query = text("""
-                             SELECT p.*,
-                                    c.name  as category_name,
-                                    CASE
-                                        WHEN p."qteStock" > p."seuilMin" THEN 'In Stock'
-                                        WHEN p."qteStock" > 0 THEN 'Low Stock'
-                                        ELSE 'Out of Stock'
-                                        END as stock_status
-                             FROM "Produit" p
-                                      LEFT JOIN "Category" c ON p."categoryId" = c.id
-                             WHERE p.deleted = FALSE
-                               AND (
-                                 CASE
-                                     WHEN :product_id IS NOT NULL THEN p.id = :product_id
-                                     WHEN :product_name IS NOT NULL THEN p.designation ILIKE :product_name
-                                     ELSE FALSE
-                                     END
-                                 )
-                             """)
+        if _catalog_ready():
+            return _catalog_lookup(product_id, product_name)
+
+        if product_id is None and product_name:
+            results = await DBService.search_products(product_name, limit=1)
+            return results[0] if results else None
 
-                result = db.execute(
-                    query,
-                    {
-                        "product_id": product_id,
-                        "product_name": f"%{product_name}%" if product_name else None
-                    }
-                ).first()
+        query, params = _product_lookup(product_id, product_name)
+        if query is None:
+            return None
+
+        try:
+            async with AsyncSessionLocal() as db:
+                result = (await db.execute(query, params)).first()
 
                 if result:
                     return dict(result._mapping)
                 return None
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in check_stock: {str(e)}")
             return None
 
     @staticmethod
-    async def get_all_products() -> List[Dict[str, Any]]:
-        """Get all products"""
+    @tracer.traced("db.search_products")
+    async def search_products(product_name: str, limit: int = PRODUCT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Search products by name, best match first
+
+        Args:
+            product_name: Product name or fragment, possibly misspelled
+            limit: Maximum number of results
+
+        Returns:
+            Product rows with a "score" entry
+        """
+        if not product_name or not product_name.strip():
+            return []
+
+        if _catalog_ready():
+            return product_catalog.search(product_name, limit)
+
+        params = {"name": product_name, "pattern": f"%{product_name}%", "limit": limit}
         try:
-            with SessionLocal() as db:
-                # Fix case sensitivity by quoting column names
-                query = text("""
-                             SELECT p.*,
-                                    c.name  as category_name,
-                                    CASE
-                                        WHEN p."qteStock" > p."seuilMin" THEN 'In Stock'
-                                        WHEN p."qteStock" > 0 THEN 'Low Stock'
-                                        ELSE 'Out of Stock'
-                                        END as stock_status
-                             FROM "Produit" p
-                                      LEFT JOIN "Category" c ON p."categoryId" = c.id
-                             WHERE p.deleted = FALSE
-                             ORDER BY p.designation
-                             """)
+            async with AsyncSessionLocal() as db:
+                # Lower the <% threshold for this transaction so misspelled names still match
+                await db.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                                 {"threshold": str(PRODUCT_SEARCH_MIN_SIMILARITY)})
+                results = (await db.execute(text(PRODUCT_SEARCH), params)).fetchall()
+                return [dict(row._mapping) for row in results]
+        except ASYNC_DB_ERRORS as e:
+            # pg_trgm may not be installed; fall back to a plain substring match
+            logger.warning(f"Ranked product search unavailable, using ILIKE: {str(e)}")
+
+        query, params = _product_lookup(None, product_name)
+        try:
+            async with AsyncSessionLocal() as db:
+                results = (await db.execute(text(str(query) + " LIMIT :limit"), {**params, "limit": limit})).fetchall()
+                return [dict(row._mapping) for row in results]
+        except ASYNC_DB_ERRORS as e:
+            logger.error(f"Database error in search_products: {str(e)}")
+            return []
+
+    @staticmethod
+    @tracer.traced("db.get_all_products")
+    async def get_all_products(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get all products, ordered by designation"""
+        if _catalog_ready():
+            return product_catalog.list_products(limit)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                query = text(PRODUCT_SELECT + " ORDER BY p.designation" + (" LIMIT :limit" if limit else ""))
 
-                results = db.execute(query).fetchall()
+                results = (await db.execute(query, {"limit": limit} if limit else {})).fetchall()
                 return [dict(row._mapping) for row in results]
-        except SQLAlchemyError as e:
+        except ASYNC_DB_ERRORS as e:
             logger.error(f"Database error in get_all_products: {str(e)}")
-            return []
\ No newline at end of file
+            return []
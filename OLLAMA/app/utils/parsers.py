@@ -1,44 +1,107 @@
 import os
 import json
 import logging
+import mmap
+import shutil
+import tarfile
 import uuid
-from typing import Dict, List, Any, Optional, Tuple
+import zipfile
+from typing import Dict, List, Any, Optional, Tuple, BinaryIO, Iterator
 from datetime import datetime
 
-import pandas as pd
-from pypdf import PdfReader
-
 from app.config import PDF_DIR, CSV_DIR, JSON_DIR
 from app.models.schemas import DocumentType
 
 logger = logging.getLogger(__name__)
 
+# File extensions recognised when the document type has to be inferred
+EXTENSION_DOCUMENT_TYPES = {
+    ".pdf": DocumentType.PDF,
+    ".csv": DocumentType.CSV,
+    ".json": DocumentType.JSON,
+    ".txt": DocumentType.TEXT,
+    ".text": DocumentType.TEXT,
+    ".md": DocumentType.TEXT,
+}
+
+# Storage directory per document type (text files live with PDFs for simplicity)
+DOCUMENT_TYPE_DIRS = {
+    DocumentType.PDF: PDF_DIR,
+    DocumentType.CSV: CSV_DIR,
+    DocumentType.JSON: JSON_DIR,
+    DocumentType.TEXT: PDF_DIR,
+}
+
 
 class DocumentParser:
     """Parser for different document types"""
 
     @staticmethod
-    def parse_pdf(file_content: bytes, filename: str) -> Tuple[str, str]:
+    def storage_path(sha256: str, filename: str, doc_type: DocumentType) -> str:
+        """
+        Content-addressed storage path for a document
+
+        Args:
+            sha256: Hex digest of the file content
+            filename: Original filename (only its extension is kept)
+            doc_type: Type of document
+
+        Returns:
+            Path of the stored file
+        """
+        _, extension = os.path.splitext(filename.lower())
+        return os.path.join(DOCUMENT_TYPE_DIRS[doc_type], f"{sha256}{extension}")
+
+    @staticmethod
+    def store_file(staged_path: str, filename: str, doc_type: DocumentType, sha256: Optional[str] = None) -> str:
+        """
+        Move a staged upload into document storage
+
+        With a content hash the file is stored under its hash, so identical
+        uploads share one copy on disk. Without one a unique name is generated.
+
+        Args:
+            staged_path: Path of the staged upload
+            filename: Original filename
+            doc_type: Type of document
+            sha256: Hex digest of the file content
+
+        Returns:
+            The stored file path
+        """
+        if sha256:
+            file_path = DocumentParser.storage_path(sha256, filename, doc_type)
+            if os.path.exists(file_path):
+                # Same content is already stored, drop the staged copy
+                os.remove(staged_path)
+                return file_path
+        else:
+            # Generate unique filename
+            unique_filename = f"{uuid.uuid4()}_{os.path.basename(filename)}"
+            file_path = os.path.join(DOCUMENT_TYPE_DIRS[doc_type], unique_filename)
+
+        # A rename when staging and storage share a filesystem, no content copy
+        shutil.move(staged_path, file_path)
+
+        return file_path
+
+    @staticmethod
+    def parse_pdf(file_path: str, filename: str) -> Tuple[str, str]:
         """
         Parse PDF content
 
         Args:
-            file_content: Raw PDF content
+            file_path: Path of the stored PDF file
             filename: Original filename
 
         Returns:
             Tuple of (extracted_text, saved_file_path)
         """
         try:
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(PDF_DIR, unique_filename)
+            # Imported here so workers that never parse a PDF do not pay for it
+            from pypdf import PdfReader
 
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-
-            # Extract text
+            # Extract text from the file on disk
             reader = PdfReader(file_path)
             text = ""
 
@@ -51,28 +114,23 @@ class DocumentParser:
             raise ValueError(f"Failed to parse PDF: {str(e)}")
 
     @staticmethod
-    def parse_csv(file_content: bytes, filename: str) -> Tuple[str, str]:
+    def parse_csv(file_path: str, filename: str) -> Tuple[str, str]:
         """
         Parse CSV content
 
         Args:
-            file_content: Raw CSV content
+            file_path: Path of the stored CSV file
             filename: Original filename
 
         Returns:
             Tuple of (extracted_text, saved_file_path)
         """
         try:
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(CSV_DIR, unique_filename)
-
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+            # Imported here so only workers that parse CSVs load pandas
+            import pandas as pd
 
-            # Read CSV
-            df = pd.read_csv(file_path)
+            # Read CSV through a memory map of the stored file
+            df = pd.read_csv(file_path, memory_map=True)
 
             # Convert DataFrame to text representation
             # Include column names
@@ -111,28 +169,21 @@ class DocumentParser:
             raise ValueError(f"Failed to parse CSV: {str(e)}")
 
     @staticmethod
-    def parse_json(file_content: bytes, filename: str) -> Tuple[str, str]:
+    def parse_json(file_path: str, filename: str) -> Tuple[str, str]:
         """
         Parse JSON content
 
         Args:
-            file_content: Raw JSON content
+            file_path: Path of the stored JSON file
             filename: Original filename
 
         Returns:
             Tuple of (extracted_text, saved_file_path)
         """
         try:
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(JSON_DIR, unique_filename)
-
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-
-            # Parse JSON
-            json_data = json.loads(file_content.decode('utf-8'))
+            # Parse JSON directly from the stored file
+            with open(file_path, "r", encoding="utf-8") as f:
+                json_data = json.load(f)
 
             # Format as readable text
             text = f"JSON File: {filename}\n\n"
@@ -147,28 +198,24 @@ class DocumentParser:
             raise ValueError(f"Failed to parse JSON: {str(e)}")
 
     @staticmethod
-    def parse_text(file_content: bytes, filename: str) -> Tuple[str, str]:
+    def parse_text(file_path: str, filename: str) -> Tuple[str, str]:
         """
         Parse plain text content
 
         Args:
-            file_content: Raw text content
+            file_path: Path of the stored text file
             filename: Original filename
 
         Returns:
             Tuple of (extracted_text, saved_file_path)
         """
         try:
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(PDF_DIR, unique_filename)  # Store in PDF directory for simplicity
-
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-
-            # Extract text
-            text = file_content.decode('utf-8')
+            # Decode through a memory map rather than an intermediate bytes copy
+            with open(file_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return "", file_path
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    text = str(mm, "utf-8")
 
             return text, file_path
         except Exception as e:
@@ -176,29 +223,103 @@ class DocumentParser:
             raise ValueError(f"Failed to parse text file: {str(e)}")
 
     @classmethod
-    def parse_document(cls, file_content: bytes, filename: str, doc_type: DocumentType) -> Tuple[str, str]:
+    def parse_document(
+            cls,
+            staged_path: str,
+            filename: str,
+            doc_type: DocumentType,
+            sha256: Optional[str] = None
+    ) -> Tuple[str, str]:
         """
         Parse document based on type
 
+        The staged upload is moved into the storage directory for its type,
+        so it is never read back into memory as raw bytes.
+
         Args:
-            file_content: Raw file content
+            staged_path: Path of the staged upload on disk
             filename: Original filename
             doc_type: Type of document
+            sha256: Hex digest of the file content, enables content-addressed storage
 
         Returns:
             Tuple of (extracted_text, saved_file_path)
         """
-        if doc_type == DocumentType.PDF:
-            return cls.parse_pdf(file_content, filename)
-        elif doc_type == DocumentType.CSV:
-            return cls.parse_csv(file_content, filename)
-        elif doc_type == DocumentType.JSON:
-            return cls.parse_json(file_content, filename)
-        elif doc_type == DocumentType.TEXT:
-            return cls.parse_text(file_content, filename)
-        else:
+        if doc_type not in DOCUMENT_TYPE_DIRS:
             raise ValueError(f"Unsupported document type: {doc_type}")
 
+        file_path = cls.store_file(staged_path, filename, doc_type, sha256)
+
+        try:
+            if doc_type == DocumentType.PDF:
+                return cls.parse_pdf(file_path, filename)
+            elif doc_type == DocumentType.CSV:
+                return cls.parse_csv(file_path, filename)
+            elif doc_type == DocumentType.JSON:
+                return cls.parse_json(file_path, filename)
+            else:
+                return cls.parse_text(file_path, filename)
+        except ValueError:
+            # Do not keep unparseable content unless a stored document already owns it
+            if not os.path.exists(file_path + ".metadata.json"):
+                os.remove(file_path)
+            raise
+
+    @staticmethod
+    def detect_document_type(filename: str) -> Optional[DocumentType]:
+        """
+        Infer the document type from a filename extension
+
+        Args:
+            filename: Original filename
+
+        Returns:
+            The matching DocumentType or None if the extension is not supported
+        """
+        _, extension = os.path.splitext(filename.lower())
+        return EXTENSION_DOCUMENT_TYPES.get(extension)
+
+    @staticmethod
+    def iter_archive(archive: BinaryIO) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        Iterate over the regular files of a zip or tar archive
+
+        Each entry stream is only valid until the iterator advances.
+
+        Args:
+            archive: Seekable binary file object holding the archive
+
+        Returns:
+            Iterator of (entry_name, entry_stream) tuples
+        """
+        archive.seek(0)
+        if zipfile.is_zipfile(archive):
+            archive.seek(0)
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    name = os.path.basename(info.filename)
+                    # Skip directories and hidden entries such as macOS resource forks
+                    if info.is_dir() or not name or name.startswith("."):
+                        continue
+                    with zf.open(info) as entry:
+                        yield name, entry
+            return
+
+        archive.seek(0)
+        try:
+            # Mode "r:*" handles plain, gzip, bz2 and xz compressed tarballs
+            with tarfile.open(fileobj=archive, mode="r:*") as tf:
+                for member in tf:
+                    name = os.path.basename(member.name)
+                    if not member.isfile() or not name or name.startswith("."):
+                        continue
+                    extracted = tf.extractfile(member)
+                    if extracted is None:
+                        continue
+                    yield name, extracted
+        except tarfile.ReadError as e:
+            raise ValueError(f"Unsupported archive format: {str(e)}")
+
     @staticmethod
     def extract_metadata(file_path: str) -> Dict[str, Any]:
         """Extract metadata from a file"""
@@ -0,0 +1,44 @@
+import re
+import unicodedata
+from typing import FrozenSet
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents, keeping punctuation"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse non-alphanumerics to single spaces"""
+    return _NON_WORD.sub(" ", fold(text)).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """
+    Trigram set of a string, following pg_trgm
+
+    Each word is padded with two leading spaces and one trailing space, so
+    results line up with similarity() computed by PostgreSQL.
+    """
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def trigram_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Shared trigrams over all trigrams (pg_trgm similarity)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def trigram_containment(query: FrozenSet[str], target: FrozenSet[str]) -> float:
+    """Share of the query's trigrams found in the target, tolerant of typos in short queries"""
+    if not query:
+        return 0.0
+    return len(query & target) / len(query)
@@ -0,0 +1,194 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.config import (
+    UPLOAD_TMP_DIR,
+    UPLOAD_CHUNK_SIZE,
+    MAX_UPLOAD_SIZE,
+    MAX_ARCHIVE_ENTRIES,
+    MAX_ARCHIVE_EXTRACTED_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_size} bytes")
+        self.max_size = max_size
+
+
+class ArchiveLimitError(ValueError):
+    """Raised when an archive holds too many files or expands to too much data"""
+    pass
+
+
+class StagingFile:
+    """Temporary file that hashes and size-checks content as it is written"""
+
+    def __init__(self, max_size: int = MAX_UPLOAD_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        fd, self.path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR, suffix=".upload")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_size and self.size > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+        self.hasher.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self) -> Tuple[str, str, int]:
+        """Close the file and return (path, sha256_hex, size)"""
+        self.file.close()
+        return self.path, self.hasher.hexdigest(), self.size
+
+    def abort(self) -> None:
+        """Close and remove a partially written file"""
+        self.file.close()
+        discard_staged_file(self.path)
+
+
+async def stream_upload_to_disk(upload: UploadFile, max_size: int = MAX_UPLOAD_SIZE) -> Tuple[str, str, int]:
+    """
+    Stream an uploaded file to a temporary file in fixed-size chunks
+
+    Args:
+        upload: The uploaded file
+        max_size: Maximum accepted size in bytes (0 disables the limit)
+
+    Returns:
+        Tuple of (temp_file_path, sha256_hex, size_bytes)
+    """
+    staging = StagingFile(max_size)
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            staging.write(chunk)
+    except Exception:
+        staging.abort()
+        raise
+    return staging.finish()
+
+
+async def stream_body_to_disk(chunks: AsyncIterator[bytes], max_size: int = MAX_UPLOAD_SIZE) -> Tuple[str, str, int]:
+    """
+    Stream a request body to a temporary file
+
+    Args:
+        chunks: Async iterator of body chunks, e.g. Request.stream()
+        max_size: Maximum accepted size in bytes (0 disables the limit)
+
+    Returns:
+        Tuple of (temp_file_path, sha256_hex, size_bytes)
+    """
+    staging = StagingFile(max_size)
+    try:
+        async for chunk in chunks:
+            staging.write(chunk)
+    except Exception:
+        staging.abort()
+        raise
+    return staging.finish()
+
+
+def copy_stream_to_disk(source: BinaryIO, max_size: int = MAX_UPLOAD_SIZE) -> Tuple[str, str, int]:
+    """
+    Copy a binary stream (e.g. an archive member) to a temporary file
+
+    Args:
+        source: Readable binary file object
+        max_size: Maximum accepted size in bytes (0 disables the limit)
+
+    Returns:
+        Tuple of (temp_file_path, sha256_hex, size_bytes)
+    """
+    staging = StagingFile(max_size)
+    try:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            staging.write(chunk)
+    except Exception:
+        staging.abort()
+        raise
+    return staging.finish()
+
+
+def stage_archive_entries(
+        entries: Iterable[Tuple[str, BinaryIO]],
+        max_size: int = MAX_UPLOAD_SIZE,
+        max_entries: int = MAX_ARCHIVE_ENTRIES,
+        max_total_size: int = MAX_ARCHIVE_EXTRACTED_SIZE
+) -> List[Dict[str, str]]:
+    """
+    Copy archive entries to temporary files
+
+    This decompresses and writes to disk synchronously; run it in a worker
+    thread. An entry over max_size is reported as an error entry, but an
+    archive with too many entries or too much data in total is rejected as a
+    whole, and the files staged so far are removed.
+
+    Args:
+        entries: (name, stream) tuples, e.g. DocumentParser.iter_archive
+        max_size: Maximum size of one entry in bytes (0 disables the limit)
+        max_entries: Maximum number of entries (0 disables the limit)
+        max_total_size: Maximum total extracted size in bytes (0 disables the limit)
+
+    Returns:
+        One {"filename", "path", "sha256"} or {"filename", "error"} dict per entry
+
+    Raises:
+        ArchiveLimitError: The archive exceeds max_entries or max_total_size
+    """
+    staged = []
+    extracted = 0
+    try:
+        for name, stream in entries:
+            if max_entries and len(staged) >= max_entries:
+                raise ArchiveLimitError(f"Archive holds more than {max_entries} files")
+
+            limit, total_bound = max_size, False
+            if max_total_size:
+                remaining = max_total_size - extracted
+                if remaining <= 0:
+                    raise ArchiveLimitError(f"Archive expands to more than {max_total_size} bytes")
+                if not limit or remaining < limit:
+                    limit, total_bound = remaining, True
+
+            try:
+                path, sha256, size = copy_stream_to_disk(stream, limit)
+                extracted += size
+                staged.append({"filename": name, "path": path, "sha256": sha256})
+            except UploadTooLargeError as e:
+                if total_bound:
+                    raise ArchiveLimitError(f"Archive expands to more than {max_total_size} bytes")
+                # The entry was decompressed up to the limit before being dropped
+                extracted += limit
+                staged.append({"filename": name, "error": str(e)})
+    except Exception:
+        for entry in staged:
+            discard_staged_file(entry.get("path"))
+        raise
+    return staged
+
+
+def discard_staged_file(path: Optional[str]) -> None:
+    """Remove a staged upload if it was not moved into document storage"""
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove staged upload {path}: {str(e)}")
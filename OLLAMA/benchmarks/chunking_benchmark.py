@@ -0,0 +1,159 @@
+"""
+Compare chunking strategies on a labelled query set
+
+For every strategy the corpus is chunked, embedded into a throwaway in-memory
+Chroma collection and queried. Reported per strategy: chunk count, token
+statistics, index size, ingest time and retrieval hit-rate / MRR at k.
+
+A query counts as a hit when its "expected" text appears in one of the top-k
+retrieved chunks (case-insensitive).
+
+Usage:
+    python benchmarks/chunking_benchmark.py
+    python benchmarks/chunking_benchmark.py --docs my_docs/ --queries my_queries.json --k 3 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import logging
+from typing import Dict, List, Any, Tuple
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_community.vectorstores import Chroma
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from app.config import EMBEDDING_MODEL, TOP_K_RESULTS
+from app.core.chunking import CHUNKERS, count_tokens
+from app.utils.parsers import DocumentParser
+from app.models.schemas import DocumentType
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_DOCS_DIR = os.path.join(DATA_DIR, "chunking_corpus")
+DEFAULT_QUERIES = os.path.join(DATA_DIR, "chunking_queries.json")
+
+PARSERS = {
+    DocumentType.PDF: DocumentParser.parse_pdf,
+    DocumentType.CSV: DocumentParser.parse_csv,
+    DocumentType.JSON: DocumentParser.parse_json,
+    DocumentType.TEXT: DocumentParser.parse_text,
+}
+
+
+def load_corpus(docs_dir: str) -> List[Tuple[str, str]]:
+    """Parse every supported file of a directory into (filename, text) pairs"""
+    corpus = []
+    for filename in sorted(os.listdir(docs_dir)):
+        doc_type = DocumentParser.detect_document_type(filename)
+        if doc_type is None:
+            continue
+        text, _ = PARSERS[doc_type](os.path.join(docs_dir, filename), filename)
+        corpus.append((filename, text))
+    return corpus
+
+
+def run_strategy(
+        strategy: str,
+        corpus: List[Tuple[str, str]],
+        queries: List[Dict[str, str]],
+        embeddings: HuggingFaceEmbeddings,
+        k: int
+) -> Dict[str, Any]:
+    """Chunk, index and query the corpus with one strategy"""
+    chunker = CHUNKERS[strategy]()
+
+    start = time.perf_counter()
+    texts, metadatas = [], []
+    for filename, text in corpus:
+        for chunk in chunker.split_text(text):
+            texts.append(chunk)
+            metadatas.append({"source": filename})
+    split_seconds = time.perf_counter() - start
+
+    db = Chroma(collection_name=f"bench_{strategy}_{uuid.uuid4().hex[:8]}", embedding_function=embeddings)
+    start = time.perf_counter()
+    db.add_texts(texts=texts, metadatas=metadatas)
+    embed_seconds = time.perf_counter() - start
+
+    hits = 0
+    reciprocal_ranks = 0.0
+    start = time.perf_counter()
+    for item in queries:
+        expected = item["expected"].lower()
+        results = db.similarity_search(item["query"], k=k)
+        for rank, doc in enumerate(results, start=1):
+            if expected in doc.page_content.lower():
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+    query_seconds = time.perf_counter() - start
+
+    token_counts = [count_tokens(text) for text in texts] or [0]
+    dimension = len(embeddings.embed_query("dimension probe"))
+    text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+
+    db.delete_collection()
+
+    return {
+        "strategy": strategy,
+        "chunks": len(texts),
+        "avg_tokens": round(sum(token_counts) / len(token_counts), 1),
+        "max_tokens": max(token_counts),
+        "index_bytes": text_bytes + len(texts) * dimension * 4,
+        "split_seconds": round(split_seconds, 4),
+        "ingest_seconds": round(split_seconds + embed_seconds, 4),
+        "avg_query_ms": round(query_seconds * 1000 / max(len(queries), 1), 2),
+        "hit_rate": round(hits / max(len(queries), 1), 3),
+        "mrr": round(reciprocal_ranks / max(len(queries), 1), 3),
+    }
+
+
+def print_table(results: List[Dict[str, Any]], k: int) -> None:
+    columns = ["strategy", "chunks", "avg_tokens", "max_tokens", "index_bytes", "ingest_seconds", "avg_query_ms",
+               "hit_rate", "mrr"]
+    headers = [c if c not in ("hit_rate", "mrr") else f"{c}@{k}" for c in columns]
+    widths = [max(len(h), *(len(str(r[c])) for r in results)) for h, c in zip(headers, columns)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunking strategies for retrieval")
+    parser.add_argument("--docs", default=DEFAULT_DOCS_DIR, help="Directory of documents to index")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSON list of {query, expected} items")
+    parser.add_argument("--strategies", nargs="+", default=list(CHUNKERS), choices=list(CHUNKERS))
+    parser.add_argument("--k", type=int, default=TOP_K_RESULTS, help="Number of retrieved chunks per query")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    corpus = load_corpus(args.docs)
+    with open(args.queries, "r") as f:
+        queries = json.load(f)
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+    print(f"Corpus: {len(corpus)} documents, {len(queries)} queries, model {EMBEDDING_MODEL}\n")
+    results = [run_strategy(strategy, corpus, queries, embeddings, args.k) for strategy in args.strategies]
+    print_table(results, args.k)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"k": args.k, "embedding_model": EMBEDDING_MODEL, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
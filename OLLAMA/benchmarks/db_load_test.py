@@ -0,0 +1,200 @@
+"""
+Concurrent chat throughput against a slow PostgreSQL
+
+A local TCP proxy is placed in front of the database and delays every packet
+by --delay-ms, simulating a distant or overloaded server. Simulated chat
+requests (a stock lookup, an order lookup and a fake LLM wait) are then fired
+at the given concurrency twice:
+
+  sync   the previous pattern, synchronous SQLAlchemy sessions inside async def
+  async  the asyncpg-backed DBService used by the chat path
+
+Reported per mode: throughput, latency percentiles and the worst event-loop
+stall, which is what starves every other request when the loop is blocked.
+
+Requires a reachable PostgreSQL with the e-commerce schema (DATABASE_URL).
+
+Usage:
+    python benchmarks/db_load_test.py --delay-ms 20 --concurrency 50 --requests 500
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+from typing import Dict, List, Any
+from urllib.parse import urlsplit, urlunsplit
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class LatencyProxy:
+    """TCP proxy that delays each forwarded chunk, run on its own event loop thread"""
+
+    def __init__(self, target_host: str, target_port: int, delay_ms: float):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.delay = delay_ms / 1000.0
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> int:
+        self._thread.start()
+        self._ready.wait()
+        return self.port
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                await asyncio.sleep(self.delay)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer),
+            self._pipe(server_reader, client_writer),
+        )
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Largest delay between when a timer should fire and when it did"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_mode(name: str, chat_request, concurrency: int, total: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await chat_request(i)
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag_task
+
+    return {
+        "mode": name,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_loop_stall_ms": round(worst_lag * 1000, 1),
+    }
+
+
+async def main_async(args):
+    # Imported after DATABASE_URL points at the proxy so both engines go through it
+    from sqlalchemy import text
+    from app.database.connection import SessionLocal, engine
+    from app.database.async_connection import close_async_db
+    from app.utils.db import DBService, PRODUCT_SELECT
+
+    # The sync engine logs every statement by default
+    engine.echo = False
+
+    llm_seconds = args.llm_ms / 1000.0
+    stock_query = text(PRODUCT_SELECT + ' AND p.designation ILIKE :product_name')
+    order_query = text('SELECT c.* FROM "Commande" c WHERE c.id = :order_id')
+
+    async def sync_chat(i: int):
+        # Previous implementation: blocking session calls inside a coroutine
+        with SessionLocal() as db:
+            db.execute(stock_query, {"product_name": f"%{args.product}%"}).first()
+            db.execute(order_query, {"order_id": args.order_id}).first()
+        await asyncio.sleep(llm_seconds)
+
+    async def async_chat(i: int):
+        await DBService.check_stock(product_name=args.product)
+        await DBService.get_order_info(args.order_id)
+        await asyncio.sleep(llm_seconds)
+
+    results = []
+    for name, handler in (("sync", sync_chat), ("async", async_chat)):
+        await handler(-1)  # warm up the pool
+        results.append(await run_mode(name, handler, args.concurrency, args.requests))
+
+    await close_async_db()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat-path database load test through a latency proxy")
+    parser.add_argument("--database-url", default=None, help="Defaults to DATABASE_URL from the environment/.env")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="Delay added to every proxied packet")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="Simulated non-blocking LLM time per request")
+    parser.add_argument("--product", default="a", help="Product name fragment for the stock lookup")
+    parser.add_argument("--order-id", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.config import DATABASE_URL
+    url = urlsplit(args.database_url or DATABASE_URL)
+
+    proxy = LatencyProxy(url.hostname or "localhost", url.port or 5432, args.delay_ms)
+    proxy_port = proxy.start()
+    credentials = url.netloc.rsplit("@", 1)[0] + "@" if "@" in url.netloc else ""
+    os.environ["DATABASE_URL"] = urlunsplit(url._replace(netloc=f"{credentials}127.0.0.1:{proxy_port}"))
+
+    import app.config
+    app.config.DATABASE_URL = os.environ["DATABASE_URL"]
+
+    print(f"Proxy 127.0.0.1:{proxy_port} -> {url.hostname}:{url.port or 5432} (+{args.delay_ms} ms per packet), "
+          f"concurrency {args.concurrency}, {args.requests} requests\n")
+
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        proxy.stop()
+
+    columns = list(results[0])
+    print("  ".join(c.ljust(18) for c in columns))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(18) for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare embedding backends on CPU
+
+The same model is run through sentence-transformers (torch), its float32 ONNX
+export and its int8 quantized ONNX export on onnxruntime. Reported per
+backend and thread count: model load time, per-query latency (p50/p95 of
+single embed_query calls, the chat path), batch throughput (chunks per second
+of embed_documents, the ingest path) and cosine similarity to the torch
+embeddings (min and mean over every text).
+
+Queries come from the latency benchmark set, batch texts from the chunked
+chunking benchmark corpus. The ONNX export is created on first run (see
+`python -m app.core.embeddings`).
+
+Usage:
+    python benchmarks/embedding_benchmark.py
+    python benchmarks/embedding_benchmark.py --threads 1 2 4 --rounds 3 --output embeddings.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from typing import Dict, List, Any
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import EMBEDDING_MODEL, ONNX_MODEL_DIR, EMBEDDING_BATCH_SIZE, DEFAULT_CHUNKING_STRATEGY
+from app.core.chunking import get_chunker
+from app.core.embeddings import OnnxEmbeddings, create_embedding_model
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_QUERIES = os.path.join(DATA_DIR, "latency_queries.json")
+DEFAULT_DOCS_DIR = os.path.join(DATA_DIR, "chunking_corpus")
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+
+def load_chunks(docs_dir: str) -> List[str]:
+    """Chunk the text files of a directory with the default chunker"""
+    chunker = get_chunker(DEFAULT_CHUNKING_STRATEGY)
+    chunks = []
+    for filename in sorted(os.listdir(docs_dir)):
+        with open(os.path.join(docs_dir, filename), "r", encoding="utf-8") as f:
+            chunks.extend(chunker.split_text(f.read()))
+    return chunks
+
+
+def load_backend(backend: str, threads: int):
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads or os.cpu_count())
+        return create_embedding_model("torch")
+    return OnnxEmbeddings(
+        EMBEDDING_MODEL, ONNX_MODEL_DIR, quantize=backend == "onnx-int8", threads=threads,
+        batch_size=EMBEDDING_BATCH_SIZE
+    )
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_backend(
+        backend: str,
+        threads: int,
+        queries: List[str],
+        chunks: List[str],
+        reference: np.ndarray,
+        rounds: int
+) -> Dict[str, Any]:
+    """Time one backend at one thread count"""
+    start = time.perf_counter()
+    model = load_backend(backend, threads)
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up, so one-off allocations and lazy initialisation are not timed
+    model.embed_documents(queries[:4])
+
+    latencies = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            model.embed_query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        model.embed_documents(chunks)
+    batch_seconds = (time.perf_counter() - start) / rounds
+
+    vectors = np.asarray(model.embed_documents(queries + chunks), dtype=np.float32)
+    cosines = np.sum(vectors * reference, axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+
+    return {
+        "backend": backend,
+        "threads": threads,
+        "load_seconds": round(load_seconds, 2),
+        "query_p50_ms": round(percentile(latencies, 0.5), 2),
+        "query_p95_ms": round(percentile(latencies, 0.95), 2),
+        "chunks_per_sec": round(len(chunks) / batch_seconds, 1),
+        "cosine_min": round(float(np.min(cosines)), 5),
+        "cosine_mean": round(float(np.mean(cosines)), 5),
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    columns = ["backend", "threads", "load_seconds", "query_p50_ms", "query_p95_ms", "chunks_per_sec", "cosine_min",
+               "cosine_mean"]
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark torch and ONNX embedding backends")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSON list of query strings")
+    parser.add_argument("--docs", default=DEFAULT_DOCS_DIR, help="Directory of text documents for batch throughput")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--threads", nargs="+", type=int, default=[0],
+                        help="Intra-op thread counts to try (0 uses every core)")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions of the query set and of the batch")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    with open(args.queries, "r") as f:
+        queries = json.load(f)
+    chunks = load_chunks(args.docs)
+
+    reference = np.asarray(create_embedding_model("torch").embed_documents(queries + chunks), dtype=np.float32)
+
+    print(f"Model {EMBEDDING_MODEL}: {len(queries)} queries, {len(chunks)} chunks, {os.cpu_count()} CPUs\n")
+    results = [
+        run_backend(backend, threads, queries, chunks, reference, args.rounds)
+        for backend in args.backends
+        for threads in args.threads
+    ]
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"embedding_model": EMBEDDING_MODEL, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
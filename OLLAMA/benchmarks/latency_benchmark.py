@@ -0,0 +1,421 @@
+"""
+End-to-end chat latency against a local fake Ollama server
+
+Everything the chat path talks to is replaced by a local, controllable stand-in,
+while the FastAPI app itself runs unchanged under uvicorn:
+
+  fake Ollama   an HTTP server speaking the /api/generate streaming protocol with a
+                configurable time to first token, tokens per second and error rate
+  vector store  a throwaway Chroma directory seeded with the benchmark corpus
+  database      the product catalog cache loaded from the corpus's product sheet,
+                plus in-memory orders answered after --db-delay-ms
+
+The query corpus is replayed over HTTP at each requested concurrency. Reported
+per run: p50/p95/p99, mean and throughput of the whole request and of every
+pipeline stage (routing, quick answers, retrieval, database enrichment,
+generation and the LLM call itself). Save runs with --output and compare them
+to see whether a change makes chat faster.
+
+Usage:
+    python benchmarks/latency_benchmark.py
+    python benchmarks/latency_benchmark.py --concurrency 1 8 32 --requests 200 \\
+        --tokens-per-sec 40 --ttft-ms 300 --error-rate 0.02 --output latency.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import inspect
+import argparse
+import logging
+import tempfile
+import threading
+import contextlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Callable
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DEFAULT_DOCS_DIR = os.path.join(DATA_DIR, "chunking_corpus")
+DEFAULT_QUERIES = os.path.join(DATA_DIR, "latency_queries.json")
+PRODUCT_SHEET = "product_catalog.md"
+
+STAGES = ["request", "route", "quick_answer", "retrieval", "db_enrichment", "generation", "llm"]
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server imitating Ollama's generate endpoint"""
+
+    def __init__(self, model: str, ttft_ms: float, tokens_per_sec: float, response_tokens: int,
+                 error_rate: float, seed: int):
+        self.model = model
+        self.ttft = ttft_ms / 1000.0
+        self.token_interval = 1.0 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.served = 0
+        self.failed = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def _should_fail(self) -> bool:
+        with self.lock:
+            self.served += 1
+            fail = self.random.random() < self.error_rate
+            self.failed += fail
+            return fail
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._json(200, {"models": [{"name": server.model}]})
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path not in ("/api/generate", "/api/chat"):
+                    self._json(404, {"error": "not found"})
+                    return
+
+                time.sleep(server.ttft)
+                if server._should_fail():
+                    self._json(500, {"error": "simulated model failure"})
+                    return
+
+                chat = self.path == "/api/chat"
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for i in range(server.response_tokens):
+                    if i:
+                        time.sleep(server.token_interval)
+                    token = f"token{i} "
+                    chunk = {"model": request.get("model", server.model), "done": False}
+                    if chat:
+                        chunk["message"] = {"role": "assistant", "content": token}
+                    else:
+                        chunk["response"] = token
+                    self.wfile.write((json.dumps(chunk) + "\n").encode())
+                    self.wfile.flush()
+                done = {"model": request.get("model", server.model), "done": True, "done_reason": "stop",
+                        "eval_count": server.response_tokens}
+                if not chat:
+                    done["response"] = ""
+                self.wfile.write((json.dumps(done) + "\n").encode())
+                self.wfile.flush()
+
+        return Handler
+
+
+class StageTimer:
+    """Records durations of wrapped functions by stage name"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def reset(self):
+        self.samples = {}
+
+    def record(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, owner: Any, attribute: str, stage: str):
+        """Replace owner.attribute with a version that times every call"""
+        function = getattr(owner, attribute)
+
+        if inspect.iscoroutinefunction(function):
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        else:
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+        setattr(owner, attribute, staticmethod(timed) if isinstance(owner, type) else timed)
+
+
+def load_corpus(docs_dir: str) -> List[Dict[str, str]]:
+    """Read the text documents of a directory"""
+    corpus = []
+    for filename in sorted(os.listdir(docs_dir)):
+        if filename.endswith((".md", ".txt")):
+            with open(os.path.join(docs_dir, filename), encoding="utf-8") as f:
+                corpus.append({"source": filename, "text": f.read()})
+    return corpus
+
+
+def products_from_sheet(text: str) -> List[Dict[str, Any]]:
+    """Catalog rows from the "## name / Price / Stock / Category" product sheet"""
+    rows, categories = [], {}
+    for position, section in enumerate(re.split(r"^## ", text, flags=re.MULTILINE)[1:], start=1):
+        name, _, body = section.partition("\n")
+        price = re.search(r"Price: \$([\d.]+)", body)
+        stock = re.search(r"Stock: (\d+)", body)
+        category = re.search(r"Category: (.+)", body)
+        category_name = category.group(1).strip() if category else None
+        rows.append({
+            "id": position,
+            "designation": name.strip(),
+            "description": body.strip(),
+            "prix": float(price.group(1)) if price else 0.0,
+            "qteStock": int(stock.group(1)) if stock else 0,
+            "seuilMin": 2,
+            "nbrPoint": 10,
+            "categoryId": categories.setdefault(category_name, len(categories) + 1) if category_name else None,
+            "category_name": category_name,
+        })
+    return rows
+
+
+def install_stand_in_database(products: List[Dict[str, Any]], delay_ms: float):
+    """Serve products from the catalog cache and orders from memory"""
+    from app.core.catalog import product_catalog
+    from app.utils.db import DBService
+    from app.utils.auth_db import auth_db_service
+
+    product_catalog.load_rows(products)
+
+    delay = delay_ms / 1000.0
+    now = datetime.utcnow()
+    orders = {
+        1000 + i: {
+            "id": 1000 + i,
+            "date": now - timedelta(days=i),
+            "montantAPayer": product["prix"],
+            "statutLivraison": ["Processing", "Shipped", "Delivered"][i % 3],
+            "date_livraison": now + timedelta(days=3 - i % 3),
+            "paiement_status": "paye",
+            "items": [{"produit_id": product["id"], "designation": product["designation"], "qteCmd": 1,
+                       "prix": product["prix"]}],
+        }
+        for i, product in enumerate(products, start=1)
+    }
+
+    async def get_order_info(order_id: int):
+        await asyncio.sleep(delay)
+        return orders.get(order_id)
+
+    async def get_recent_orders_for_authenticated_user(user_id=None):
+        await asyncio.sleep(delay)
+        return list(orders.values())[:3]
+
+    DBService.get_order_info = staticmethod(get_order_info)
+    auth_db_service.get_recent_orders_for_authenticated_user = get_recent_orders_for_authenticated_user
+
+
+def instrument(timer: StageTimer):
+    """Time each pipeline stage of the running app"""
+    from app.core.intents import intent_router
+    from app.core.rag_engine import rag_engine
+    from app.core.ollama_client import ollama_client
+    from app.api.services.chat_service import chat_service
+    from app.api.services.quick_answers import quick_answer_service
+
+    timer.wrap(intent_router, "route", "route")
+    timer.wrap(quick_answer_service, "answer", "quick_answer")
+    timer.wrap(rag_engine, "retrieve", "retrieval")
+    timer.wrap(chat_service, "_get_relevant_db_info", "db_enrichment")
+    timer.wrap(rag_engine, "generate", "generation")
+    timer.wrap(ollama_client, "query", "llm")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: List[float], elapsed: float) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "throughput_rps": round(len(values) / elapsed, 2),
+    }
+
+
+async def replay(base_url: str, queries: List[str], concurrency: int, total: int, timer: StageTimer,
+                 timeout: float) -> Dict[str, Any]:
+    """Send total chat requests, cycling through the queries, with bounded concurrency"""
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/chat/chat", json={"query": queries[i % len(queries)]})
+                    errors += response.status_code != 200
+                except httpx.HTTPError:
+                    errors += 1
+                timer.record("request", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {"elapsed_s": round(elapsed, 2), "http_errors": errors}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    columns = ["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+    for result in results:
+        print(f"\nconcurrency {result['concurrency']}: {result['requests']} requests in {result['elapsed_s']}s, "
+              f"{result['http_errors']} HTTP errors, {result['llm_errors']} simulated LLM failures")
+        print("  ".join(c.ljust(14) for c in columns))
+        for stage in STAGES:
+            stats = result["stages"].get(stage)
+            if stats and stats["count"]:
+                print("  ".join(str(stats.get(c, stage)).ljust(14) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end chat latency against a fake Ollama server")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSON list of chat queries")
+    parser.add_argument("--docs", default=DEFAULT_DOCS_DIR, help="Documents seeding the vector store")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Fake LLM time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="Fake LLM generation speed")
+    parser.add_argument("--response-tokens", type=int, default=40, help="Tokens per fake LLM answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed LLM calls")
+    parser.add_argument("--db-delay-ms", type=float, default=5.0, help="Delay of stand-in order lookups")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    # The app logs every prompt at INFO; keep the report readable
+    logging.basicConfig(level=logging.WARNING)
+
+    with open(args.queries) as f:
+        queries = json.load(f)
+    corpus = load_corpus(args.docs)
+
+    fake_ollama = FakeOllamaServer("benchmark-model", args.ttft_ms, args.tokens_per_sec, args.response_tokens,
+                                   args.error_rate, args.seed)
+    fake_ollama.start()
+
+    # Point the app at the stand-ins before any app module reads its configuration
+    import app.config
+    app.config.OLLAMA_BASE_URL = fake_ollama.url
+    app.config.OLLAMA_MODEL = fake_ollama.model
+    app.config.VECTOR_STORE_DIR = tempfile.mkdtemp(prefix="latency_benchmark_")
+
+    import uvicorn
+    from app.main import app as fastapi_app
+    from app.core.vector_store import vector_store
+
+    vector_store.add_documents(
+        texts=[doc["text"] for doc in corpus],
+        metadatas=[{"source": doc["source"], "document_type": "text"} for doc in corpus]
+    )
+    sheet = next((doc["text"] for doc in corpus if doc["source"] == PRODUCT_SHEET), "")
+    install_stand_in_database(products_from_sheet(sheet), args.db_delay_ms)
+
+    timer = StageTimer()
+    instrument(timer)
+
+    # Startup hooks would connect to PostgreSQL; the stand-ins are installed above instead
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(fastapi_app, host="127.0.0.1", port=port, lifespan="off",
+                                           log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"Fake Ollama at {fake_ollama.url} (TTFT {args.ttft_ms} ms, {args.tokens_per_sec} tokens/s, "
+          f"{args.response_tokens} tokens, error rate {args.error_rate}), app at {base_url}, "
+          f"{len(queries)} queries, {len(corpus)} documents")
+
+    results = []
+    try:
+        # The LLM client echoes streamed tokens to stdout; discard them during runs
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            # Warm up: embedding model, entity trie, connection pools
+            asyncio.run(replay(base_url, queries, 1, len(queries), timer, args.timeout))
+            for concurrency in args.concurrency:
+                timer.reset()
+                failed_before = fake_ollama.failed
+                run = asyncio.run(replay(base_url, queries, concurrency, args.requests, timer, args.timeout))
+                results.append({
+                    "concurrency": concurrency,
+                    "requests": args.requests,
+                    **run,
+                    "llm_errors": fake_ollama.failed - failed_before,
+                    "stages": {stage: summarize(timer.samples.get(stage, []), run["elapsed_s"])
+                               for stage in STAGES},
+                })
+    finally:
+        server.should_exit = True
+        fake_ollama.stop()
+
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": datetime.utcnow().isoformat(),
+                "config": {k: v for k, v in vars(args).items() if k != "output"},
+                "results": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Measure worker startup: import time per module and time to first served request
+
+Import time is measured in fresh interpreters with `python -X importtime`
+(median of --repeat runs). Reported: the total import time of each target
+module, the slowest modules by cumulative time and the top-level packages by
+self time, which is where lazy imports pay off.
+
+Time to first served request starts a real uvicorn worker and polls --path
+until it answers; with --chat, the first chat request is timed as well. Both
+are measured from process start, so they include imports, model loading and
+the startup hooks (which connect to PostgreSQL; use --lifespan off without a
+database).
+
+Settings come from the environment as usual, e.g. compare
+VECTOR_STORE_BACKEND=local and sidecar. With --max-import-seconds or
+--max-first-request-seconds the script exits with status 1 when a budget is
+exceeded, so CI catches regressions.
+
+Usage:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --lifespan off --chat "Is delivery free?" --output startup.json
+    python benchmarks/startup_benchmark.py --skip-server --max-import-seconds 2.5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from app.config import API_PREFIX, API_V1_STR
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into {module, self_us, cumulative_us} rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return rows
+
+
+def measure_imports(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    """Import a module in fresh interpreters and summarize where the time goes"""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        runs.append(parse_importtime(result.stderr))
+
+    cumulative = defaultdict(list)
+    package_self = defaultdict(list)
+    for rows in runs:
+        packages = defaultdict(int)
+        for row in rows:
+            cumulative[row["module"]].append(row["cumulative_us"])
+            packages[row["module"].split(".")[0]] += row["self_us"]
+        for package, total in packages.items():
+            package_self[package].append(total)
+
+    total_us = statistics.median(cumulative[module])
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in cumulative.items() if name != module),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    packages = sorted(
+        ((name, statistics.median(values)) for name, values in package_self.items()),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+
+    return {
+        "module": module,
+        "import_seconds": round(total_us / 1e6, 3),
+        "modules_imported": round(statistics.median(len(rows) for rows in runs)),
+        "slowest_modules": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in slowest],
+        "slowest_packages": [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in packages],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_request(path: str, chat: Optional[str], lifespan: str, timeout: float) -> Dict[str, Any]:
+    """Start a uvicorn worker and time its first answered request (and first chat) from process start"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--lifespan", lifespan, "--log-level", "warning"],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+
+    result: Dict[str, Any] = {"path": path, "lifespan": lifespan}
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}:\n"
+                                       f"{process.stderr.read()[-2000:]}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"No answer on {path} within {timeout}s")
+                try:
+                    response = client.get(f"{base_url}{path}")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.02)
+            result["first_request_seconds"] = round(time.perf_counter() - start, 3)
+            result["status_code"] = response.status_code
+
+            if chat:
+                response = client.post(f"{base_url}{API_PREFIX}{API_V1_STR}/chat/chat", json={"query": chat})
+                result["first_chat_seconds"] = round(time.perf_counter() - start, 3)
+                result["chat_status_code"] = response.status_code
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return result
+
+
+def print_report(imports: List[Dict[str, Any]], server: Optional[Dict[str, Any]]) -> None:
+    for report in imports:
+        print(f"import {report['module']}: {report['import_seconds']}s, {report['modules_imported']} modules")
+        print("\n  slowest modules (cumulative ms)")
+        for row in report["slowest_modules"]:
+            print(f"    {row['cumulative_ms']:>9}  {row['module']}")
+        print("\n  slowest packages (self ms)")
+        for row in report["slowest_packages"]:
+            print(f"    {row['self_ms']:>9}  {row['package']}")
+        print()
+
+    if server:
+        print(f"first request to {server['path']} (lifespan {server['lifespan']}): "
+              f"{server['first_request_seconds']}s, HTTP {server['status_code']}")
+        if "first_chat_seconds" in server:
+            print(f"first chat request: {server['first_chat_seconds']}s, HTTP {server['chat_status_code']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time and time to first served request")
+    parser.add_argument("--modules", nargs="+", default=["app.main"], help="Modules whose import is timed")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module (median is reported)")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest modules and packages listed")
+    parser.add_argument("--path", default="/health", help="Path polled for the first served request")
+    parser.add_argument("--chat", help="Also time a first chat request with this query")
+    parser.add_argument("--lifespan", choices=["on", "off"], default="on", help="Run the startup hooks")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for the server")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    parser.add_argument("--max-import-seconds", type=float, help="Fail when an import takes longer")
+    parser.add_argument("--max-first-request-seconds", type=float, help="Fail when the first request takes longer")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    imports = [measure_imports(module, args.repeat, args.top) for module in args.modules]
+    server = None if args.skip_server else measure_first_request(args.path, args.chat, args.lifespan, args.timeout)
+    print_report(imports, server)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": datetime.utcnow().isoformat(),
+                "python": sys.version.split()[0],
+                "environment": {name: os.environ[name] for name in ("VECTOR_STORE_BACKEND", "EMBEDDING_BACKEND")
+                                if name in os.environ},
+                "imports": imports,
+                "server": server,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failures = []
+    if args.max_import_seconds is not None:
+        failures += [f"import {report['module']} took {report['import_seconds']}s > {args.max_import_seconds}s"
+                     for report in imports if report["import_seconds"] > args.max_import_seconds]
+    if args.max_first_request_seconds is not None and server \
+            and server["first_request_seconds"] > args.max_first_request_seconds:
+        failures.append(f"first request took {server['first_request_seconds']}s > {args.max_first_request_seconds}s")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
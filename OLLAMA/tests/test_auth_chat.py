@@ -1,10 +1,13 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from app.main import app
 from app.api.services.auth_chat_service import auth_chat_service
-from app.models.schemas import ChatResponse
+from app.core.intents import IntentMatch, GENERAL
+from app.models.schemas import ChatRequest, ChatResponse
 
 
 client = TestClient(app)
@@ -84,4 +87,27 @@ def test_order_tracking_endpoint_unauthenticated(mock_validate_token):
     
     assert response.status_code == 200
     assert "log in" in response.json()["answer"]
-    assert "guest" in response.json()["answer"]
\ No newline at end of file
+    assert "guest" in response.json()["answer"]
+
+def test_metadata_user_id_is_ignored():
+    """Test that a client-supplied user_id does not pull another customer's records into the prompt"""
+    chat_request = ChatRequest(
+        query="Which laptop should I buy?",
+        metadata={"authenticated": True, "user_id": 7}
+    )
+
+    with patch("app.api.services.auth_chat_service.intent_router.route",
+               AsyncMock(return_value=IntentMatch(GENERAL, {}, 0.0, "default"))), \
+         patch("app.api.services.auth_chat_service.quick_answer_service.answer", AsyncMock(return_value=None)), \
+         patch.object(auth_chat_service, "_get_relevant_db_info", AsyncMock(return_value="")), \
+         patch.object(auth_chat_service.rag_engine, "process_query_async",
+                      AsyncMock(return_value=("Try the UltraBook.", []))) as process_query, \
+         patch("app.utils.auth_db.auth_db_service.get_user_info", AsyncMock()) as get_user_info, \
+         patch("app.utils.auth_db.auth_db_service.get_recent_orders_for_authenticated_user",
+               AsyncMock()) as get_recent_orders:
+        response = asyncio.run(auth_chat_service.process_authenticated_message(chat_request))
+
+    assert response.answer == "Try the UltraBook."
+    assert set(process_query.call_args.kwargs["enrichment"]) == {"db_info"}
+    get_user_info.assert_not_called()
+    get_recent_orders.assert_not_called()
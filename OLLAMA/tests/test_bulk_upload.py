@@ -0,0 +1,152 @@
+import asyncio
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from unittest.mock import patch
+
+from app.api.services.db_service import DocumentService
+from app.models.schemas import DocumentType
+from app.utils.parsers import DocumentParser, DOCUMENT_TYPE_DIRS
+from app.utils import uploads
+from app.utils.uploads import ArchiveLimitError, stage_archive_entries
+
+
+def _zip_bytes(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar_bytes(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+def test_detect_document_type():
+    """Test document type detection from filename extensions"""
+    assert DocumentParser.detect_document_type("manual.PDF") == DocumentType.PDF
+    assert DocumentParser.detect_document_type("prices.csv") == DocumentType.CSV
+    assert DocumentParser.detect_document_type("faq.json") == DocumentType.JSON
+    assert DocumentParser.detect_document_type("notes.md") == DocumentType.TEXT
+    assert DocumentParser.detect_document_type("image.png") is None
+
+
+@pytest.mark.parametrize("builder", [_zip_bytes, _tar_bytes])
+def test_iter_archive(builder):
+    """Test reading regular files from zip and tar archives"""
+    archive = builder({
+        "docs/faq.txt": b"Shipping takes 3 days.",
+        "docs/.hidden.txt": b"ignored",
+        "prices.csv": b"a,b\n1,2\n",
+    })
+
+    entries = {name: stream.read() for name, stream in DocumentParser.iter_archive(archive)}
+
+    assert entries == {
+        "faq.txt": b"Shipping takes 3 days.",
+        "prices.csv": b"a,b\n1,2\n",
+    }
+
+
+def test_iter_archive_rejects_unknown_format():
+    """Test that non-archive bodies are rejected"""
+    with pytest.raises(ValueError):
+        list(DocumentParser.iter_archive(io.BytesIO(b"not an archive")))
+
+
+def test_stage_archive_entries_limits():
+    """Test per-entry, entry count and total extracted size limits of archive staging"""
+    files = {"faq.txt": b"Returns within 30 days.", "big.txt": b"x" * 100, "prices.csv": b"a,b\n1,2\n"}
+
+    entries = stage_archive_entries(DocumentParser.iter_archive(_zip_bytes(files)), max_size=50)
+    try:
+        assert [entry["filename"] for entry in entries] == ["faq.txt", "big.txt", "prices.csv"]
+        assert "maximum size" in entries[1]["error"]
+        with open(entries[0]["path"], "rb") as f:
+            assert f.read() == b"Returns within 30 days."
+    finally:
+        for entry in entries:
+            if "path" in entry:
+                os.remove(entry["path"])
+
+    staged_paths = []
+    real_copy = uploads.copy_stream_to_disk
+
+    def copy(stream, max_size):
+        path, sha256, size = real_copy(stream, max_size)
+        staged_paths.append(path)
+        return path, sha256, size
+
+    with patch.object(uploads, "copy_stream_to_disk", side_effect=copy):
+        with pytest.raises(ArchiveLimitError, match="more than 2 files"):
+            stage_archive_entries(DocumentParser.iter_archive(_tar_bytes(files)), max_size=500, max_entries=2)
+        with pytest.raises(ArchiveLimitError, match="more than 64 bytes"):
+            stage_archive_entries(DocumentParser.iter_archive(_zip_bytes(files)), max_size=500, max_total_size=64)
+
+    # Files staged before the archive was rejected are removed
+    assert staged_paths and not any(os.path.exists(path) for path in staged_paths)
+
+
+def test_archive_route_rejects_archive_bombs():
+    """Test that the archive upload route answers 413 beyond the entry limit without ingesting"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    archive = _zip_bytes({f"faq{i}.txt": b"Delivery takes 3 days." for i in range(5)}).getvalue()
+    with patch("app.api.routes.admin.stage_archive_entries",
+                  side_effect=lambda entries: stage_archive_entries(entries, max_entries=3)), \
+            patch.object(DocumentService, "add_documents_bulk") as mock_bulk:
+        response = TestClient(app).post("/api/v1/admin/documents/upload/archive", content=archive)
+
+    assert response.status_code == 413
+    assert "more than 3 files" in response.json()["detail"]
+    mock_bulk.assert_not_called()
+
+
+def test_add_documents_bulk(tmp_path, monkeypatch):
+    """Test that bulk ingestion embeds once and reports per-file results"""
+    def stage(name, content):
+        path = tmp_path / f"{name}.upload"
+        path.write_bytes(content)
+        return str(path)
+
+    entries = [
+        {"filename": "faq.txt", "path": stage("faq", b"Returns are accepted within 30 days."), "sha256": "abc"},
+        {"filename": "logo.png", "path": stage("logo", b"\x89PNG")},
+        {"filename": "broken.json", "path": stage("broken", b"{not json")},
+        {"filename": "huge.pdf", "error": "Upload exceeds the maximum size of 10 bytes"},
+    ]
+    monkeypatch.setitem(DOCUMENT_TYPE_DIRS, DocumentType.TEXT, str(tmp_path))
+    monkeypatch.setitem(DOCUMENT_TYPE_DIRS, DocumentType.JSON, str(tmp_path))
+
+    with patch("app.api.services.db_service.vector_store") as mock_vector_store, \
+            patch.object(DocumentService, "_record_documents") as mock_record:
+        mock_vector_store.add_documents_batch.return_value = [["chunk-1", "chunk-2"]]
+
+        results = asyncio.run(DocumentService.add_documents_bulk(entries, description="Bulk"))
+
+    assert [result.filename for result in results] == ["faq.txt", "logo.png", "broken.json", "huge.pdf"]
+    assert results[0].success and results[0].document.id == "chunk-1"
+    assert results[0].document.document_type == DocumentType.TEXT
+    assert not results[1].success and results[1].error == "Unsupported file type"
+    assert not results[2].success and results[2].document_type == DocumentType.JSON
+    assert not results[3].success and "maximum size" in results[3].error
+    assert results[0].document.metadata["sha256"] == "abc"
+
+    # Only the parsed document reaches the shared embedding stage, in a single call
+    mock_vector_store.add_documents_batch.assert_called_once()
+    texts, _ = mock_vector_store.add_documents_batch.call_args[0]
+    assert texts == ["Returns are accepted within 30 days."]
+    mock_record.assert_called_once()
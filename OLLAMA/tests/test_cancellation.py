@@ -0,0 +1,158 @@
+import json
+import time
+import asyncio
+import threading
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import pytest
+
+from app.main import app
+from app.core.metrics import CANCELLED_REQUESTS, LLM_CANCELLED_CALLS
+from app.core.rag_engine import RAGEngine
+from app.core.resilience import Cancellation, cancellable_context, current_cancellation
+from app.utils.concurrency import Branch, cancel_on_disconnect, ClientDisconnectedError
+from tests.test_resilience import SlowOllama, make_client
+
+
+class DisconnectingRequest:
+    """Request whose client disconnects after `delay` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def receive(self):
+        await asyncio.sleep(self.delay)
+        return {"type": "http.disconnect"}
+
+
+def test_disconnect_cancels_the_work():
+    """Test that a disconnect cancels the task, fires its cancellation and is counted"""
+    seen = {}
+
+    async def work():
+        seen["cancellation"] = current_cancellation()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            seen["cancelled"] = True
+            raise
+
+    before = CANCELLED_REQUESTS.labels("test").value()
+    start = time.perf_counter()
+    with pytest.raises(ClientDisconnectedError):
+        asyncio.run(cancel_on_disconnect(DisconnectingRequest(0.05), work(), "test"))
+
+    assert time.perf_counter() - start < 1
+    assert seen["cancelled"] is True
+    assert seen["cancellation"].cancelled is True
+    assert CANCELLED_REQUESTS.labels("test").value() == before + 1
+
+
+def test_finished_work_is_returned():
+    """Test that work done before any disconnect is returned as is"""
+    async def work():
+        return "answer"
+
+    assert asyncio.run(cancel_on_disconnect(DisconnectingRequest(5), work(), "test")) == "answer"
+
+
+def test_cancelled_query_cancels_enrichment_branches():
+    """Test that cancelling a query mid-enrichment cancels its branches instead of letting them run out"""
+    engine = RAGEngine()
+    engine.retrieve = MagicMock(return_value=[])
+    engine.generate = AsyncMock(return_value="answer")
+    seen = {}
+
+    async def order_lookup():
+        seen["started"] = True
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            seen["cancelled"] = True
+            raise
+        return "Order #123: shipped"
+
+    async def run():
+        enrichment = {"orders": Branch(order_lookup(), 5.0, "")}
+        task = asyncio.ensure_future(engine.process_query_async("Where is my order?", enrichment=enrichment))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Let the cancelled branch run its handler; asyncio.run would cancel it too, but only on exit
+        await asyncio.sleep(0.01)
+        return dict(seen)
+
+    assert asyncio.run(run()) == {"started": True, "cancelled": True}
+    engine.generate.assert_not_called()
+
+
+def test_cancellation_aborts_generation_in_worker_thread():
+    """Test that cancelling the request closes the Ollama stream of a blocking query"""
+    with SlowOllama(tokens=["a"] * 100, interval=0.02) as ollama:
+        client = make_client(ollama.url)
+        cancellation = Cancellation()
+        before = LLM_CANCELLED_CALLS.value()
+
+        async def run():
+            query = asyncio.to_thread(client.query, "prompt")
+            task = cancellable_context(cancellation).run(asyncio.get_running_loop().create_task, query)
+            await asyncio.sleep(0.2)
+            start = time.perf_counter()
+            cancellation.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return time.perf_counter() - start
+
+        assert asyncio.run(run()) < 0.5
+        assert LLM_CANCELLED_CALLS.value() == before + 1
+        assert client.breaker.allow() is True
+
+
+def test_chat_route_cancels_on_disconnect():
+    """Test that the chat endpoint stops processing and answers 499 when the client leaves"""
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    async def slow_process_message(request):
+        started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    body = json.dumps({"query": "Is delivery free?"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/v1/chat/chat", "raw_path": b"/api/v1/chat/chat",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+    }
+    sent = []
+
+    async def run():
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        await app(scope, receive, send)
+
+    before = CANCELLED_REQUESTS.labels("chat").value()
+    with patch("app.api.routes.chat.chat_service.process_message", slow_process_message):
+        start = time.perf_counter()
+        asyncio.run(run())
+
+    assert time.perf_counter() - start < 2
+    assert cancelled.is_set()
+    assert sent[0]["status"] == 499
+    assert CANCELLED_REQUESTS.labels("chat").value() == before + 1
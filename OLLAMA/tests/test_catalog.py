@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+from unittest.mock import patch, AsyncMock
+
+from app.core.catalog import ProductCatalog, CatalogSync
+from app.utils.db import DBService
+
+
+def _row(product_id, designation, prix=10.0, stock=5, seuil=2, category_id=1, category_name="Phones"):
+    return {
+        "id": product_id,
+        "designation": designation,
+        "description": None,
+        "prix": prix,
+        "qteStock": stock,
+        "seuilMin": seuil,
+        "nbrPoint": 0,
+        "categoryId": category_id,
+        "category_name": category_name,
+    }
+
+
+def _catalog():
+    catalog = ProductCatalog()
+    catalog.load_rows([
+        _row(1, "Phone X", stock=10),
+        _row(2, "Cable", stock=1, category_id=2, category_name="Accessories"),
+        _row(3, "Charger", stock=0, category_id=2, category_name="Accessories"),
+    ])
+    return catalog
+
+
+def test_lookups_match_db_row_shape():
+    """Test id, name and category lookups and the derived stock status"""
+    catalog = _catalog()
+
+    product = catalog.get(1)
+    assert product["designation"] == "Phone X"
+    assert product["category_name"] == "Phones"
+    assert product["stock_status"] == "In Stock"
+    assert catalog.get(2)["stock_status"] == "Low Stock"
+    assert catalog.get(3)["stock_status"] == "Out of Stock"
+
+    assert catalog.find_by_name("phone")["id"] == 1
+    assert catalog.find_by_name("missing") is None
+    assert [p["designation"] for p in catalog.list_products(limit=2)] == ["Cable", "Charger"]
+    assert sorted(p["id"] for p in catalog.by_category(2)) == [2, 3]
+
+
+def test_incremental_upsert_and_remove():
+    """Test that row updates keep the arrays dense and the indexes consistent"""
+    catalog = _catalog()
+    version = catalog.version
+
+    catalog.upsert(_row(2, "Cable", stock=50, category_id=1))
+    assert catalog.get(2)["qteStock"] == 50
+    assert sorted(p["id"] for p in catalog.by_category(1)) == [1, 2]
+    assert [p["id"] for p in catalog.by_category(2)] == [3]
+
+    catalog.remove(1)
+    assert catalog.get(1) is None
+    assert len(catalog) == 2
+    assert catalog.get(3)["designation"] == "Charger"
+    assert [p["designation"] for p in catalog.list_products()] == ["Cable", "Charger"]
+
+    catalog.upsert(_row(4, "Adapter"))
+    assert catalog.list_products()[0]["id"] == 4
+    assert catalog.version > version
+
+
+def test_notification_refreshes_only_the_changed_row():
+    """Test that a NOTIFY payload triggers a single-row refresh"""
+    sync = CatalogSync(_catalog())
+
+    async def run():
+        with patch.object(sync, "refresh_product", new=AsyncMock()) as refresh_product, \
+                patch.object(sync, "refresh_category", new=AsyncMock()) as refresh_category:
+            sync._on_notification(None, 0, "catalog_changes", json.dumps({"table": "Produit", "op": "UPDATE", "id": 2}))
+            sync._on_notification(None, 0, "catalog_changes", json.dumps({"table": "Category", "op": "UPDATE", "id": 1}))
+            sync._on_notification(None, 0, "catalog_changes", "not json")
+            await asyncio.gather(*sync._pending)
+        return refresh_product, refresh_category
+
+    refresh_product, refresh_category = asyncio.run(run())
+    refresh_product.assert_awaited_once_with(2)
+    refresh_category.assert_awaited_once_with(1)
+
+
+def test_db_service_uses_loaded_catalog():
+    """Test that chat lookups are served from the catalog without a DB session"""
+    catalog = _catalog()
+    with patch("app.utils.db.product_catalog", catalog), patch("app.utils.db.AsyncSessionLocal") as mock_session:
+        assert asyncio.run(DBService.check_stock(product_name="charger"))["id"] == 3
+        assert asyncio.run(DBService.get_product_info(product_id=1))["designation"] == "Phone X"
+        assert len(asyncio.run(DBService.get_all_products(limit=2))) == 2
+    mock_session.assert_not_called()
@@ -58,4 +58,120 @@ def test_stock_check_query():
 
     # The answer should mention stock availability or the product
     answer = response.json()["answer"]
-    assert "stock" in answer.lower() or "iphone" in answer.lower()
\ No newline at end of file
+    assert "stock" in answer.lower() or "iphone" in answer.lower()
+
+def test_batch_endpoint_orders_or_streams_results():
+    """Test the batch endpoint in ordered and NDJSON streaming modes"""
+    import json
+    from unittest.mock import AsyncMock, patch
+    from app.models.schemas import ChatResponse
+
+    async def iter_batch(queries):
+        # Completion order differs from query order
+        for index in reversed(range(len(queries))):
+            yield index, ChatResponse(answer=f"answer {index}")
+
+    with patch("app.api.routes.chat.chat_service") as service:
+        service.iter_batch = iter_batch
+        service.process_batch = AsyncMock(return_value=[ChatResponse(answer="answer 0"), ChatResponse(answer="answer 1")])
+
+        response = client.post("/api/v1/chat/batch", json={"queries": ["a", "b"]})
+        assert [r["answer"] for r in response.json()["results"]] == ["answer 0", "answer 1"]
+
+        response = client.post("/api/v1/chat/batch", json={"queries": ["a", "b"], "stream": True})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [(line["index"], line["answer"]) for line in lines] == [(1, "answer 1"), (0, "answer 0")]
+
+    assert client.post("/api/v1/chat/batch", json={"queries": []}).status_code == 422
+
+
+def test_batch_stream_ends_with_error_line_on_failure():
+    """Test that a failing streamed batch ends with an error line instead of just stopping"""
+    import json
+    from unittest.mock import patch
+    from app.models.schemas import ChatResponse
+
+    async def iter_batch(queries):
+        yield 0, ChatResponse(answer="Delivery takes 3-5 business days.")
+        raise RuntimeError("vector store unavailable")
+
+    with patch("app.api.routes.chat.chat_service") as service:
+        service.iter_batch = iter_batch
+        response = client.post("/api/v1/chat/batch", json={"queries": ["a", "b"], "stream": True})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["index"] == 0
+    assert lines[-1] == {"error": "Error processing chat batch"}
+
+
+def test_batch_routes_concurrently_and_bounds_db_lookups():
+    """Test that batch routing runs concurrently and routing plus enrichment share the lookup limit"""
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from app.api.services.chat_service import ChatService
+    from app.core.rag_engine import RAGEngine
+    from app.models.schemas import ChatResponse
+
+    queries = ["Where is order 12?", "Price of Phone 1?", "Price of Phone 2?", "Price of Phone 3?", "Price of Phone 4?"]
+    in_flight = {"now": 0, "max": 0, "routing_max": 0}
+
+    async def lookup(kind):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        if kind == "routing":
+            in_flight["routing_max"] = max(in_flight["routing_max"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+
+    async def direct_answer(query):
+        await lookup("routing")
+        return ChatResponse(answer="Order 12 has shipped.") if "order" in query else None
+
+    async def db_info(query):
+        await lookup("enrichment")
+        return f"Catalog: {query.split()[-1].rstrip('?')} costs $99.99"
+
+    engine = RAGEngine()
+    engine.vector_store = MagicMock()
+    engine.vector_store.search_batch.return_value = [[] for _ in queries[1:]]
+    engine.llm = MagicMock()
+    engine.llm.aquery = AsyncMock(side_effect=lambda prompt, system_prompt=None: prompt)
+
+    service = ChatService()
+    service.rag_engine = engine
+    service._direct_answer = direct_answer
+    service._get_relevant_db_info = db_info
+
+    async def run():
+        return [item async for item in service.iter_batch(queries)]
+
+    with patch("app.api.services.chat_service.BATCH_DB_CONCURRENCY", 2):
+        results = dict(asyncio.run(run()))
+
+    assert in_flight["routing_max"] == 2
+    assert in_flight["max"] == 2
+    assert results[0].answer == "Order 12 has shipped."
+    assert sorted(results) == [0, 1, 2, 3, 4]
+    prompts = [call.args[0] for call in engine.llm.aquery.call_args_list]
+    for index in range(1, 5):
+        assert any(f"Catalog: {index} costs $99.99" in prompt and queries[index] in prompt for prompt in prompts)
+
+
+def test_sessions_are_created_by_the_server():
+    """Test that the server issues session IDs and rejects IDs it did not issue"""
+    from unittest.mock import AsyncMock, patch
+    from app.api.services.chat_service import chat_service
+    from app.models.schemas import ChatResponse
+
+    response = client.post("/api/v1/chat/chat", json={"query": "Hi", "session_id": "my-own-id"})
+    assert response.status_code == 404
+
+    with patch.object(chat_service, "_answer", AsyncMock(return_value=ChatResponse(answer="Hello!"))):
+        response = client.post("/api/v1/chat/chat", json={"query": "Hi", "new_session": True})
+        session_id = response.json()["session_id"]
+        assert session_id and session_id != "my-own-id"
+
+        response = client.post("/api/v1/chat/chat", json={"query": "Any deals?", "session_id": session_id})
+    assert response.status_code == 200
+    assert response.json()["session_id"] == session_id
@@ -0,0 +1,86 @@
+import pytest
+
+from app.core.chunking import (
+    MarkdownChunker,
+    SentenceChunker,
+    TokenChunker,
+    chunker_for_metadata,
+)
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def test_token_chunker_respects_budget():
+    """Test that token chunks never exceed the token budget"""
+    chunker = TokenChunker(chunk_tokens=10, chunk_overlap=2, length_function=word_count)
+    text = " ".join(f"word{i}" for i in range(95))
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) >= 10
+    assert all(word_count(chunk) <= 10 for chunk in chunks)
+
+
+def test_sentence_chunker_keeps_sentences_whole():
+    """Test that sentences are packed without being cut"""
+    chunker = SentenceChunker(chunk_tokens=12, chunk_overlap=0, length_function=word_count)
+    text = "Shipping takes three days. Returns are free within thirty days. Gift cards never expire."
+
+    chunks = chunker.split_text(text)
+
+    assert chunks == [
+        "Shipping takes three days. Returns are free within thirty days.",
+        "Gift cards never expire.",
+    ]
+
+
+def test_sentence_chunker_overlap_carries_last_sentence():
+    """Test that the trailing sentence is repeated when it fits the overlap"""
+    chunker = SentenceChunker(chunk_tokens=8, chunk_overlap=4, length_function=word_count)
+    text = "One two three. Four five six. Seven eight nine."
+
+    chunks = chunker.split_text(text)
+
+    assert chunks == ["One two three. Four five six.", "Four five six. Seven eight nine."]
+
+
+def test_markdown_chunker_splits_on_headings():
+    """Test that each product section becomes its own chunk"""
+    chunker = MarkdownChunker(chunk_tokens=50, chunk_overlap=0, length_function=word_count)
+    text = (
+        "# Product Information\n\n"
+        "## Laptop Pro\nPrice: $999.00\nStock: 4 units\n\n"
+        "## Phone X\nPrice: $599.00\nStock: 0 units\n"
+    )
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) == 2
+    assert chunks[0].startswith("# Product Information")
+    assert "## Laptop Pro" in chunks[0]
+    assert "$999.00" in chunks[0] and "Phone X" not in chunks[0]
+    assert chunks[1].startswith("## Phone X")
+
+
+def test_markdown_chunker_repeats_heading_on_continuations():
+    """Test that oversized sections keep their heading trail"""
+    chunker = MarkdownChunker(chunk_tokens=8, chunk_overlap=0, length_function=word_count)
+    text = "## Laptop Pro\n" + " ".join(f"spec{i}" for i in range(20))
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 1
+    assert all("Laptop Pro" in chunk for chunk in chunks)
+
+
+@pytest.mark.parametrize("metadata, expected", [
+    ({"chunking": "markdown", "document_type": "pdf"}, "markdown"),
+    ({"document_type": "pdf"}, "sentence"),
+    ({"document_type": "csv"}, "token"),
+    (None, "token"),
+])
+def test_chunker_for_metadata(metadata, expected):
+    """Test strategy selection from document metadata"""
+    assert chunker_for_metadata(metadata).name == expected
@@ -0,0 +1,39 @@
+import asyncio
+
+from app.utils.concurrency import Branch, gather_branches
+
+
+async def _value(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail():
+    raise RuntimeError("boom")
+
+
+def test_gather_branches_uses_defaults_for_slow_and_failed_branches():
+    """Test per-branch timeouts and failures fall back to defaults"""
+    results = asyncio.run(gather_branches({
+        "fast": Branch(_value("ok"), 1.0, ""),
+        "slow": Branch(_value("late", delay=1.0), 0.05, "default"),
+        "broken": Branch(_fail(), 1.0, []),
+    }))
+
+    assert results == {"fast": "ok", "slow": "default", "broken": []}
+
+
+def test_gather_branches_deadline_returns_partial_data():
+    """Test that the overall deadline cuts off branches with longer timeouts"""
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await gather_branches({
+            "fast": Branch(_value(1), 5.0, 0),
+            "slow": Branch(_value(2, delay=5.0), 5.0, 0),
+        }, deadline=0.1)
+        return results, loop.time() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == {"fast": 1, "slow": 0}
+    assert elapsed < 1.0
@@ -0,0 +1,70 @@
+from app.core.context_builder import ContextBuilder, NO_CONTEXT
+
+
+def _words(n, start=0):
+    return " ".join(f"w{i}" for i in range(start, start + n))
+
+
+def _doc(content, source="guide.pdf", score=None, chunk_index=None):
+    metadata = {"source": source}
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    doc = {"content": content, "metadata": metadata}
+    if score is not None:
+        doc["relevance_score"] = score
+    return doc
+
+
+def test_drops_near_duplicates():
+    """Test that overlapping near-identical chunks are kept once"""
+    text = "Returns are accepted within 30 days of delivery with the original receipt and packaging"
+    built = ContextBuilder(token_budget=1000).build([
+        _doc(text, score=0.9),
+        _doc(text + " included", score=0.85),
+        _doc("Shipping to Tunisia takes three to five business days", source="shipping.pdf", score=0.5),
+    ])
+
+    assert built.duplicates == 1
+    assert len(built.documents) == 2
+    assert "[Source: shipping.pdf]" in built.text
+
+
+def test_respects_token_budget():
+    """Test that selection stops at the budget and reports the size"""
+    builder = ContextBuilder(token_budget=60)
+    documents = [_doc(_words(40, i * 100), source=f"doc{i}.pdf", score=1.0 - i / 10) for i in range(5)]
+
+    built = builder.build(documents)
+    assert built.tokens <= 60
+    assert 0 < len(built.documents) < 5
+    assert built.candidates == 5
+
+    # A single oversized chunk is truncated rather than dropped
+    built = builder.build([_doc(_words(400), score=0.9)])
+    assert 0 < built.tokens <= 60
+
+
+def test_mmr_prefers_diverse_chunks():
+    """Test that a redundant chunk loses to a less relevant but different one"""
+    base = _words(30)
+    builder = ContextBuilder(token_budget=90, mmr_lambda=0.5, dedup_threshold=0.95)
+    built = builder.build([
+        _doc(base, source="a.pdf", score=0.9),
+        _doc(base + " " + _words(5, 500), source="b.pdf", score=0.88),
+        _doc(_words(30, 1000), source="c.pdf", score=0.6),
+    ])
+
+    assert [d["metadata"]["source"] for d in built.documents][:2] == ["a.pdf", "c.pdf"]
+
+
+def test_merges_adjacent_chunks():
+    """Test that neighbouring chunks of one document become a single passage"""
+    built = ContextBuilder(token_budget=1000).build([
+        _doc("alpha beta gamma delta epsilon", source="faq.md", score=0.9, chunk_index=1),
+        _doc("delta epsilon zeta eta theta", source="faq.md", score=0.8, chunk_index=2),
+        _doc("unrelated passage about warranty terms", source="terms.pdf", score=0.7, chunk_index=0),
+    ])
+
+    assert built.text.count("[Source: faq.md]") == 1
+    assert "alpha beta gamma delta epsilon zeta eta theta" in built.text
+    assert ContextBuilder().build([]).text == NO_CONTEXT
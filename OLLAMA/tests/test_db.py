@@ -0,0 +1,33 @@
+import asyncio
+
+from unittest.mock import patch
+
+from app.database.async_connection import to_async_url
+from app.utils.db import DBService, _product_lookup
+
+
+def test_to_async_url():
+    """Test that PostgreSQL URLs are switched to the asyncpg driver"""
+    assert to_async_url("postgresql://u:p@db:5432/shop") == "postgresql+asyncpg://u:p@db:5432/shop"
+    assert to_async_url("postgresql+psycopg2://u:p@db/shop") == "postgresql+asyncpg://u:p@db/shop"
+    assert to_async_url("sqlite:///local.db") == "sqlite:///local.db"
+
+
+def test_product_lookup_binds_only_the_given_filter():
+    """Test that lookups never bind NULL-only parameters (unsupported by asyncpg)"""
+    query, params = _product_lookup(7, "phone")
+    assert params == {"product_id": 7}
+    assert "p.id = :product_id" in str(query)
+
+    query, params = _product_lookup(None, "phone")
+    assert params == {"product_name": "%phone%"}
+    assert "ILIKE :product_name" in str(query)
+
+    assert _product_lookup(None, None) == (None, None)
+
+
+def test_check_stock_without_filter_skips_database():
+    """Test that an empty lookup returns without opening a session"""
+    with patch("app.utils.db.AsyncSessionLocal") as mock_session:
+        assert asyncio.run(DBService.check_stock()) is None
+    mock_session.assert_not_called()
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from app.api.services.db_service import DocumentService
+from app.models.schemas import DocumentType
+from app.utils.parsers import DOCUMENT_TYPE_DIRS
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(DOCUMENT_TYPE_DIRS, DocumentType.TEXT, str(tmp_path))
+    return tmp_path
+
+
+def _stage(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path), hashlib.sha256(content).hexdigest()
+
+
+def test_duplicate_upload_reuses_stored_document(storage_dir, tmp_path):
+    """Test that identical content is parsed and embedded only once"""
+    content = b"Orders ship within two business days."
+
+    with patch("app.api.services.db_service.vector_store") as mock_vector_store, \
+            patch("app.api.services.db_service.SessionLocal"):
+        embedding_threads = []
+
+        def add_documents(texts, metadatas):
+            embedding_threads.append(threading.get_ident())
+            return ["chunk-1"]
+
+        mock_vector_store.add_documents.side_effect = add_documents
+
+        staged, sha256 = _stage(tmp_path, "first.upload", content)
+        first = asyncio.run(DocumentService.add_document(
+            staged_path=staged, filename="shipping.txt", description="", doc_type=DocumentType.TEXT, sha256=sha256
+        ))
+
+        staged, _ = _stage(tmp_path, "second.upload", content)
+        second = asyncio.run(DocumentService.add_document(
+            staged_path=staged, filename="shipping-copy.txt", description="", doc_type=DocumentType.TEXT, sha256=sha256
+        ))
+
+    assert mock_vector_store.add_documents.call_count == 1
+    # Embedding ran in a worker thread, not on the event loop
+    assert embedding_threads != [threading.get_ident()]
+    assert first.file_path.endswith(f"{sha256}.txt")
+    assert first.metadata["source"] == "shipping.txt"
+    assert not first.duplicate
+    assert second.duplicate
+    assert second.id == first.id
+    assert sorted(p.name for p in storage_dir.iterdir() if p.name.startswith(sha256)) == [
+        f"{sha256}.txt", f"{sha256}.txt.metadata.json"
+    ]
+
+
+def test_bulk_upload_deduplicates_within_batch(storage_dir, tmp_path):
+    """Test that repeated files in one batch are ingested once"""
+    content = b"Returns are accepted within 30 days."
+    first, sha256 = _stage(tmp_path, "a.upload", content)
+    second, _ = _stage(tmp_path, "b.upload", content)
+    entries = [
+        {"filename": "returns.txt", "path": first, "sha256": sha256},
+        {"filename": "returns (1).txt", "path": second, "sha256": sha256},
+    ]
+
+    with patch("app.api.services.db_service.vector_store") as mock_vector_store, \
+            patch.object(DocumentService, "_record_documents"):
+        mock_vector_store.add_documents_batch.return_value = [["chunk-1"]]
+
+        results = asyncio.run(DocumentService.add_documents_bulk(entries))
+
+    texts, _ = mock_vector_store.add_documents_batch.call_args[0]
+    assert texts == ["Returns are accepted within 30 days."]
+    assert results[0].success and not results[0].document.duplicate
+    assert results[1].success and results[1].document.duplicate
+    assert results[1].filename == "returns (1).txt"
+    assert results[1].document.id == results[0].document.id
+
+
+def test_duplicate_is_keyed_on_content_and_reports_ignored_fields(storage_dir, tmp_path):
+    """Test that the same bytes under another extension are a duplicate and new fields are reported"""
+    content = b"Gift cards never expire."
+
+    with patch("app.api.services.db_service.vector_store") as mock_vector_store, \
+            patch("app.api.services.db_service.SessionLocal"):
+        mock_vector_store.add_documents.return_value = ["chunk-1"]
+
+        staged, sha256 = _stage(tmp_path, "first.upload", content)
+        first = asyncio.run(DocumentService.add_document(
+            staged_path=staged, filename="gift-cards.txt", description="Gift cards",
+            doc_type=DocumentType.TEXT, sha256=sha256
+        ))
+
+        staged, _ = _stage(tmp_path, "second.upload", content)
+        same = asyncio.run(DocumentService.add_document(
+            staged_path=staged, filename="gift-cards.md", description="Gift cards",
+            doc_type=DocumentType.TEXT, sha256=sha256
+        ))
+        changed = asyncio.run(DocumentService.add_document(
+            staged_path=staged, filename="gift-cards.md", description="Gift card policy",
+            doc_type=DocumentType.TEXT, metadata={"locale": "fr"}, sha256=sha256
+        ))
+
+    assert mock_vector_store.add_documents.call_count == 1
+    assert same.duplicate and same.id == first.id
+    assert same.ignored_fields == []
+    assert changed.duplicate and changed.description == "Gift cards"
+    assert changed.ignored_fields == ["description", "metadata"]
@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+torch = pytest.importorskip("torch")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from app.core.embeddings import OnnxEmbeddings, export_onnx, onnx_model_path
+
+WORDS = "the customer asked about order tracking delivery times product stock prices and the return policy".split()
+SENTENCES = [
+    "order tracking",
+    "the delivery times and the product prices",
+    "customer return policy",
+    "stock",
+    "the customer asked about the order tracking and the delivery times and the return policy",
+]
+
+
+def build_tiny_model(path: str) -> str:
+    """Save a small randomly initialised BERT sentence-transformers model, so no download is needed"""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    bert_dir = os.path.join(path, "bert")
+    os.makedirs(bert_dir)
+    with open(os.path.join(bert_dir, "vocab.txt"), "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=5 + len(WORDS), hidden_size=32, num_hidden_layers=2, num_attention_heads=4,
+        intermediate_size=64, max_position_embeddings=64
+    )
+    BertModel(config).save_pretrained(bert_dir)
+    BertTokenizerFast(os.path.join(bert_dir, "vocab.txt")).save_pretrained(bert_dir)
+
+    transformer = models.Transformer(bert_dir, max_seq_length=32)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    model_dir = os.path.join(path, "sentence-model")
+    SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu").save(model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope="module")
+def exported_model():
+    path = tempfile.mkdtemp()
+    model_name = build_tiny_model(path)
+    onnx_dir = os.path.join(path, "onnx")
+    export_onnx(model_name, onnx_dir, quantize=True)
+    reference = sentence_transformers.SentenceTransformer(model_name, device="cpu")
+    expected = reference.encode(SENTENCES, normalize_embeddings=True)
+    return model_name, onnx_dir, expected
+
+
+def test_onnx_embeddings_match_torch(exported_model):
+    """Test cosine parity of the float32 ONNX model with the sentence-transformers model"""
+    model_name, onnx_dir, expected = exported_model
+    embeddings = OnnxEmbeddings(model_name, onnx_dir, quantize=False, threads=1, batch_size=2)
+
+    actual = np.array(embeddings.embed_documents(SENTENCES))
+    assert actual.shape == expected.shape
+    assert np.min(np.sum(actual * expected, axis=1)) > 0.9999
+    assert np.allclose(embeddings.embed_query(SENTENCES[1]), expected[1], atol=1e-5)
+
+
+def test_quantized_embeddings_stay_close(exported_model):
+    """Test that int8 quantization keeps embeddings close to the original"""
+    model_name, onnx_dir, expected = exported_model
+    embeddings = OnnxEmbeddings(model_name, onnx_dir, quantize=True, threads=1)
+
+    assert embeddings.model_path.endswith("model.int8.onnx")
+    assert os.path.getsize(embeddings.model_path) < os.path.getsize(
+        os.path.join(onnx_model_path(model_name, onnx_dir), "model.onnx")
+    )
+    actual = np.array(embeddings.embed_documents(SENTENCES))
+    assert np.min(np.sum(actual * expected, axis=1)) > 0.98
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.core.catalog import ProductCatalog
+from app.core.entities import ProductEntityMatcher
+
+
+def _row(product_id, designation, category_id, category_name):
+    return {"id": product_id, "designation": designation, "prix": 10.0, "qteStock": 3, "seuilMin": 1,
+            "nbrPoint": 0, "categoryId": category_id, "category_name": category_name}
+
+
+def _matcher():
+    catalog = ProductCatalog()
+    catalog.load_rows([
+        _row(1, "Apple iPhone 13 Pro", 1, "Smartphones"),
+        _row(2, "Apple iPhone 13", 1, "Smartphones"),
+        _row(3, "Écouteurs Sans Fil", 2, "Audio"),
+    ])
+    return catalog, ProductEntityMatcher(catalog)
+
+
+def test_exact_and_partial_mentions():
+    """Test longest-match recognition of full and partial designations"""
+    _, matcher = _matcher()
+
+    mention = matcher.best_product("Is the iPhone 13 Pro in stock?")
+    assert mention.text == "iphone 13 pro"
+    assert mention.product_id == 1
+
+    # "apple iphone 13" is the whole designation of product 2 and part of product 1
+    assert matcher.best_product("do you have the APPLE iphone 13?").product_id == 2
+
+    # Ambiguous mentions carry every candidate
+    mention = matcher.best_product("any iphone left")
+    assert mention.product_id is None
+    assert mention.product_ids == (1, 2)
+
+
+def test_accents_and_categories():
+    """Test accent folding and category mentions"""
+    _, matcher = _matcher()
+
+    assert matcher.best_product("ecouteurs sans fil available?").product_id == 3
+    assert matcher.categories("show me your smartphone deals") == [1]
+    assert [p["id"] for p in matcher.mentioned_products("what audio gear do you sell")] == [3]
+    assert matcher.find("hello there") == []
+
+
+def test_rebuilds_when_catalog_changes():
+    """Test that catalog updates are picked up, in the background when a loop is running"""
+    catalog, matcher = _matcher()
+    assert matcher.best_product("galaxy s22") is None
+
+    catalog.upsert(_row(4, "Samsung Galaxy S22", 1, "Smartphones"))
+
+    async def run():
+        # The previous trie keeps serving while the rebuild runs
+        assert matcher.best_product("galaxy s22") is None
+        await matcher._rebuild_task
+        return matcher.best_product("galaxy s22")
+
+    assert asyncio.run(run()).product_id == 4
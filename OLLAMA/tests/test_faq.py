@@ -0,0 +1,138 @@
+import asyncio
+import zlib
+
+from unittest.mock import patch
+
+from app.core.faq import FAQIndex
+from app.core.intents import IntentMatch, GENERAL
+from app.api.services.faq_service import FAQService
+from app.api.services.quick_answers import QuickAnswerService
+from app.utils.search import normalize
+
+
+class BagOfWordsEmbeddings:
+    """Deterministic stand-in for the sentence embedding model"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text):
+        vector = [0.0] * 256
+        for word in normalize(text).split():
+            vector[zlib.crc32(word.encode()) % 256] += 1.0
+        return vector
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+
+def _index(threshold=0.7):
+    index = FAQIndex(threshold=threshold)
+    model = BagOfWordsEmbeddings()
+    index._embedding_model = lambda: model
+    index.load([
+        {"id": 1, "question": "What are your opening hours?", "answer": "We are open 9am to 6pm, Monday to Saturday."},
+        {"id": 2, "question": "How do I return an item?", "answer": "Returns are free within 30 days."},
+    ])
+    return index, model
+
+
+def test_match_exact_and_similar_questions():
+    """Test that paraphrases above the threshold get the stored answer"""
+    index, model = _index()
+
+    # A normalized exact match needs no query embedding
+    calls = model.calls
+    match = index.match("what are your OPENING hours")
+    assert match.faq_id == 1 and match.score == 1.0
+    assert model.calls == calls
+
+    match = index.match("what are the opening hours")
+    assert match.faq_id == 1
+    assert match.score >= 0.7
+    assert index.match("do you sell gaming laptops") is None
+
+
+def test_add_and_remove_update_the_index():
+    """Test that admin changes are visible to matching immediately"""
+    index, _ = _index()
+
+    index.add(3, "Do you ship internationally?", "We ship to all EU countries.")
+    assert index.match("do you ship internationally").answer == "We ship to all EU countries."
+
+    index.remove(1)
+    assert len(index) == 2
+    assert index.match("what are your opening hours") is None
+    assert index.match("how do I return an item").faq_id == 2
+
+
+def test_cluster_queries_groups_paraphrases():
+    """Test FAQ candidate generation from logged queries"""
+    index, _ = _index()
+    queries = [
+        "Do you ship to Germany?", "do you ship to germany", "Do you ship to germany please",
+        "what are your opening hours",  # already an FAQ
+        "what are your opening hours",
+        "is the iphone 13 in stock",  # asked once
+    ]
+
+    candidates = index.cluster_queries(queries, threshold=0.8, min_count=2)
+
+    assert len(candidates) == 1
+    assert candidates[0]["question"] == "Do you ship to Germany?"
+    assert candidates[0]["count"] == 3
+    assert len(candidates[0]["examples"]) == 2
+
+
+def test_parse_query_log_formats():
+    """Test that plain-text and JSON log lines yield user queries"""
+    lines = [
+        "where is my order\n",
+        '{"query": "do you ship to Germany?", "history": []}\n',
+        '{"role": "assistant", "content": "Hello!"}\n',
+        '{"role": "user", "content": "hi"}\n',
+        "{not json\n",
+        "\n",
+    ]
+    assert FAQService.parse_query_log(lines) == ["where is my order", "do you ship to Germany?", "hi"]
+
+
+def test_quick_answer_returns_faq_before_rag():
+    """Test that a general query matching an FAQ is answered without the RAG path"""
+    index, _ = _index()
+    service = QuickAnswerService()
+    query = "what are the opening hours"
+
+    with patch("app.api.services.quick_answers.faq_index", index):
+        response = asyncio.run(service.answer(IntentMatch(GENERAL, {}, 0.0, "default"), query))
+        assert response.answer.startswith("We are open")
+        assert response.sources == ["faq:1"]
+
+        assert asyncio.run(service.answer(IntentMatch(GENERAL, {}, 0.0, "default"), "tell me a joke")) is None
+
+
+def test_faq_admin_routes_require_admin_key():
+    """Test that FAQ management is refused without the admin key"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.api.services.faq_service import FAQService
+
+    client = TestClient(app)
+    with patch.object(FAQService, "list_faqs", return_value=[]) as list_faqs, \
+            patch.object(FAQService, "delete_faq") as delete_faq:
+        with patch("app.dependencies.ADMIN_API_KEY", None):
+            assert client.get("/api/v1/admin/faqs").status_code == 403
+        with patch("app.dependencies.ADMIN_API_KEY", "secret"):
+            assert client.get("/api/v1/admin/faqs").status_code == 401
+            assert client.delete("/api/v1/admin/faqs/1", headers={"X-Admin-Key": "wrong"}).status_code == 401
+            assert client.post("/api/v1/admin/faqs", json={"question": "Q?", "answer": "A."}).status_code == 401
+            assert client.post("/api/v1/admin/faqs/candidates").status_code == 401
+            assert client.get("/api/v1/admin/faqs", headers={"X-Admin-Key": "secret"}).status_code == 200
+
+    assert list_faqs.call_count == 1
+    delete_faq.assert_not_called()
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.core.index_client import RemoteVectorStore
+from app.core.index_protocol import encode_texts, decode_texts, encode_vectors, decode_vectors
+from app.core.index_sidecar import IndexSidecar
+
+
+class FakeStore:
+    """Local store stand-in recording how often the model and index are called"""
+
+    def __init__(self):
+        self.embed_calls = []
+        self.index_calls = 0
+        self.added = []
+        self.deleted = []
+        self.embedding_model = self
+
+    def embed_documents(self, texts):
+        self.embed_calls.append(len(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def search_by_vectors(self, embeddings, k):
+        self.index_calls += 1
+        return [
+            [{"content": f"{int(vector[0])}-{rank}", "metadata": {}, "relevance_score": 1.0 - rank / 10} for rank in range(k)]
+            for vector in embeddings
+        ]
+
+    def add_documents(self, texts, metadatas=None):
+        self.added.extend(texts)
+        return [f"id-{len(self.added)}"]
+
+    def add_documents_batch(self, texts, metadatas):
+        self.added.extend(texts)
+        return [[f"id-{i}"] for i in range(len(texts))]
+
+    def delete_documents(self, ids=None, where=None):
+        self.deleted.append((ids, where))
+        return True
+
+
+class RunningSidecar:
+    def __init__(self, store, batch_window=0.02):
+        self.socket_path = os.path.join(tempfile.mkdtemp(), "index.sock")
+        self.sidecar = IndexSidecar(store, self.socket_path, batch_window=batch_window, batch_max=64)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.sidecar.start(), self.loop).result(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.sidecar.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+def test_protocol_round_trips():
+    """Test the text and vector encodings"""
+    texts = ["hello", "", "café ☕"]
+    assert decode_texts(encode_texts(texts)) == texts
+
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+    assert np.array_equal(decode_vectors(encode_vectors(vectors)), vectors)
+
+
+def test_remote_store_forwards_to_the_sidecar():
+    """Test search, embedding and writes through the Unix socket"""
+    store = FakeStore()
+    with RunningSidecar(store) as running:
+        remote = RemoteVectorStore(running.socket_path, timeout=5)
+
+        assert [doc["content"] for doc in remote.search("abc", k=2)] == ["3-0", "3-1"]
+        assert [[doc["content"] for doc in docs] for docs in remote.search_batch(["a", "abcd"], k=1)] == [["1-0"], ["4-0"]]
+        assert remote.embedding_model.embed_query("abcde") == [5.0, 1.0]
+        assert remote.embedding_model.embed_documents(["ab", "c"]) == [[2.0, 1.0], [1.0, 1.0]]
+
+        assert remote.add_documents_batch(["doc one", "doc two"], [{}, {}]) == [["id-0"], ["id-1"]]
+        assert remote.delete_documents(where={"sha256": "abc"}) is True
+        assert store.deleted == [(None, {"sha256": "abc"})]
+        remote.client.close()
+
+
+def test_concurrent_searches_are_batched():
+    """Test that searches from many threads share embedding passes and index queries"""
+    store = FakeStore()
+    with RunningSidecar(store, batch_window=0.05) as running:
+        remote = RemoteVectorStore(running.socket_path, timeout=5)
+        queries = ["x" * length for length in range(1, 17)]
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda query: remote.search(query, k=1), queries))
+
+        assert [docs[0]["content"] for docs in results] == [f"{len(query)}-0" for query in queries]
+        assert sum(store.embed_calls) == 16
+        assert store.index_calls < 16
+        remote.client.close()
+
+
+def test_unreachable_sidecar_degrades_to_empty_results():
+    """Test that a missing sidecar is logged and treated like an empty index"""
+    remote = RemoteVectorStore(os.path.join(tempfile.mkdtemp(), "missing.sock"), timeout=1)
+    assert remote.search("anything") == []
+    assert remote.search_batch(["a", "b"]) == [[], []]
+    assert remote.client.ping() is False
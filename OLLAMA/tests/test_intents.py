@@ -0,0 +1,89 @@
+import asyncio
+
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from app.core.catalog import ProductCatalog
+from app.core.entities import ProductEntityMatcher
+from app.core.intents import (
+    IntentRouter,
+    ORDER_TRACKING,
+    STOCK_CHECK,
+    PRICE_CHECK,
+    GREETING,
+    GENERAL,
+)
+from app.api.services.quick_answers import QuickAnswerService
+
+
+def _router(classifier=None):
+    catalog = ProductCatalog()
+    catalog.load_rows([
+        {"id": 1, "designation": "Apple iPhone 13", "prix": 799.0, "qteStock": 8, "seuilMin": 2, "nbrPoint": 10,
+         "categoryId": 1, "category_name": "Smartphones"},
+    ])
+    return IntentRouter(ProductEntityMatcher(catalog), classifier=classifier)
+
+
+def test_order_tracking_with_order_id_slot():
+    """Test order intents and order number extraction"""
+    router = _router()
+
+    match = router.match_rules("Where is my order #12345?")
+    assert match.intent == ORDER_TRACKING
+    assert match.slots["order_id"] == 12345
+
+    assert router.match_rules("what's the delivery status of order number 77").slots["order_id"] == 77
+
+
+def test_stock_and_price_use_product_slots():
+    """Test that product mentions become slots for the deterministic handlers"""
+    router = _router()
+
+    match = router.match_rules("Is the iPhone 13 in stock?")
+    assert match.intent == STOCK_CHECK
+    assert match.slots["product_id"] == 1
+
+    match = router.match_rules("How much is the iphone 13?")
+    assert match.intent == PRICE_CHECK
+    assert match.slots["product_id"] == 1
+
+
+def test_weak_cues_need_backing():
+    """Test that "available" alone no longer routes to the stock handler"""
+    router = _router()
+
+    assert router.match_rules("Is express delivery available in Tunisia?").intent == GENERAL
+    assert router.match_rules("Is the iphone 13 available?").intent == STOCK_CHECK
+    assert router.match_rules("Hello!").intent == GREETING
+    assert router.match_rules("hello, can you tell me about your return policy for damaged goods").intent == GENERAL
+
+
+def test_centroid_classifier_only_for_unclaimed_queries():
+    """Test that the embedding classifier is consulted when rules are inconclusive"""
+    classifier = MagicMock()
+    classifier.classify.return_value = (ORDER_TRACKING, 0.8)
+    router = _router(classifier)
+
+    match = asyncio.run(router.route("my parcel never showed up"))
+    assert (match.intent, match.source) == (ORDER_TRACKING, "centroid")
+
+    classifier.classify.reset_mock()
+    assert asyncio.run(router.route("Is the iPhone 13 in stock?")).source == "rules"
+    classifier.classify.assert_not_called()
+
+
+def test_quick_answers_use_product_id():
+    """Test that the stock handler looks up the matched product by id"""
+    router = _router()
+    service = QuickAnswerService()
+    product = {"designation": "Apple iPhone 13", "prix": 799.0, "stock_status": "In Stock", "nbrPoint": 0}
+
+    with patch.object(service, "db_service") as db_service:
+        db_service.check_stock = AsyncMock(return_value=product)
+        query = "is the iphone 13 in stock"
+        response = asyncio.run(service.answer(router.match_rules(query), query))
+
+    db_service.check_stock.assert_awaited_once_with(product_id=1)
+    assert "In Stock" in response.answer
+    query = "tell me about your shop"
+    assert asyncio.run(service.answer(router.match_rules(query), query)) is None
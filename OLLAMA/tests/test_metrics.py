@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Registry, Counter, Gauge, Histogram
+
+
+def test_histogram_buckets_and_rendering():
+    """Test cumulative buckets, sum and count in the Prometheus text format"""
+    registry = Registry()
+    histogram = Histogram("stage_seconds", "Stage time", registry=registry, buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{le="0.1"} 2' in text
+    assert 'stage_seconds_bucket{le="1"} 3' in text
+    assert 'stage_seconds_bucket{le="+Inf"} 4' in text
+    assert "stage_seconds_count 4" in text
+    assert "stage_seconds_sum 3.65" in text
+
+
+def test_timer_decorates_sync_and_async_functions():
+    """Test that time() measures both plain and coroutine functions"""
+    histogram = Histogram("timed_seconds", "Timed", registry=None)
+
+    @histogram.time()
+    def work():
+        return 1
+
+    @histogram.time()
+    async def async_work():
+        return 2
+
+    assert work() == 1
+    assert asyncio.run(async_work()) == 2
+    with histogram.time():
+        pass
+    assert histogram.snapshot()[1] == 3
+
+
+def test_counters_sum_per_thread_shards():
+    """Test that concurrent increments from many threads are all counted"""
+    registry = Registry()
+    counter = Counter("cache_total", "Lookups", ["cache", "result"], registry=registry)
+    gauge = Gauge("in_progress", "Running", registry=registry)
+
+    def work():
+        for _ in range(1000):
+            counter.labels("catalog", "hit").inc()
+            with gauge.track_inprogress():
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.labels("catalog", "hit").value() == 8000
+    assert gauge.value() == 0
+    assert 'cache_total{cache="catalog",result="hit"} 8000' in registry.render()
+
+
+def test_metrics_endpoint():
+    """Test that the app exposes its metrics"""
+    from app.main import app
+
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE chat_intent_routing_seconds histogram" in response.text
+    assert "llm_time_to_first_token_seconds_bucket" in response.text
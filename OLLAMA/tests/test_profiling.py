@@ -0,0 +1,127 @@
+import asyncio
+import marshal
+import threading
+
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.profiling import Profiler, ProfilerBusyError, ProfilerStateError, sample_stacks
+
+client = TestClient(app)
+
+ADMIN_HEADERS = {"X-Admin-Key": "secret"}
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_busy_thread_stacks():
+    """Test that a busy thread shows up in the collapsed stacks and idle ones do not"""
+    stop = threading.Event()
+    busy = threading.Thread(target=_spin, args=(stop,), name="busy worker")
+    idle = threading.Thread(target=stop.wait, name="idle")
+    busy.start()
+    idle.start()
+    try:
+        stacks = sample_stacks(0.2, 0.005)
+    finally:
+        stop.set()
+        busy.join()
+        idle.join()
+
+    spinning = [stack for stack in stacks if stack.startswith("busy_worker;")]
+    assert spinning
+    assert all("_spin (" in stack for stack in spinning)
+    assert not any(stack.startswith("idle;") for stack in stacks)
+
+
+def test_only_one_cpu_profile_at_a_time():
+    """Test that a second profile is refused while one runs"""
+    profiler = Profiler()
+
+    async def run():
+        first = asyncio.ensure_future(profiler.sample(0.3, 0.01))
+        await asyncio.sleep(0.05)
+        try:
+            await profiler.profile_event_loop(0.1)
+        except ProfilerBusyError:
+            refused = True
+        else:
+            refused = False
+        await first
+        return refused
+
+    assert asyncio.run(run())
+
+
+def test_cprofile_profiles_the_event_loop():
+    """Test that coroutines running during the window appear in the pstats output"""
+    profiler = Profiler()
+
+    def busy_handler():
+        return sum(range(10000))
+
+    async def traffic():
+        for _ in range(20):
+            busy_handler()
+            await asyncio.sleep(0.005)
+
+    async def run():
+        task = asyncio.ensure_future(traffic())
+        profile = await profiler.profile_event_loop(0.2)
+        await task
+        return profile
+
+    profile = asyncio.run(run())
+    assert "busy_handler" in profiler.pstats_text(profile)
+    stats = marshal.loads(profiler.pstats_bytes(profile))
+    assert any(function == "busy_handler" for _, _, function in stats)
+
+
+def test_heap_diff_reports_new_allocations():
+    """Test that allocations made after the baseline are attributed to their line"""
+    profiler = Profiler()
+    try:
+        profiler.start_heap(frames=1)
+        retained = [bytearray(1024) for _ in range(2000)]  # noqa: F841
+        diff = profiler.heap_diff(limit=5)
+    finally:
+        status = profiler.stop_heap()
+
+    top = diff["stats"][0]
+    assert "test_profiling.py:" in top["traceback"][0]
+    assert top["size_diff_bytes"] >= 2000 * 1024
+    assert status["tracing"] is False
+
+    try:
+        profiler.heap_diff()
+    except ProfilerStateError:
+        pass
+    else:
+        raise AssertionError("diff without a baseline should fail")
+
+
+def test_profiling_endpoints_require_the_admin_key():
+    """Test that profiling is off without a key and rejects a wrong one"""
+    with patch("app.dependencies.ADMIN_API_KEY", ""):
+        assert client.post("/api/v1/admin/profiling/cpu?seconds=0.1", headers=ADMIN_HEADERS).status_code == 403
+
+    with patch("app.dependencies.ADMIN_API_KEY", "secret"):
+        assert client.post("/api/v1/admin/profiling/cpu?seconds=0.1").status_code == 401
+        assert client.post("/api/v1/admin/profiling/cpu?seconds=0.1", headers={"X-Admin-Key": "wrong"}).status_code == 401
+
+        response = client.post("/api/v1/admin/profiling/cpu?seconds=0.1&include_idle=true", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        assert response.text.strip()
+
+        response = client.post("/api/v1/admin/profiling/cpu?seconds=0.1&mode=cprofile&output=pstats", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        assert isinstance(marshal.loads(response.content), dict)
+
+        assert client.get("/api/v1/admin/profiling/heap/diff", headers=ADMIN_HEADERS).status_code == 409
+        assert client.post("/api/v1/admin/profiling/heap/start", headers=ADMIN_HEADERS).json()["tracing"] is True
+        assert "stats" in client.get("/api/v1/admin/profiling/heap/diff?limit=3", headers=ADMIN_HEADERS).json()
+        assert client.post("/api/v1/admin/profiling/heap/stop", headers=ADMIN_HEADERS).json()["tracing"] is False
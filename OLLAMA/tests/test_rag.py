@@ -1,7 +1,8 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from app.core.rag_engine import RAGEngine
+from app.config import RETRIEVAL_MAX_K
 
 
 @pytest.fixture
@@ -27,7 +28,7 @@ def mock_vector_store():
 def mock_llm():
     """Create a mock LLM client"""
     mock = MagicMock()
-    mock.query.return_value = "Based on the available information, Product A costs $99.99."
+    mock.aquery = AsyncMock(return_value="Based on the available information, Product A costs $99.99.")
     return mock
 
 
@@ -47,13 +48,13 @@ def test_process_query(rag_engine, mock_vector_store, mock_llm):
     answer, docs = rag_engine.process_query(query)
 
     # Check that vector store was called correctly
-    mock_vector_store.search.assert_called_once_with(query)
+    mock_vector_store.search.assert_called_once_with(query, k=RETRIEVAL_MAX_K)
 
     # Check that LLM was called with appropriate context
-    assert mock_llm.query.call_count == 1
+    assert mock_llm.aquery.call_count == 1
 
     # Verify the LLM received context containing product information
-    context_arg = mock_llm.query.call_args[0][0]
+    context_arg = mock_llm.aquery.call_args[0][0]
     assert "Product A" in context_arg
     assert "$99.99" in context_arg
 
@@ -99,4 +100,77 @@ def test_process_history(rag_engine):
 
     assert "Hello" in system_prompt
     assert "Hi there! How can I help?" in system_prompt
-    assert "I'm looking for products" in system_prompt
\ No newline at end of file
+    assert "I'm looking for products" in system_prompt
+
+def test_process_query_async_runs_branches_concurrently(rag_engine, mock_vector_store, mock_llm):
+    """Test that enrichment runs alongside retrieval and feeds the prompt"""
+    import asyncio
+    import time
+    from app.utils.concurrency import Branch
+
+    documents = mock_vector_store.search.return_value
+
+    def slow_search(query, k):
+        time.sleep(0.2)
+        return documents
+
+    rag_engine.vector_store.search = slow_search
+
+    async def db_info():
+        await asyncio.sleep(0.2)
+        return "Product A: $99.99, In Stock"
+
+    start = time.perf_counter()
+    answer, docs = asyncio.run(rag_engine.process_query_async(
+        "How much does Product A cost?",
+        enrichment={"db_info": Branch(db_info(), 1.0, "")}
+    ))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.35
+    assert len(docs) == 2
+    assert "Product A: $99.99, In Stock" in mock_llm.aquery.call_args[0][0]
+    # Generated on the request's loop, not through the blocking shim in a worker thread
+    mock_llm.query.assert_not_called()
+
+
+def test_irrelevant_results_skip_context(rag_engine, mock_vector_store, mock_llm):
+    """Test that chit-chat with only low-scoring matches gets a bare prompt"""
+    mock_vector_store.search.return_value = [
+        {"content": "Warranty terms", "metadata": {"source": "terms.pdf"}, "relevance_score": 0.12},
+    ]
+
+    answer, docs = rag_engine.process_query("How are you today?")
+
+    assert docs == []
+    prompt = mock_llm.aquery.call_args[0][0]
+    assert "Context:" not in prompt
+    assert "How are you today?" in prompt
+
+
+def test_process_batch_searches_once_and_bounds_concurrency(rag_engine, mock_vector_store, mock_llm):
+    """Test that a batch shares one search and keeps results in query order"""
+    import asyncio
+
+    documents = mock_vector_store.search.return_value
+    mock_vector_store.search_batch.return_value = [documents, [], documents]
+
+    queries = ["How much is Product A?", "Hello there", "Which colors does Product B come in?"]
+    in_flight = {"now": 0, "max": 0}
+
+    async def slow_query(prompt, system_prompt=None):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.05)
+        in_flight["now"] -= 1
+        return "answer to: " + next(query for query in queries if query in prompt)
+
+    mock_llm.aquery.side_effect = slow_query
+
+    results = asyncio.run(rag_engine.process_batch(queries, concurrency=2))
+
+    mock_vector_store.search_batch.assert_called_once_with(queries, k=RETRIEVAL_MAX_K)
+    mock_vector_store.search.assert_not_called()
+    assert in_flight["max"] == 2
+    assert [len(docs) for _, docs in results] == [2, 0, 2]
+    assert all(query in answer for query, (answer, _) in zip(queries, results))
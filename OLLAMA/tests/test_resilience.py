@@ -0,0 +1,189 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import pytest
+
+from app.core.metrics import CIRCUIT_BREAKER_STATE, DEGRADED_ANSWERS
+from app.core.ollama_client import OllamaClient, LLMUnavailableError
+from app.core.rag_engine import RAGEngine, DegradedAnswer
+from app.core.resilience import CircuitBreaker, deadline_scope, time_remaining
+
+
+class SlowOllama:
+    """Local stand-in of Ollama's generate endpoint, streaming one token every `interval` seconds"""
+
+    def __init__(self, tokens=("Hello", " there"), interval=0.0):
+        self.tokens = tokens
+        self.interval = interval
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                server.requests += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    for token in server.tokens:
+                        time.sleep(server.interval)
+                        self.wfile.write((json.dumps({"response": token, "done": False}) + "\n").encode())
+                        self.wfile.flush()
+                    self.wfile.write((json.dumps({"response": "", "done": True}) + "\n").encode())
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+
+
+def make_client(url: str) -> OllamaClient:
+    with patch.object(OllamaClient, "_test_connection"):
+        client = OllamaClient()
+    client.base_url = url
+    client.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.1)
+    return client
+
+
+def test_deadline_scopes_nest_and_reach_worker_threads():
+    """Test that inner scopes never extend the deadline and threads see it"""
+    assert time_remaining() is None
+
+    async def run():
+        with deadline_scope(1.0):
+            with deadline_scope(5.0):
+                inner = time_remaining()
+            in_thread = await asyncio.to_thread(time_remaining)
+        return inner, in_thread
+
+    inner, in_thread = asyncio.run(run())
+    assert 0.9 < inner <= 1.0
+    assert 0.9 < in_thread <= 1.0
+    assert time_remaining() is None
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test the closed -> open -> half-open -> closed cycle and its gauge"""
+    breaker = CircuitBreaker("breaker-test", failure_threshold=2, reset_timeout=0.05)
+    gauge = CIRCUIT_BREAKER_STATE.labels("breaker-test")
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert gauge.value() == 2
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert gauge.value() == 0
+    assert breaker.allow() is True
+
+
+def test_llm_query_respects_deadline_and_breaker():
+    """Test that slow generations are cut at the deadline and repeated misses open the breaker"""
+    with SlowOllama(tokens=["a"] * 20, interval=0.05) as ollama:
+        client = make_client(ollama.url)
+
+        async def query_with_deadline(seconds):
+            with deadline_scope(seconds):
+                return await client.aquery("prompt")
+
+        with patch("app.core.ollama_client.LLM_MIN_GENERATION_SECONDS", 0.1):
+            for _ in range(2):
+                start = time.perf_counter()
+                with pytest.raises(LLMUnavailableError) as error:
+                    asyncio.run(query_with_deadline(0.3))
+                assert error.value.reason == "deadline"
+                assert time.perf_counter() - start < 0.6
+
+            assert client.breaker.state == CircuitBreaker.OPEN
+            requests = ollama.requests
+            with pytest.raises(LLMUnavailableError) as error:
+                asyncio.run(query_with_deadline(0.3))
+            assert error.value.reason == "circuit_open"
+            assert ollama.requests == requests
+
+            # Too little time left: refused without calling Ollama
+            time.sleep(0.1)
+            with pytest.raises(LLMUnavailableError) as error:
+                asyncio.run(query_with_deadline(0.05))
+            assert error.value.reason == "deadline"
+            assert ollama.requests == requests
+
+            # The trial call succeeds and closes the breaker
+            ollama.tokens, ollama.interval = ["Hello", " there"], 0.0
+            assert client.query("prompt") == "Hello there"
+            assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_generation_within_deadline_is_not_degraded():
+    """Test that a real generation under a request deadline answers normally"""
+    with SlowOllama(tokens=["Delivery", " is free."], interval=0.01) as ollama:
+        engine = RAGEngine()
+        engine.llm = make_client(ollama.url)
+        documents = [{"content": "Delivery is free over $50.", "metadata": {"source": "policies.txt"}}]
+
+        async def answer():
+            with deadline_scope(5.0):
+                return await engine.generate("Is delivery free?", documents)
+
+        answer = asyncio.run(answer())
+
+    assert answer == "Delivery is free."
+    assert not isinstance(answer, DegradedAnswer)
+    assert engine.llm.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unavailable_llm_gives_degraded_answer():
+    """Test that the top chunk and database facts answer when generation is skipped"""
+    engine = RAGEngine()
+    engine.llm = MagicMock()
+    engine.llm.aquery = AsyncMock(side_effect=LLMUnavailableError("circuit_open", "open"))
+    documents = [
+        {"content": "Standard delivery takes 3-5 business days.", "metadata": {"source": "policies.txt"}},
+        {"content": "Express delivery takes 1 day.", "metadata": {"source": "policies.txt"}},
+    ]
+    before = DEGRADED_ANSWERS.labels("circuit_open").value()
+
+    answer = asyncio.run(engine.generate("How long is delivery?", documents, db_info="Available Products:\n- Phone: $99.99"))
+
+    assert isinstance(answer, DegradedAnswer)
+    assert answer.reason == "circuit_open"
+    assert "Standard delivery takes 3-5 business days." in answer
+    assert "Express delivery" not in answer
+    assert "- Phone: $99.99" in answer
+    assert DEGRADED_ANSWERS.labels("circuit_open").value() == before + 1
+
+
+def test_degraded_answer_is_not_reformatted():
+    """Test that chat responses flag degraded answers and keep their facts intact"""
+    from app.api.services.chat_service import ChatService
+
+    answer = DegradedAnswer("Busy.\n\nPhone: $99.99. Laptop: $1299.00. Tablet: $199.50.", "deadline")
+    response = ChatService()._rag_response(answer, [])
+
+    assert response.degraded is True
+    assert response.answer == str(answer)
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+from app.core.vector_store import VectorStore, select_relevant
+
+
+def _docs(*scores):
+    return [{"content": f"chunk {i}", "metadata": {}, "relevance_score": score} for i, score in enumerate(scores)]
+
+
+def test_cuts_at_the_largest_gap():
+    """Test that k follows the elbow in the score distribution"""
+    kept = select_relevant(_docs(0.82, 0.8, 0.78, 0.45, 0.42), min_score=0.3, max_k=8, score_gap=0.15)
+    assert [d["relevance_score"] for d in kept] == [0.82, 0.8, 0.78]
+
+
+def test_keeps_evenly_scored_results_up_to_max_k():
+    """Test that without a clear gap results are kept up to the cap"""
+    kept = select_relevant(_docs(0.7, 0.66, 0.62, 0.58, 0.55), min_score=0.3, max_k=4, score_gap=0.15)
+    assert len(kept) == 4
+
+
+def test_nothing_relevant_returns_empty():
+    """Test that low scores gate retrieval off entirely"""
+    assert select_relevant(_docs(0.2, 0.18), min_score=0.35) == []
+    assert select_relevant([]) == []
+
+
+def test_search_batch_queries_the_index_once():
+    """Test that batch search embeds all queries together and maps distances to scores"""
+    store = VectorStore.__new__(VectorStore)
+    store.embedding_model = MagicMock()
+    store.embedding_model.embed_documents.return_value = [[0.1], [0.2]]
+    store.db = MagicMock()
+    store.db._select_relevance_score_fn.return_value = lambda distance: 1.0 - distance
+    store.db._collection.query.return_value = {
+        "documents": [["shipping policy", "returns"], []],
+        "metadatas": [[{"source": "faq.pdf"}, None], []],
+        "distances": [[0.25, 0.5], []],
+    }
+
+    results = store.search_batch(["how long is shipping", "hello"], k=2)
+
+    store.embedding_model.embed_documents.assert_called_once_with(["how long is shipping", "hello"])
+    store.db._collection.query.assert_called_once()
+    assert results[0][0] == {"content": "shipping policy", "metadata": {"source": "faq.pdf"}, "relevance_score": 0.75}
+    assert results[0][1]["metadata"] == {}
+    assert results[1] == []
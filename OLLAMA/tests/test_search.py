@@ -0,0 +1,55 @@
+import asyncio
+
+from unittest.mock import patch
+
+from app.core.catalog import ProductCatalog
+from app.utils.db import DBService
+from app.utils.search import normalize, trigrams, trigram_similarity
+
+
+def _catalog():
+    catalog = ProductCatalog()
+    catalog.load_rows([
+        {"id": 1, "designation": "iPhone 13 Case", "prix": 15.0, "qteStock": 4, "seuilMin": 1, "nbrPoint": 0,
+         "categoryId": 1, "category_name": "Accessories"},
+        {"id": 2, "designation": "iPhone 13", "prix": 799.0, "qteStock": 8, "seuilMin": 2, "nbrPoint": 0,
+         "categoryId": 2, "category_name": "Phones"},
+        {"id": 3, "designation": "Écouteurs Bluetooth", "prix": 49.0, "qteStock": 0, "seuilMin": 2, "nbrPoint": 0,
+         "categoryId": 1, "category_name": "Accessories"},
+    ])
+    return catalog
+
+
+def test_trigrams_follow_pg_trgm():
+    """Test normalisation and pg_trgm-style trigram similarity"""
+    assert normalize("  Écouteurs-Bluetooth! ") == "ecouteurs bluetooth"
+    assert trigrams("cat") == frozenset({"  c", " ca", "cat", "at "})
+    assert trigram_similarity(trigrams("word"), trigrams("word")) == 1.0
+    assert trigram_similarity(trigrams("word"), trigrams("xyz")) == 0.0
+
+
+def test_search_ranks_best_match_first():
+    """Test that the closest designation wins over the first substring hit"""
+    catalog = _catalog()
+
+    results = catalog.search("iphone 13")
+    # Both contain the name; the closer designation ranks first
+    assert [r["id"] for r in results] == [2, 1]
+    assert results[0]["score"] == 1.0
+    assert catalog.find_by_name("iphone 13 case")["id"] == 1
+
+
+def test_search_tolerates_typos_and_accents():
+    """Test fuzzy matches for misspelled and unaccented names"""
+    catalog = _catalog()
+
+    assert catalog.find_by_name("iphnoe")["designation"].startswith("iPhone")
+    assert catalog.find_by_name("ecouteurs")["id"] == 3
+    assert catalog.search("lawnmower") == []
+
+
+def test_check_stock_uses_ranked_search():
+    """Test that name-based stock checks return the best-ranked product"""
+    with patch("app.utils.db.product_catalog", _catalog()):
+        assert asyncio.run(DBService.check_stock(product_name="ecouteur bluetoth"))["id"] == 3
+        assert asyncio.run(DBService.search_products("   ")) == []
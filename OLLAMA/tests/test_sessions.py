@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.sessions import SessionStore, InMemorySessionBackend, UnknownSessionError
+
+
+def test_session_seeds_from_client_history_and_records_turns():
+    """Test that a session replaces client-sent history after the first request"""
+    store = SessionStore(InMemorySessionBackend(), token_budget=10000)
+
+    async def run():
+        session_id = await store.create([{"role": "user", "content": "Hi"}])
+        summary, history = await store.load(session_id)
+        assert (summary, history) == ("", [{"role": "user", "content": "Hi"}])
+
+        await store.append_turn(session_id, "Is the iPhone in stock?", "Yes, it is.")
+        return await store.load(session_id, [{"role": "user", "content": "ignored"}])
+
+    summary, history = asyncio.run(run())
+    assert [m["content"] for m in history] == ["Hi", "Is the iPhone in stock?", "Yes, it is."]
+
+    # Stateless requests keep using the client history
+    assert asyncio.run(store.load(None, [{"role": "user", "content": "x"}]))[1][0]["content"] == "x"
+
+
+def test_lru_evicts_least_recently_used():
+    """Test the in-memory backend's size bound"""
+    backend = InMemorySessionBackend(max_sessions=2)
+
+    async def run():
+        for session_id in ("a", "b"):
+            await backend.set(session_id, {"summary": "", "messages": [], "updated_at": 1e12})
+        await backend.get("a")
+        await backend.set("c", {"summary": "", "messages": [], "updated_at": 1e12})
+        return [await backend.get(session_id) is not None for session_id in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [True, False, True]
+
+
+def test_older_turns_are_summarized_in_background():
+    """Test that exceeding the token budget folds older turns into the summary"""
+    store = SessionStore(InMemorySessionBackend(), token_budget=20, keep_messages=2)
+
+    async def run():
+        with patch.object(store, "_summarize_messages", AsyncMock(return_value="Customer asked about phones.")) as summarize:
+            session_id = await store.create()
+            await store.append_turn(session_id, "Tell me about your phones " * 5, "We have many phones " * 5)
+            await store.append_turn(session_id, "And tablets?", "Yes, tablets too.")
+            await asyncio.gather(*store._tasks)
+        return summarize, await store.load(session_id)
+
+    summarize, (summary, history) = asyncio.run(run())
+    assert summarize.call_count == 1
+    assert summary == "Customer asked about phones."
+    assert [m["content"] for m in history] == ["And tablets?", "Yes, tablets too."]
+
+
+def test_client_chosen_session_ids_are_rejected():
+    """Test that only server-generated session IDs are accepted"""
+    store = SessionStore(InMemorySessionBackend(), token_budget=10000)
+
+    async def run():
+        first, second = await store.create(), await store.create()
+        assert first != second and len(first) >= 32
+        with pytest.raises(UnknownSessionError):
+            await store.load("my-session")
+        # Turns for unknown sessions are not recorded either
+        await store.append_turn("my-session", "Hi", "Hello!")
+        return await store.backend.get("my-session")
+
+    assert asyncio.run(run()) is None
+
+
+def test_summary_keeps_turns_appended_meanwhile():
+    """Test that a summary only drops the messages it folded, keeping turns recorded during the LLM call"""
+    store = SessionStore(InMemorySessionBackend(), token_budget=20, keep_messages=2)
+
+    async def run():
+        session_id = await store.create()
+
+        async def summarize(summary, messages):
+            # Another request records its turn while the LLM is summarizing
+            await store.append_turn(session_id, "Do you ship abroad?", "Yes, to 30 countries.")
+            return "Customer asked about phones."
+
+        with patch.object(store, "_summarize_messages", side_effect=summarize):
+            await store.append_turn(session_id, "Tell me about your phones " * 5, "We have many phones " * 5)
+            await store.append_turn(session_id, "And tablets?", "Yes, tablets too.")
+            await asyncio.gather(*store._tasks)
+        return await store.load(session_id)
+
+    summary, history = asyncio.run(run())
+    assert summary == "Customer asked about phones."
+    assert [m["content"] for m in history] == [
+        "And tablets?", "Yes, tablets too.", "Do you ship abroad?", "Yes, to 30 countries."
+    ]
+
+
+def test_summaries_use_the_guarded_llm_call():
+    """Test that summaries go through aquery, with its breaker and deadline, instead of a printing client"""
+    store = SessionStore(InMemorySessionBackend())
+
+    with patch("app.core.ollama_client.ollama_client.aquery", AsyncMock(return_value=" Asked about phones. ")) as aquery:
+        summary = asyncio.run(store._summarize_messages("", [{"role": "user", "content": "Phones?"}]))
+
+    assert summary == "Asked about phones."
+    assert "USER: Phones?" in aquery.call_args.args[0]
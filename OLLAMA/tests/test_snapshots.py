@@ -0,0 +1,140 @@
+import os
+import json
+import tempfile
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import Chroma
+
+from app.core.snapshots import (
+    export_snapshot,
+    import_snapshot,
+    load_snapshot,
+    SnapshotError,
+    EMBEDDINGS_FILE,
+    MANIFEST_FILE,
+    TEXTS_FILE,
+)
+from app.core.vector_store import VectorStore
+
+
+class LetterEmbeddings(Embeddings):
+    """Deterministic embeddings: letter frequencies of the text"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if "a" <= char <= "z":
+                vector[ord(char) - ord("a")] += 1
+        return (vector / max(np.linalg.norm(vector), 1e-6)).tolist()
+
+
+def make_store() -> VectorStore:
+    store = VectorStore.__new__(VectorStore)
+    store.embedding_model = LetterEmbeddings()
+    store.db = Chroma(persist_directory=tempfile.mkdtemp(), embedding_function=store.embedding_model)
+    return store
+
+
+def test_snapshot_round_trip():
+    """Test that an imported snapshot answers searches exactly like the original index"""
+    source = make_store()
+    rng = np.random.default_rng(0)
+    # Random words give every chunk a distinct embedding, so result order has no ties
+    texts = [f"{''.join(rng.choice(list('abcdefghij'), 8))} {'delivery' if i % 2 else 'returns'} é" for i in range(25)]
+    metadatas = [{"source": f"doc{i % 3}.txt", "chunk_index": i} if i % 5 else None for i in range(25)]
+    source.db.add_texts(texts=texts, metadatas=metadatas)
+
+    path = os.path.join(tempfile.mkdtemp(), "snapshot")
+    manifest = export_snapshot(source.db._collection, path, batch_size=7)
+    assert manifest["count"] == 25
+    assert manifest["dimension"] == 26
+
+    snapshot = load_snapshot(path)
+    assert isinstance(snapshot.embeddings, np.memmap)
+    assert snapshot.embeddings.flags["C_CONTIGUOUS"]
+    assert sorted(snapshot.texts.slice(0, 25)) == sorted(texts)
+    assert snapshot.metadatas(0, 25).count(None) == 5
+
+    replica = make_store()
+    assert import_snapshot(replica.db._collection, path, batch_size=10) == 25
+    # Importing again upserts the same chunks
+    assert import_snapshot(replica.db._collection, path) == 25
+    assert replica.db._collection.count() == 25
+
+    queries = ["delivery policy", "returns"]
+    expected = source.search_batch(queries, k=5)
+    assert replica.search_batch(queries, k=5) == expected
+    assert any(doc["metadata"].get("source") for doc in expected[0])
+
+
+def test_snapshot_is_checked_before_import():
+    """Test that corrupt snapshots and other embedding models are refused"""
+    source = make_store()
+    source.db.add_texts(texts=["Standard delivery takes 3-5 days.", "Returns are free."])
+    path = os.path.join(tempfile.mkdtemp(), "snapshot")
+    export_snapshot(source.db._collection, path)
+
+    # Same size, different content: only the checksum notices
+    with open(os.path.join(path, TEXTS_FILE), "r+b") as f:
+        f.write(b"X")
+    load_snapshot(path)
+    with pytest.raises(SnapshotError, match="Checksum"):
+        import_snapshot(make_store().db._collection, path)
+
+    export_snapshot(source.db._collection, path)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    manifest["embedding_model"] = "another-model"
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    replica = make_store()
+    with pytest.raises(SnapshotError, match="another-model"):
+        import_snapshot(replica.db._collection, path)
+    assert replica.db._collection.count() == 0
+
+    os.remove(os.path.join(path, EMBEDDINGS_FILE))
+    with pytest.raises(SnapshotError, match="missing"):
+        load_snapshot(path)
+
+
+class ChangingCollection:
+    """Chroma collection that runs `change` right after the first page is read"""
+
+    def __init__(self, collection, change):
+        self.collection = collection
+        self.change = change
+
+    def count(self):
+        return self.collection.count()
+
+    def get(self, **kwargs):
+        page = self.collection.get(**kwargs)
+        if self.change:
+            self.change, change = None, self.change
+            change()
+        return page
+
+
+def test_export_fails_when_the_index_changes():
+    """Test that an update during the export, which keeps the size, still fails the export"""
+    source = make_store()
+    source.db.add_texts(texts=[f"Order {word} shipped" for word in ["alpha", "bravo", "charlie", "delta"]])
+    collection = source.db._collection
+    first_id = collection.get(limit=1)["ids"][0]
+
+    def update():
+        # A chunk of the page already exported: the snapshot would mix old and new states
+        collection.upsert(ids=[first_id], documents=["Order alpha cancelled"],
+                          embeddings=[LetterEmbeddings().embed_query("Order alpha cancelled")])
+
+    path = os.path.join(tempfile.mkdtemp(), "snapshot")
+    with pytest.raises(SnapshotError, match="changed"):
+        export_snapshot(ChangingCollection(collection, update), path, batch_size=2)
+
+    assert not os.path.exists(path)
+    assert os.listdir(os.path.dirname(path)) == []
@@ -0,0 +1,23 @@
+import os
+import sys
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY_MODULES = ["pandas", "pypdf", "chromadb", "langchain_community.llms", "sentence_transformers", "torch"]
+
+
+def test_heavy_dependencies_are_imported_lazily():
+    """Test that importing the chat path loads no parser, Chroma, LLM or model library"""
+    script = (
+        "import sys\n"
+        "import app.utils.parsers, app.core.ollama_client, app.core.vector_store\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    env = dict(os.environ, VECTOR_STORE_BACKEND="sidecar", OLLAMA_BASE_URL="http://127.0.0.1:9")
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
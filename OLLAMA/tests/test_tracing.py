@@ -0,0 +1,126 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.tracing import Tracer, TracingMiddleware, InMemorySpanExporter, parse_traceparent, install_log_correlation
+
+
+def _tracer(sample_rate=1.0):
+    exporter = InMemorySpanExporter()
+    return Tracer(exporter, sample_rate=sample_rate), exporter
+
+
+def test_spans_nest_across_awaits_and_threads():
+    """Test that child spans find their parent through asyncio.to_thread"""
+    tracer, exporter = _tracer()
+
+    @tracer.traced("search")
+    def search():
+        with tracer.span("embed", k=3):
+            pass
+
+    @tracer.traced("handle")
+    async def handle():
+        await asyncio.to_thread(search)
+
+    async def request():
+        with tracer.start_trace("POST /chat"):
+            await handle()
+
+    asyncio.run(request())
+    tracer.flush()
+
+    spans = {span["name"]: span for span in exporter.spans}
+    assert set(spans) == {"POST /chat", "handle", "search", "embed"}
+    assert spans["POST /chat"]["parent_id"] is None
+    assert spans["handle"]["parent_id"] == spans["POST /chat"]["span_id"]
+    assert spans["search"]["parent_id"] == spans["handle"]["span_id"]
+    assert spans["embed"]["parent_id"] == spans["search"]["span_id"]
+    assert spans["embed"]["attributes"] == {"k": 3}
+    assert len({span["trace_id"] for span in exporter.spans}) == 1
+
+
+def test_failed_span_records_the_error():
+    """Test that an exception marks the span and still propagates"""
+    tracer, exporter = _tracer()
+
+    with tracer.start_trace("request"):
+        try:
+            with tracer.span("llm.query"):
+                raise TimeoutError("no answer")
+        except TimeoutError:
+            pass
+    tracer.flush()
+
+    failed = next(span for span in exporter.spans if span["name"] == "llm.query")
+    assert failed["status"] == "error"
+    assert failed["error"] == "TimeoutError: no answer"
+
+
+def test_unsampled_traces_export_nothing_but_keep_an_id():
+    """Test that sampling skips span recording, not trace IDs"""
+    tracer, exporter = _tracer(sample_rate=0.0)
+
+    with tracer.start_trace("request") as root:
+        with tracer.span("child") as child:
+            child.set_attribute("ignored", True)
+            assert tracer.current_trace_id() == root.trace_id
+    tracer.flush()
+
+    assert exporter.spans == []
+    assert tracer.current_trace_id() is None
+
+
+def test_parse_traceparent():
+    """Test W3C traceparent parsing and rejection of malformed headers"""
+    trace_id, parent_id, sampled = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert parent_id == "00f067aa0ba902b7"
+    assert sampled is True
+    assert parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00")[2] is False
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_middleware_propagates_incoming_trace_ids():
+    """Test that requests continue the caller's trace and return its ID"""
+    tracer, exporter = _tracer(sample_rate=0.0)
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
+    @app.get("/ping")
+    async def ping():
+        with tracer.span("handler"):
+            return {"trace_id": tracer.current_trace_id()}
+
+    client = TestClient(app)
+
+    # A sampled traceparent is recorded even with a zero sample rate
+    response = client.get("/ping", headers={"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"})
+    assert response.headers["X-Trace-Id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert response.json()["trace_id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    tracer.flush()
+    root = next(span for span in exporter.spans if span["name"] == "GET /ping")
+    assert root["parent_id"] == "00f067aa0ba902b7"
+    assert root["attributes"]["http.status_code"] == 200
+    assert {span["name"] for span in exporter.spans} == {"GET /ping", "handler"}
+
+    # A plain trace ID is reused; without either header a new one is made
+    assert client.get("/ping", headers={"X-Trace-Id": "abc123"}).headers["X-Trace-Id"] == "abc123"
+    assert len(client.get("/ping").headers["X-Trace-Id"]) == 32
+
+
+def test_log_records_carry_the_trace_id(caplog):
+    """Test that log lines inside a trace can be correlated with it"""
+    install_log_correlation()
+    tracer, _ = _tracer(sample_rate=0.0)
+    logger = logging.getLogger("tests.tracing")
+
+    with caplog.at_level(logging.INFO, logger="tests.tracing"):
+        with tracer.start_trace("request") as root:
+            logger.info("inside")
+        logger.info("outside")
+
+    assert [record.trace_id for record in caplog.records] == [root.trace_id, "-"]
@@ -0,0 +1,44 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.utils.uploads import (
+    UploadTooLargeError,
+    copy_stream_to_disk,
+    stream_body_to_disk,
+)
+
+
+@pytest.fixture(autouse=True)
+def staging_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.utils.uploads.UPLOAD_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr("app.utils.uploads.UPLOAD_CHUNK_SIZE", 4)
+    return tmp_path
+
+
+def test_copy_stream_to_disk_hashes_content(staging_dir):
+    """Test that staged content is written in chunks and hashed"""
+    content = b"The quick brown fox jumps over the lazy dog"
+
+    path, sha256, size = copy_stream_to_disk(io.BytesIO(content), max_size=1024)
+
+    assert os.path.dirname(path) == str(staging_dir)
+    assert size == len(content)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+def test_stream_body_to_disk_enforces_max_size(staging_dir):
+    """Test that the size limit aborts the stream and removes the partial file"""
+    async def body():
+        for _ in range(10):
+            yield b"0123456789"
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(stream_body_to_disk(body(), max_size=25))
+
+    assert os.listdir(staging_dir) == []